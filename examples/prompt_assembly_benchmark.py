@@ -0,0 +1,86 @@
+"""
+Microbenchmark for system-prompt assembly in AIHelper.
+
+Compares rebuilding the system message from scratch on every call (guidelines
+and CSV-serialized data concatenated each time) with the cached assembly used by
+AIHelper, for many small guidelines and a few large data blocks. Runs offline
+against MockInferenceClient.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from llm_helper import AIHelper
+from llm_helper.mock_providers import MockInferenceClient
+
+
+def rebuild_from_scratch(guidelines, frames):
+    """The assembly AIHelper did before caching: serialize and concatenate everything per call."""
+    system_msg = ''
+    for key, guideline in guidelines.items():
+        system_msg += f"[Guideline: {key} Start]\n{guideline}\n[Guideline: {key} End]\n\n"
+    data_blocks = [f"[Data: {key} Start]\n{frame.to_csv()}\n[Data: {key} End]" for key, frame in frames.items()]
+    system_msg += "\n\n".join(data_blocks)
+    return system_msg
+
+
+def shared_prefix(before, after):
+    """Fraction of `before` that is still a byte-identical prefix of `after`."""
+    n = next((i for i, (a, b) in enumerate(zip(before, after)) if a != b), min(len(before), len(after)))
+    return n / max(len(before), 1)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(n_guidelines=200, guideline_chars=2000, n_frames=10, rows_per_frame=20000, repeat=50):
+    rng = np.random.default_rng(0)
+    guidelines = {f"rule-{i}": f"Guideline {i}: " + "x" * guideline_chars for i in range(n_guidelines)}
+    frames = {
+        f"table-{i}": pd.DataFrame({'id': np.arange(rows_per_frame), 'value': rng.random(rows_per_frame),
+                                    'label': [f"item {j}" for j in range(rows_per_frame)]})
+        for i in range(n_frames)
+    }
+
+    ai = AIHelper(client=MockInferenceClient(latency=0), display_response=False)
+    for key, guideline in guidelines.items():
+        ai.guideline[key] = guideline
+    for key, frame in frames.items():
+        ai.attached_data.add(key, frame)
+
+    baseline = timed(lambda: rebuild_from_scratch(guidelines, frames), max(1, repeat // 10))
+    first = timed(lambda: ai._build_messages('question'), 1)
+    cached = timed(lambda: ai._build_messages('question'), repeat)
+
+    previous = ai._build_system_message()
+    ai.add_guideline('rule-7', 'Updated guideline')
+    after_change = timed(lambda: ai._build_messages('question'), 1)
+    current = ai._build_system_message()
+    guideline_prefix = shared_prefix(previous, current)
+
+    previous = current
+    ai.attached_data.add('table-new', frames['table-0'].head(100))
+    after_attach = timed(lambda: ai._build_messages('question'), 1)
+    current = ai._build_system_message()
+    data_prefix = shared_prefix(previous, current)
+
+    print(f"{n_guidelines} guidelines x {guideline_chars} chars, {n_frames} frames x {rows_per_frame} rows "
+          f"({len(current) / 1024 ** 2:.1f} MB system message)")
+    print(f"  rebuild from scratch per call: {baseline * 1000:9.2f} ms")
+    print(f"  cached, first call:            {first * 1000:9.2f} ms")
+    print(f"  cached, unchanged:             {cached * 1000:9.3f} ms")
+    print(f"  cached, one guideline changed: {after_change * 1000:9.2f} ms")
+    print(f"  cached, one data block added:  {after_attach * 1000:9.2f} ms")
+    # data is ordered before guidelines and a changed block moves to the end, so the data prefix survives
+    print(f"  byte-identical prefix kept: {guideline_prefix:.1%} after the guideline change, "
+          f"{data_prefix:.1%} after adding data")
+
+
+if __name__ == '__main__':
+    main()
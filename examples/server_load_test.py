@@ -0,0 +1,72 @@
+"""
+Local load test for the multi-session server.
+
+Drives the ASGI app in-process (no network, no API keys) against MockInferenceClient:
+many concurrent sessions, each with its own guideline and several questions.
+"""
+
+import asyncio
+import json
+import time
+
+from llm_helper.mock_providers import MockInferenceClient
+from llm_helper.server import create_app
+
+
+async def call(app, method, path, payload=None):
+    """Send one request to the ASGI app and return (status, body)."""
+    body = json.dumps(payload).encode() if payload is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': []}
+    received = {'status': None, 'body': b''}
+    requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # like an ASGI server: after the body, the next message is the client disconnect
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            received['status'] = message['status']
+        else:
+            received['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return received['status'], received['body']
+
+
+async def user_session(app, user_id, n_questions, latencies):
+    _, body = await call(app, 'POST', '/sessions')
+    session_id = json.loads(body)['session_id']
+    await call(app, 'POST', f'/sessions/{session_id}/guidelines',
+               {'name': 'persona', 'guideline': f'You are assisting user {user_id}.'})
+
+    for i in range(n_questions):
+        start = time.perf_counter()
+        path = f'/sessions/{session_id}/ask' + ('/stream' if i % 2 else '')
+        status, _ = await call(app, 'POST', path, {'prompt': f'Question {i} from user {user_id}'})
+        latencies.append(time.perf_counter() - start)
+        assert status == 200
+
+
+async def main(n_sessions=50, n_questions=4):
+    client = MockInferenceClient(latency=0.2, tokens_per_second=200)
+    app = create_app(client=client, max_workers=64, requests_per_second=100)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(user_session(app, u, n_questions, latencies) for u in range(n_sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {n_sessions} sessions in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.1f} req/s)")
+    print(f"p50 latency: {latencies[len(latencies) // 2]:.3f}s, "
+          f"p95 latency: {latencies[int(len(latencies) * 0.95)]:.3f}s")
+    print(f"peak concurrent provider calls: {client.max_active_calls}")
+    print(f"server stats: {app.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
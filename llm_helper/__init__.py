@@ -3,7 +3,10 @@
 __version__ = "0.0.1"
 
 from .ai_helper import AIHelper, AIHelper_Google
-from .utils import read_pdf2text
+from .utils import read_pdf2text, chunk_text
 from .info_extractor import InfoExtractor
+from .job_runner import CheckpointStore, ExtractionJob
+from .result_collector import ResultCollector
+from .incremental import IncrementalExtractor
 
-__all__ = ["AIHelper", "AIHelper_Google", "read_pdf2text", "InfoExtractor"]
\ No newline at end of file
+__all__ = ["AIHelper", "AIHelper_Google", "read_pdf2text", "chunk_text", "InfoExtractor", "CheckpointStore", "ExtractionJob", "ResultCollector", "IncrementalExtractor"]
\ No newline at end of file
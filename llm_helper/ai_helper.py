@@ -4,7 +4,15 @@ from huggingface_hub import InferenceClient
 from IPython.display import display, Markdown
 import ipywidgets as widgets
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import hashlib
 import os
+import threading
+import time
+
+from .attachment_store import AttachmentStore
+from .scheduler import scheduled_call, scheduled_stream
 
 
 ## basic parameters for LLM generation, via HuggingFace Inference API
@@ -19,125 +27,549 @@ config = {
     'temperature': 0.7,
 }
 
+# context window (input + output tokens) of each model, used by the budget planner
+context_windows = {
+    'Llama-3.1': 131072,
+    'Mistral-7B': 32768
+}
+
+def _print_attachment(attachment, attached_data):
+    if attachment.kind == 'text':
+        size = f"{attachment.text_chars()} characters"
+    else:
+        size = f"{attachment.shape[0]} rows x {attachment.shape[1]} columns" + (" (spilled to disk)" if attachment.kind == 'spilled' else "")
+    print(f"Data added: {attachment.name}; data type: {type(attached_data)}; data size: {size}")
+
+
 class AIHelper():
-    def __init__(self, model_name: str='Mistral-7B', display_response: bool=True):
+    def __init__(self, model_name: str='Mistral-7B', display_response: bool=True, client=None, verbose: bool=True):
 
-        self.client = InferenceClient(token=os.getenv("HF_TOKEN"))
+        # a client can be shared between helpers (e.g. one connection pool for many sessions)
+        self.client = client if client is not None else InferenceClient(token=os.getenv("HF_TOKEN"))
         self.model_name = model_name
         self.config = config
         self.llm_models = llm_models
 
         self.chat_history = []
         self.guideline = {}
-        self.attached_data = {}
+        self.attached_data = AttachmentStore()
         self.display_response = display_response
-
-        print(f"Initialized AIHelper with model: {self.model_name}")
+        self.verbose = verbose          # setup messages (init, guidelines, attachments); False in the server
+        self.semantic_cache = None
+        self.budget_planner = None
+        self.cascade = None             # ModelCascade over llm_models keys, set by set_cascade()
+        self.cascade_check = None
+        self.scheduler_session = f"AIHelper-{id(self):x}"     # fair-queuing key when a scheduler is set
+        self._history_lock = threading.Lock()
+        self._system_lock = threading.Lock()     # guards _blocks and _system_cache
+        self._widget_executor = None
+
+        # assembled system message, rebuilt only when guidelines or attachments change
+        self._blocks = {}               # (kind, name) -> (guideline text or attachment version, change stamp, segment)
+        self._change_stamp = 0
+        self._system_cache = {}         # (with_guideline, with_data) -> fingerprint, segments, message, scope
+
+        if self.verbose:
+            print(f"Initialized AIHelper with model: {self.model_name}")
 
     def add_guideline(self, guideline_name: str, guideline: str):
         """Add a guideline to the chat."""
         self.guideline[guideline_name] = guideline
-        print(f"Guideline added: {guideline_name}")
+        if self.verbose:
+            print(f"Guideline added: {guideline_name}")
 
-    def attach_data(self, data_name: str, attached_data):
-        """Add data to the chat."""
+    def attach_data(self, data_name: str, attached_data, spill=None):
+        """Add data to the chat. DataFrames are copied (or spilled to disk) and serialized on first use."""
+        attachment = self.attached_data.add(data_name, attached_data, spill=spill)
+        if self.verbose:
+            _print_attachment(attachment, attached_data)
 
-        if type(attached_data) == pd.DataFrame:
-            str_data = attached_data.to_csv()
-        else:
-            str_data = str(attached_data)
-
-        self.attached_data[data_name] = str_data
-        print(f"Data added: {data_name}; data type: {type(attached_data)}; data size: {len(str_data)} characters")
-
-    def ask(self, prompt: str, display_response=None, with_guideline=True, with_data=True, with_history=True) -> str:
-        """Generate text using the specified LLM model."""
+    def ask(self, prompt: str, display_response=None, with_guideline=True, with_data=True, with_history=True, use_cache=True, dry_run=False) -> str:
+        """Generate text using the specified LLM model.
+        With dry_run=True, nothing is sent: the token budget plan for the request is printed and returned."""
 
         # deal with display parameter
         if display_response is None:  display_response = self.display_response
 
-        messages = []
+        segments = self._build_segments(prompt, with_guideline=with_guideline, with_data=with_data, with_history=with_history)
 
-        ## --- create system message ---
-        system_msg = ''
+        if dry_run:
+            from .token_budget import print_plan
+            plan = self._get_budget_planner().plan(segments)
+            print_plan(plan)
+            return plan
 
-        # add system message from guideline
-        if with_guideline and len(self.guideline) > 0:
-            for key, guideline in self.guideline.items():
-                system_msg += f"[Guideline: {key} Start]\n"
-                system_msg += guideline + "\n"
-                system_msg += f"[Guideline: {key} End]\n\n"
+        messages, max_tokens = self._plan_messages(segments)
 
-        # add system message from data attachments
-        if with_data and len(self.attached_data) > 0:
-            data_blocks = []
-            for key, str_data in self.attached_data.items():
-                data_blocks.append(f"[Data: {key} Start]\n{str_data}\n[Data: {key} End]")
+        # answer from the semantic cache when a similar prompt was already asked in the same context
+        cache_scope, cache_hit = self._cache_lookup(prompt, messages, use_cache)
 
-            system_msg += "\n\n".join(data_blocks)
+        # Use chat_completion
+        self.latest_messages = messages
+        if cache_hit is not None:
+            response_text = cache_hit['response']
+        else:
+            response_text = self._complete(messages, max_tokens=max_tokens)
+            if cache_scope is not None:
+                self.semantic_cache.add(prompt, response_text, scope=cache_scope)
+
+        # store prompt/response in history; added together (as in ask_stream) so concurrent
+        # questions keep user/assistant turns alternating, and a failed request adds nothing
+        with self._history_lock:
+            self.chat_history.append({"role": "user", "content": prompt})
+            self.chat_history.append({"role": "assistant", "content": response_text})
+
+        if display_response:
+            display(Markdown(response_text))
+        else:
+            return response_text
+
+    def ask_stream(self, prompt: str, with_guideline=True, with_data=True, with_history=True, use_cache=True):
+        """
+        Generate text like ask(), yielding the response in chunks as they arrive.
+        The request goes through the same budget planner, semantic cache and cascade
+        as ask(); a cached or cascaded answer arrives as a single chunk, since a
+        cascade needs the whole answer to decide whether to escalate.
+        """
+
+        segments = self._build_segments(prompt, with_guideline=with_guideline, with_data=with_data, with_history=with_history)
+        messages, max_tokens = self._plan_messages(segments)
+        self.latest_messages = messages
 
+        response_text = ''
+        failed = False
+        try:
+            cache_scope, cache_hit = self._cache_lookup(prompt, messages, use_cache)
+            if cache_hit is not None:
+                response_text = cache_hit['response']
+                yield response_text
+                return
+
+            if self.cascade is not None:
+                response_text = self._complete(messages, max_tokens=max_tokens)
+                yield response_text
+            else:
+                for chunk in scheduled_stream(lambda: self.client.chat_completion(
+                    model=self.llm_models[self.model_name],
+                    messages=messages,
+                    max_tokens=max_tokens or self.config['max_tokens'],
+                    temperature=self.config['temperature'],
+                    stream=True
+                ), self.scheduler_session):
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        response_text += delta
+                        yield delta
+
+            # only complete answers are cached (not reached when the consumer stops early)
+            if cache_scope is not None:
+                self.semantic_cache.add(prompt, response_text, scope=cache_scope)
+        except GeneratorExit:
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # keep whatever was received, also when the consumer stops early; the pair is added
+            # together so concurrent streams (chat_widget) keep user/assistant turns alternating.
+            # A failed request leaves no unanswered question behind, as in ask().
+            if not failed:
+                with self._history_lock:
+                    self.chat_history.append({"role": "user", "content": prompt})
+                    self.chat_history.append({"role": "assistant", "content": response_text})
+
+    def _plan_messages(self, segments: list) -> tuple:
+        """Messages for segments and the max_tokens to request, trimmed by the budget planner when enabled."""
+
+        # count tokens before sending, trimming what does not fit
+        max_tokens = None
+        if self.budget_planner is not None:
+            plan = self.budget_planner.plan(segments)
+            if plan['trimmed']:
+                print(f"⚠️ Request trimmed to fit the context window ({plan['input_tokens']} input tokens)")
+            segments = plan['segments']
+            max_tokens = plan['max_tokens']
+        return self._messages_from_segments(segments), max_tokens
+
+    def _cache_lookup(self, prompt: str, messages: list, use_cache: bool=True) -> tuple:
+        """(cache scope, hit) from the semantic cache; the scope is None when the cache is not used."""
+        if not use_cache or self.semantic_cache is None:
+            return None, None
+        cache_scope = self._cache_scope(messages)
+        cache_hit = self.semantic_cache.lookup(prompt, scope=cache_scope)
+        if cache_hit is not None:
+            print(f"(cached answer, similarity {cache_hit['similarity']:.3f} to: {cache_hit['prompt']!r})")
+        return cache_scope, cache_hit
+
+    def enable_semantic_cache(self, threshold: float=None, embedder=None, max_entries: int=10000,
+                              max_total_entries: int=100000):
+        """Answer paraphrased prompts from a local semantic cache.
+        Entries are scoped by model, guidelines and attached data; chat history is not part of the scope.
+        The threshold defaults to the embedder's calibrated default_threshold."""
+        from .semantic_cache import SemanticCache
+        self.semantic_cache = SemanticCache(embedder=embedder, threshold=threshold, max_entries=max_entries,
+                                            max_total_entries=max_total_entries)
+        print(f"Semantic cache enabled (threshold: {self.semantic_cache.threshold})")
+
+    def _cache_scope(self, messages: list) -> str:
+        """Fingerprint of the model and system message (guidelines + attached data)."""
+        system_msg = messages[0]['content'] if messages and messages[0]['role'] == 'system' else ''
+        # hashing a large system message once per change is enough
+        with self._system_lock:
+            entries = list(self._system_cache.values())
+        entry = next((e for e in entries if e['system_msg'] is system_msg and system_msg), None)
+        if entry is not None and entry['scope'] is not None and entry['scope'][0] == self.model_name:
+            return entry['scope'][1]
+        scope = hashlib.sha256(f"{self.model_name}\n{system_msg}".encode('utf-8')).hexdigest()
+        if entry is not None:
+            entry['scope'] = (self.model_name, scope)
+        return scope
+
+    def map_dataframe(self, df: pd.DataFrame, template: str, output_col: str, rows_per_call: int=10, **kwargs) -> pd.DataFrame:
+        """Ask the LLM about every row of df and store the answers in output_col.
+        See llm_helper.dataframe_mapper.map_dataframe for the options."""
+        from .dataframe_mapper import map_dataframe
+        return map_dataframe(self, df, template, output_col, rows_per_call=rows_per_call, **kwargs)
+
+    def enable_budget_planner(self, policy=('history', 'data', 'guideline'), min_output_tokens: int=256, context_window: int=None):
+        """Count tokens before every ask() and trim segments that do not fit in the context window.
+        policy is the order in which segment kinds are trimmed; max_tokens is set from the remaining window."""
+        from .token_budget import BudgetPlanner, get_tokenizer
+        self.budget_planner = BudgetPlanner(
+            get_tokenizer(self.llm_models[self.model_name]),
+            context_window=context_window or context_windows.get(self.model_name, 8192),
+            max_output_tokens=self.config['max_tokens'],
+            min_output_tokens=min_output_tokens,
+            policy=policy,
+        )
+        print(f"Budget planner enabled (context window: {self.budget_planner.context_window} tokens)")
+
+    def _get_budget_planner(self):
+        if self.budget_planner is None:
+            from .token_budget import BudgetPlanner, get_tokenizer
+            return BudgetPlanner(get_tokenizer(self.llm_models[self.model_name]),
+                                 context_window=context_windows.get(self.model_name, 8192),
+                                 max_output_tokens=self.config['max_tokens'])
+        return self.budget_planner
+
+    def _build_segments(self, prompt: str, with_guideline=True, with_data=True, with_history=True) -> list:
+        """Split the request into segments (guidelines, data blocks, history messages, prompt)."""
+
+        # guideline and data segments are cached and shared between calls
+        segments = list(self._system_entry(with_guideline, with_data)['segments'])
+
+        # prepare full prompt with chat history
+        if with_history:
+            with self._history_lock:
+                history = list(self.chat_history)
+            for i, message in enumerate(history):
+                segments.append({'kind': 'history', 'name': i, 'role': message['role'], 'content': message['content']})
+
+        segments.append({'kind': 'prompt', 'name': 'prompt', 'role': 'user', 'content': prompt})
+        return segments
+
+    def _system_entry(self, with_guideline=True, with_data=True) -> dict:
+        """
+        Cached guideline/data segments and the system message assembled from them.
+
+        Rebuilt only when a guideline or attachment changed; unchanged guideline blocks
+        are reused and data blocks are rendered once per version by the attachment store.
+        Blocks are ordered by their last change across guidelines and data (data
+        first initially), so blocks that do not change keep a byte-identical prefix
+        that provider-side prefix/KV caches can reuse, and a changed or new block
+        moves to the end. Messages with
+        spilled attachments are not cached: their text stays on disk between requests.
+        """
+
+        # the chat widget assembles messages from several threads
+        with self._system_lock:
+            fingerprint = (tuple(self.guideline.items()) if with_guideline else (),
+                           self.attached_data.version if with_data else None)
+            entry = self._system_cache.get((with_guideline, with_data))
+            if entry is not None and entry['fingerprint'] == fingerprint:
+                return entry
+
+            for kind, name in list(self._blocks):
+                if name not in (self.guideline if kind == 'guideline' else self.attached_data):
+                    del self._blocks[(kind, name)]
+
+            # large data blocks are stamped first, so editing a small guideline keeps them in the prefix
+            blocks = []
+            spilled = False
+            if with_data:
+                for key in self.attached_data:
+                    attachment = self.attached_data.attachment(key)
+                    block = self._blocks.get(('data', key))
+                    if block is None or block[0] != attachment.version:
+                        block = self._stamp_block(('data', key), attachment.version, None)
+                    # the store keeps in-memory blocks; this only references them
+                    segment = {'kind': 'data', 'name': key, 'content': self.attached_data.block(key)}
+                    blocks.append((block[0], block[1], segment))
+                    spilled = spilled or attachment.kind == 'spilled'
+
+            if with_guideline:
+                for key, guideline in self.guideline.items():
+                    block = self._blocks.get(('guideline', key))
+                    if block is None or block[0] != guideline:
+                        block = self._stamp_block(('guideline', key), guideline, {
+                            'kind': 'guideline', 'name': key,
+                            'content': f"[Guideline: {key} Start]\n{guideline}\n[Guideline: {key} End]\n\n"
+                        })
+                    blocks.append(block)
+
+            segments = [block[2] for block in sorted(blocks, key=lambda b: b[1])]
+            entry = {
+                'fingerprint': fingerprint,
+                'segments': segments,
+                'system_msg': self._join_system_message(segments),
+                'scope': None,
+            }
+            if spilled:
+                self._system_cache.pop((with_guideline, with_data), None)
+            else:
+                self._system_cache[(with_guideline, with_data)] = entry
+            return entry
+
+    def _stamp_block(self, key: tuple, content_key, segment) -> tuple:
+        self._change_stamp += 1
+        self._blocks[key] = (content_key, self._change_stamp, segment)
+        return self._blocks[key]
+
+    @staticmethod
+    def _join_system_message(segments: list) -> str:
+        # guideline blocks end with a blank line; data blocks are separated by one
+        parts = []
+        for i, s in enumerate(segments):
+            parts.append(s['content'])
+            if s['kind'] == 'data' and i < len(segments) - 1:
+                parts.append("\n\n")
+        return "".join(parts)
+
+    def _messages_from_segments(self, segments: list) -> list:
+        """Turn segments back into chat messages, guidelines and data forming the system message."""
+
+        system_segments = [s for s in segments if s['kind'] in ('guideline', 'data')]
+        system_msg = None
+        # reuse the cached system message unless the budget planner changed the segments
+        with self._system_lock:
+            entries = list(self._system_cache.values())
+        for entry in entries:
+            cached = entry['segments']
+            if len(cached) == len(system_segments) and all(a is b for a, b in zip(cached, system_segments)):
+                system_msg = entry['system_msg']
+                break
+        if system_msg is None:
+            system_msg = self._join_system_message(system_segments)
+
+        messages = []
         ## add system message if exists
         if system_msg:
             messages.append({"role": "system", "content": system_msg})
 
-        # prepare full prompt with chat history
-        if with_history:
-            messages.extend(self.chat_history)
+        messages.extend({"role": s['role'], "content": s['content']} for s in segments if s['kind'] in ('history', 'prompt'))
+        return messages
 
-        # append to chat history
-        self.chat_history.append({"role": "user", "content": prompt})
+    def _build_system_message(self, with_guideline=True, with_data=True) -> str:
+        """Assemble the system message from guidelines and attached data."""
+        return self._system_entry(with_guideline=with_guideline, with_data=with_data)['system_msg']
 
-        messages.append({"role": "user", "content": prompt})
+    def _build_messages(self, prompt: str, with_guideline=True, with_data=True, with_history=True) -> list:
+        """Build the chat messages for prompt, without modifying the chat history."""
+        return self._messages_from_segments(
+            self._build_segments(prompt, with_guideline=with_guideline, with_data=with_data, with_history=with_history)
+        )
 
-        # Use chat_completion
-        self.latest_messages = messages
-        response = self.client.chat_completion(
-            model=self.llm_models[self.model_name],
+    def set_cascade(self, models: Optional[List[str]], check: Optional[Callable[[str], bool]]=None,
+                    confidence: Optional[Callable[[str], float]]=None, min_confidence: Optional[float]=None,
+                    costs: Optional[List[float]]=None):
+        """
+        Answer with a cascade of models (keys of llm_models), cheapest first: each
+        answer goes to the next model when it is empty, when check(answer) is False, or
+        when confidence(answer) is below min_confidence; the last model's answer is
+        always used. Applies to ask() and ask_stream() (which then yields the chosen
+        answer as one chunk). None turns the cascade off. Returns the ModelCascade,
+        whose report() shows the per-tier hit rates.
+        """
+
+        from .cascade import ModelCascade
+
+        if models is None:
+            self.cascade = None
+            return None
+        if min_confidence is not None and confidence is None:
+            # the cascade's default score counts filled fields of a dict; answers here are plain text
+            raise ValueError("min_confidence needs a confidence function that scores an answer string")
+        unknown = [m for m in models if m not in self.llm_models]
+        if unknown:
+            raise ValueError(f"Unknown models: {unknown} (expected keys of llm_models: {list(self.llm_models)})")
+
+        self.cascade = ModelCascade(models, confidence=confidence, min_confidence=min_confidence, costs=costs)
+        self.cascade_check = check
+        print(f"Cascade: {' -> '.join(models)}")
+        return self.cascade
+
+    def _complete(self, messages: list, max_tokens: int=None) -> str:
+        """Send messages to the model (or up the cascade) and return the response text. Stateless."""
+
+        if self.cascade is not None:
+            last = self.cascade.tiers[-1]
+            return self.cascade.run(lambda model_name: self._complete_tier(
+                model_name, messages, max_tokens, final=(model_name == last)
+            ))
+        return self._complete_with(self.model_name, messages, max_tokens)
+
+    def _complete_tier(self, model_name: str, messages: list, max_tokens: int=None, final: bool=False) -> str:
+        from .cascade import Escalate
+
+        text = self._complete_with(model_name, messages, max_tokens)
+        if final:
+            # the strongest model's answer is used as it is
+            return text
+        if not (text or '').strip():
+            raise Escalate('empty answer')
+        if self.cascade_check is not None and not self.cascade_check(text):
+            raise Escalate('check failed')
+        return text
+
+    def _complete_with(self, model_name: str, messages: list, max_tokens: int=None) -> str:
+        response = scheduled_call(
+            self.client.chat_completion, self.scheduler_session,
+            model=self.llm_models[model_name],
             messages=messages,
-            max_tokens=self.config['max_tokens'],
+            max_tokens=max_tokens or self.config['max_tokens'],
             temperature=self.config['temperature']
         )
-
-        # store prompt/response in history
-        self.chat_history.append({"role": "assistant", "content": response.choices[0].message.content})
-
-        if display_response:
-            display(Markdown(response.choices[0].message.content))
-        else:
-            return response.choices[0].message.content
+        return response.choices[0].message.content
         
         
-    def chat_widget(self):
+    def chat_widget(self, max_in_flight: int=4):
+        """
+        Interactive chat in a notebook. Questions run on a background thread pool, so the
+        kernel stays responsive; each question gets its own card with a busy indicator,
+        elapsed time, the answer streamed in as it arrives, and a Stop button.
+        Up to max_in_flight questions are answered concurrently.
+        """
+
+        if self._widget_executor is None:
+            self._widget_executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='chat-widget')
+        executor = self._widget_executor
 
         text_in = widgets.Textarea(placeholder="Ask anything...", layout={'height': '100px', 'width': '100%'})
         button = widgets.Button(description=f"Ask {self.model_name}", button_style="success")
         checkbox_guideline = widgets.Checkbox(value=True, description='Use Guideline')
         checkbox_data = widgets.Checkbox(value=True, description='Use Attached Data')
-        output = widgets.Output()
+        in_flight_label = widgets.HTML()
+        cards = widgets.VBox()
+
+        active = {}     # card id -> status updater
+        lock = threading.Lock()
+
+        def update_in_flight():
+            n = len(active)
+            in_flight_label.value = f"<i>⏳ {n} question{'s' if n != 1 else ''} in flight</i>" if n else ""
+
+        def tick():
+            # refresh the elapsed time of every running question
+            while True:
+                with lock:
+                    if not active:
+                        return
+                    updaters = list(active.values())
+                for update in updaters:
+                    update()
+                time.sleep(0.5)
 
         def on_ask(b):
-            with output:
-                output.clear_output()
-                prompt = text_in.value
-                if not prompt.strip():
-                    return
-                display(Markdown(f"**Q:** {prompt}"))
-                
-                # Use the ask method with checkbox values
-                response = self.ask(
-                    prompt=prompt,
-                    display_response=False,
-                    with_guideline=checkbox_guideline.value,
-                    with_data=checkbox_data.value,
-                    with_history=True
-                )
-                display(Markdown(f"**A:** {response}"))
-                text_in.value = ""  # Clear the input box after asking
+            prompt = text_in.value
+            if not prompt.strip():
+                return
+            text_in.value = ""  # Clear the input box after asking
+
+            options = dict(with_guideline=checkbox_guideline.value, with_data=checkbox_data.value, with_history=True)
+            status = widgets.HTML()
+            stop_button = widgets.Button(description="Stop", button_style="danger", icon="stop",
+                                         layout={'width': '80px'})
+            answer = widgets.Output()
+            card = widgets.VBox([
+                widgets.HBox([widgets.HTML(f"<b>Q:</b> {_escape_html(prompt)}"), stop_button]),
+                status, answer
+            ], layout={'border': '1px solid #ddd', 'padding': '4px', 'margin': '4px 0'})
+            cards.children = cards.children + (card,)
+
+            stop = threading.Event()
+            started = time.monotonic()
+            state = {'phase': 'Waiting for the model'}
+
+            def show_status():
+                with lock:
+                    if id(card) in active:
+                        status.value = f"<i>⏳ {state['phase']}… {time.monotonic() - started:.1f}s</i>"
+
+            def finish(message: str):
+                # first caller wins: the Stop button or the worker
+                with lock:
+                    if active.pop(id(card), None) is None:
+                        return
+                    status.value = f"<i>{message} {time.monotonic() - started:.1f}s</i>"
+                stop_button.disabled = True
+                update_in_flight()
+
+            def on_stop(_):
+                # the UI is released right away; the worker closes the stream at its next chunk
+                stop.set()
+                finish("⏹ Stopped after")
+
+            stop_button.on_click(on_stop)
+
+            def run():
+                response_text = ''
+                last_render = 0.0
+                try:
+                    if stop.is_set():
+                        return
+                    stream = self.ask_stream(prompt, **options)
+                    try:
+                        for chunk in stream:
+                            if stop.is_set():
+                                break
+                            response_text += chunk
+                            state['phase'] = 'Answering'
+                            now = time.monotonic()
+                            if now - last_render > 0.2:
+                                _render_markdown(answer, f"**A:** {response_text}")
+                                last_render = now
+                    finally:
+                        # closing the stream ends the request
+                        stream.close()
+                    _render_markdown(answer, f"**A:** {response_text}")
+                    finish("✅ Answered in")
+                except Exception as e:
+                    finish(f"❌ {_escape_html(str(e))} after")
+
+            with lock:
+                start_ticker = not active
+                active[id(card)] = show_status
+            show_status()
+            update_in_flight()
+            if start_ticker:
+                threading.Thread(target=tick, daemon=True).start()
+            executor.submit(run)
 
         button.on_click(on_ask)
 
         display(widgets.HBox([checkbox_guideline, checkbox_data]))
-        display(text_in, button, output)
+        display(text_in, widgets.HBox([button, in_flight_label]), cards)
+
+
+def _escape_html(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _render_markdown(output, text: str):
+    # assigning the outputs trait is safe from a background thread; clear_output() and
+    # `with output:` capture through the kernel's current output context, which is not
+    output.outputs = ({'output_type': 'display_data', 'metadata': {},
+                       'data': {'text/markdown': text, 'text/plain': text}},)
 
 
 
@@ -164,27 +596,63 @@ config_google = types.GenerateContentConfig(
 
 
 class AIHelper_Google():
-    def __init__(self, model: str='gemini-2.5-flash', path_env: str='', display_response: bool=True):
+    def __init__(self, model: str='gemini-2.5-flash', path_env: str='', display_response: bool=True,
+                 client=None, cache_ttl: int=3600, min_cache_chars: int=32000):
 
-        self.client = genai.Client() 
+        self.client = client if client is not None else genai.Client() 
         self.model = model
         self.config = config_google
 
 
         self.history = []
         self.display_response = display_response
-
-    def ask(self, prompt: str, display_response=None) -> str:
+        self.scheduler_session = f"AIHelper_Google-{id(self):x}"
+
+        # attachments are uploaded once into a Gemini context cache when they are large enough
+        self.attached_data = AttachmentStore()
+        self.cache_ttl = cache_ttl                  # seconds
+        self.cache_refresh_margin = 60              # extend the TTL when less than this is left
+        self.min_cache_chars = min_cache_chars      # smaller attachments are sent inline (caching has a minimum size)
+        self.cached_content = None
+        self._cache_expires_at = 0.0
+        self._cache_dirty = False
+        self._data_text_cache = None
+
+    def attach_data(self, data_name: str, attached_data, spill=None):
+        """Add data to the chat. Large data is uploaded once into a context cache and reused by later asks."""
+        attachment = self.attached_data.add(data_name, attached_data, spill=spill)
+        self._cache_dirty = True
+        _print_attachment(attachment, attached_data)
+
+    def ask(self, prompt: str, display_response=None, with_data=True) -> str:
         """Generate text using the specified LLM model."""
 
         # deal with display parameter
         if display_response is None:  display_response = self.display_response
-        
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=prompt,
-            config=self.config
-        )
+
+        contents = prompt
+        config = self.config
+        if with_data and self.attached_data:
+            if self._data_chars() >= self.min_cache_chars:
+                config = self.config.model_copy(update={'tools': None, 'cached_content': self._ensure_cache()})
+            else:
+                contents = self._data_text() + "\n\n" + prompt
+
+        try:
+            response = scheduled_call(
+                self.client.models.generate_content, self.scheduler_session,
+                model=self.model,
+                contents=contents,
+                config=config
+            )
+        except Exception as e:
+            # the cache expired or was deleted on the server: upload again once
+            if config.cached_content is None or getattr(e, 'code', None) not in (403, 404):
+                raise
+            self.cached_content = None
+            config = self.config.model_copy(update={'tools': None, 'cached_content': self._ensure_cache()})
+            response = scheduled_call(self.client.models.generate_content, self.scheduler_session,
+                                      model=self.model, contents=contents, config=config)
 
         # store prompt/response in history
         self.history.append((prompt, response.text))
@@ -192,4 +660,79 @@ class AIHelper_Google():
         if display_response:
             display(Markdown(response.text))
         else:
-            return response.text
\ No newline at end of file
+            return response.text
+
+    def clear_cache(self):
+        """Delete the context cache on the server (also done automatically when attachments change)."""
+        if self.cached_content is not None:
+            try:
+                self.client.caches.delete(name=self.cached_content)
+            except Exception as e:
+                print(f"⚠️ Could not delete context cache {self.cached_content}: {e}")
+            self.cached_content = None
+            self._cache_expires_at = 0.0
+
+    def close(self):
+        """Release server-side resources held by this helper."""
+        self.clear_cache()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _data_text(self) -> str:
+        # same stable ordering as AIHelper: least recently changed attachments first
+        if self._data_text_cache is not None and self._data_text_cache[0] == self.attached_data.version:
+            return self._data_text_cache[1]
+        keys = sorted(self.attached_data, key=lambda k: self.attached_data.attachment(k).version)
+        text = "\n\n".join(self.attached_data.block(key) for key in keys)
+        # only inline data is sent on every ask; cached data is uploaded once and not kept here
+        if len(text) < self.min_cache_chars:
+            self._data_text_cache = (self.attached_data.version, text)
+        return text
+
+    def _data_chars(self) -> int:
+        return self.attached_data.text_chars()
+
+    def _ensure_cache(self) -> str:
+        """Return the name of an up-to-date context cache, creating or extending it as needed."""
+
+        if self.cached_content is not None and self._cache_dirty:
+            self.clear_cache()
+
+        if self.cached_content is not None and self._cache_expires_at <= time.time():
+            # already expired on the server, nothing to delete
+            self.cached_content = None
+
+        if self.cached_content is None:
+            # tools cannot be passed together with cached content, so they live in the cache
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"llm-helper-{'-'.join(self.attached_data)}"[:128],
+                    contents=[types.Content(role='user', parts=[types.Part(text=self._data_text())])],
+                    tools=self.config.tools,
+                    ttl=f"{self.cache_ttl}s",
+                )
+            )
+            self.cached_content = cache.name
+            self._cache_expires_at = time.time() + self.cache_ttl
+            self._cache_dirty = False
+            print(f"Context cache created: {cache.name} ({self._data_chars()} characters, TTL {self.cache_ttl}s)")
+
+        elif self._cache_expires_at - time.time() < self.cache_refresh_margin:
+            try:
+                self.client.caches.update(
+                    name=self.cached_content,
+                    config=types.UpdateCachedContentConfig(ttl=f"{self.cache_ttl}s")
+                )
+                self._cache_expires_at = time.time() + self.cache_ttl
+            except Exception as e:
+                if getattr(e, 'code', None) not in (403, 404):
+                    raise
+                self.cached_content = None
+                return self._ensure_cache()
+
+        return self.cached_content
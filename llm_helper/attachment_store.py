@@ -0,0 +1,258 @@
+"""Attachment storage for the helpers: lazy serialization, versioned rendered blocks, optional disk spill."""
+
+from typing import Any, Dict, Iterator, List, Optional
+from collections.abc import MutableMapping
+import os
+import shutil
+import tempfile
+import weakref
+
+
+class Attachment():
+    """
+    One attached object. DataFrames are copied at attach time (or spilled to an
+    Arrow file), so later changes to the caller's frame are not sent, and rendered
+    to CSV only when a request needs them; the rendered
+    "[Data: name Start] ... [Data: name End]" block is then kept until the
+    attachment is replaced, so the serialization happens at most once per version.
+    """
+
+    def __init__(self, name: str, data: Any, version: int, spill_path: Optional[str]=None):
+        import pandas as pd
+
+        self.name = name
+        self.version = version
+        self.spill_path = spill_path
+        self.frame = None
+        self.source_type = type(data).__name__
+
+        self.header = f"[Data: {name} Start]\n"
+        self.footer = f"\n[Data: {name} End]"
+
+        self._block = None          # rendered block, in memory
+        self._block_path = None     # rendered block of a spilled attachment, on disk
+        self._text_chars = None
+
+        if isinstance(data, pd.DataFrame):
+            self.kind = 'dataframe'
+            self.shape = data.shape
+            self.frame_bytes = int(data.memory_usage(deep=True).sum())
+            if spill_path is not None:
+                self.kind = 'spilled'
+                self._spill(data)
+            else:
+                # a snapshot, as the serialized text used to be: the rendered block stays valid per version
+                self.frame = data.copy(deep=True)
+        else:
+            # text is stored directly as its rendered block: one copy, nothing left to serialize
+            self.kind = 'text'
+            self.shape = None
+            self.frame_bytes = 0
+            self._set_block(str(data))
+
+    def block(self) -> str:
+        """The rendered data block, serialized on first use."""
+        if self._block is not None:
+            return self._block
+        if self._block_path is not None:
+            with open(self._block_path, 'r', encoding='utf-8') as fh:
+                return fh.read()
+
+        if self.kind == 'spilled':
+            # stream the memory-mapped table back in record batches, so only one batch is converted at a time
+            import pyarrow as pa
+            parts = []
+            with pa.memory_map(self.spill_path, 'r') as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    frame = reader.get_batch(i).to_pandas()
+                    parts.append(frame.to_csv(header=(i == 0)))
+                if reader.num_record_batches == 0:
+                    parts.append(reader.schema.empty_table().to_pandas().to_csv())
+            text = "".join(parts)
+            del parts
+            self._block_path = self.spill_path + '.block.txt'
+            block = self.header + text + self.footer
+            with open(self._block_path, 'w', encoding='utf-8') as fh:
+                fh.write(block)
+            self._text_chars = len(text)
+            return block
+
+        self._set_block(self.frame.to_csv())
+        return self._block
+
+    def text(self) -> str:
+        """The serialized data without the block markers."""
+        block = self.block()
+        return block[len(self.header):len(block) - len(self.footer)]
+
+    def text_chars(self) -> int:
+        if self._text_chars is None:
+            self.block()
+        return self._text_chars
+
+    def drop_rendered(self):
+        """Free the rendered block; it is rebuilt on the next use."""
+        if self.kind == 'text':
+            return
+        self._block = None
+        self._text_chars = None
+        if self._block_path is not None:
+            os.remove(self._block_path)
+            self._block_path = None
+
+    def release(self):
+        """Delete the spill files of this attachment."""
+        self.drop_rendered()
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Resident and on-disk bytes of this attachment."""
+        # str is stored as UTF-8 or UCS-1/2/4 internally; len() is a close enough estimate for ASCII-heavy CSV
+        rendered_bytes = len(self._block) if self._block is not None else 0
+        disk_bytes = sum(os.path.getsize(p) for p in (self.spill_path, self._block_path) if p and os.path.exists(p))
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'version': self.version,
+            'shape': self.shape,
+            'frame_bytes': self.frame_bytes if self.frame is not None else 0,
+            'rendered_bytes': rendered_bytes,
+            'resident_bytes': (self.frame_bytes if self.frame is not None else 0) + rendered_bytes,
+            'disk_bytes': disk_bytes,
+        }
+
+    def _set_block(self, text: str):
+        self._block = self.header + text + self.footer
+        self._text_chars = len(text)
+
+    def _spill(self, frame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        with pa.OSFile(self.spill_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=65536)
+
+
+class AttachmentStore(MutableMapping):
+    """
+    Mapping of attachment name -> Attachment, used as `attached_data` by the helpers.
+
+    Every change bumps `version`, so code that caches something derived from the
+    attachments (a system message, a server-side context cache) can tell whether it
+    is still current. DataFrames larger than `spill_threshold_bytes` (or attached with
+    spill=True) are written to an Arrow IPC file in `spill_dir` and read back through
+    a memory map when they are rendered, so the store does not keep them in memory.
+    A temporary spill directory is deleted when its last spilled attachment is
+    removed, and at the latest when the store is garbage collected.
+
+    Args:
+        spill_dir (str, optional): Directory for spill files. Default: a temporary directory.
+        spill_threshold_bytes (int, optional): Spill DataFrames at least this large. Default: never.
+    """
+
+    def __init__(self, spill_dir: Optional[str]=None, spill_threshold_bytes: Optional[int]=None):
+        self.spill_dir = spill_dir
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self.version = 0
+        self._items = {}
+        self._temp_dir = None       # finalizer of the spill directory created by the store
+
+    def add(self, name: str, data: Any, spill: Optional[bool]=None) -> Attachment:
+        """Attach (or replace) data under name; returns the Attachment."""
+        import pandas as pd
+
+        if spill is None:
+            spill = (isinstance(data, pd.DataFrame) and self.spill_threshold_bytes is not None
+                     and data.memory_usage(deep=True).sum() >= self.spill_threshold_bytes)
+
+        spill_path = None
+        if spill and isinstance(data, pd.DataFrame):
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix='llm-helper-attachments-')
+                self._temp_dir = weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+            os.makedirs(self.spill_dir, exist_ok=True)
+            spill_path = os.path.join(self.spill_dir, f"attachment-{self.version + 1}.arrow")
+
+        if name in self._items:
+            self._items[name].release()
+
+        self.version += 1
+        attachment = Attachment(name, data, self.version, spill_path=spill_path)
+        self._items[name] = attachment
+        self._remove_temp_dir()
+        return attachment
+
+    def __setitem__(self, name: str, data: Any):
+        self.add(name, data)
+
+    def __getitem__(self, name: str) -> str:
+        """The serialized data of an attachment (as the former dict of strings)."""
+        return self._items[name].text()
+
+    def __delitem__(self, name: str):
+        self._items.pop(name).release()
+        self.version += 1
+        self._remove_temp_dir()
+
+    def __contains__(self, name: object) -> bool:
+        # Mapping's default goes through __getitem__, which renders the block
+        return name in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def attachment(self, name: str) -> Attachment:
+        return self._items[name]
+
+    def block(self, name: str) -> str:
+        """Rendered "[Data: name Start] ... [Data: name End]" block, serialized at most once per version."""
+        return self._items[name].block()
+
+    def text_chars(self) -> int:
+        """Total characters of the serialized attachments."""
+        return sum(a.text_chars() for a in self._items.values())
+
+    def resident_bytes(self) -> int:
+        """Memory owned by the store: DataFrame copies and rendered blocks."""
+        return sum(a.memory_report()['resident_bytes'] for a in self._items.values())
+
+    def drop_rendered(self):
+        """Free all rendered blocks, e.g. after a large one-off request."""
+        for a in self._items.values():
+            a.drop_rendered()
+
+    def clear(self):
+        for a in self._items.values():
+            a.release()
+        self._items.clear()
+        self.version += 1
+        self._remove_temp_dir()
+
+    def _remove_temp_dir(self):
+        # only a directory the store created, once nothing is spilled into it anymore
+        if self._temp_dir is None or any(a.kind == 'spilled' for a in self._items.values()):
+            return
+        self._temp_dir()
+        self._temp_dir = None
+        self.spill_dir = None
+
+    def memory_report(self) -> List[Dict[str, Any]]:
+        """One row per attachment with its kind, version, and frame/rendered/resident/disk bytes."""
+        return [a.memory_report() for a in self._items.values()]
+
+    def report(self):
+        """Print the memory report."""
+        rows = self.memory_report()
+        print(f"Attachments: {len(rows)} (version {self.version}), "
+              f"{sum(r['resident_bytes'] for r in rows) / 1024 ** 2:.1f} MB resident, "
+              f"{sum(r['disk_bytes'] for r in rows) / 1024 ** 2:.1f} MB on disk")
+        for r in rows:
+            print(f"  {r['name'][:30]:<30} {r['kind']:<9} v{r['version']:<4} "
+                  f"frame {r['frame_bytes'] / 1024 ** 2:>8.1f} MB  rendered {r['rendered_bytes'] / 1024 ** 2:>8.1f} MB  "
+                  f"disk {r['disk_bytes'] / 1024 ** 2:>8.1f} MB")
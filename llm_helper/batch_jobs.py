@@ -0,0 +1,469 @@
+"""Offline extraction through provider batch APIs: submit rendered prompts as a batch-job file, poll, download."""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import datetime
+import json
+import os
+import time
+
+from langchain_core.exceptions import OutputParserException
+
+from .info_extractor import local_repair
+from .job_runner import ExtractionJob
+
+
+_roles = {'system': 'system', 'human': 'user', 'ai': 'assistant'}
+
+
+def to_chat_messages(messages: List[Any]) -> List[Dict[str, str]]:
+    """LangChain messages (e.g. from ChatPromptTemplate.format_messages) as [{'role', 'content'}] dicts."""
+    return [{'role': _roles.get(m.type, m.type), 'content': m.content} for m in messages]
+
+
+def openai_request(custom_id: str, messages: List[Dict[str, str]], model: str,
+                   temperature: Optional[float]=None) -> Dict[str, Any]:
+    """One line of an OpenAI batch input file (/v1/chat/completions)."""
+    body = {'model': model, 'messages': messages}
+    if temperature is not None:
+        body['temperature'] = temperature
+    return {'custom_id': custom_id, 'method': 'POST', 'url': '/v1/chat/completions', 'body': body}
+
+
+def gemini_request(key: str, messages: List[Dict[str, str]], temperature: Optional[float]=None) -> Dict[str, Any]:
+    """One line of a Gemini batch input file (a keyed GenerateContentRequest)."""
+    system = "\n\n".join(m['content'] for m in messages if m['role'] == 'system')
+    request = {'contents': [
+        {'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [{'text': m['content']}]}
+        for m in messages if m['role'] != 'system'
+    ]}
+    if system:
+        request['system_instruction'] = {'parts': [{'text': system}]}
+    if temperature is not None:
+        request['generation_config'] = {'temperature': temperature}
+    return {'key': key, 'request': request}
+
+
+def request_id(line: Dict[str, Any]) -> str:
+    """The item key of a batch input or output line, in either format."""
+    return str(line.get('custom_id', line.get('key')))
+
+
+def parse_output_line(line: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Read one line of a batch output file (OpenAI or Gemini format).
+
+    Returns:
+        tuple: (request id, response text or None, error message or None)
+    """
+
+    key = request_id(line)
+    if line.get('error'):
+        error = line['error']
+        return key, None, (error.get('message') or json.dumps(error)) if isinstance(error, dict) else str(error)
+
+    response = line.get('response') or {}
+    if 'body' in response:
+        # OpenAI: {"response": {"status_code": 200, "body": <chat completion>}}
+        if response.get('status_code', 200) != 200:
+            return key, None, f"HTTP {response.get('status_code')}: {json.dumps(response.get('body'))[:500]}"
+        choices = response['body'].get('choices') or []
+        if not choices:
+            return key, None, "Response has no choices"
+        return key, choices[0].get('message', {}).get('content') or '', None
+
+    # Gemini: {"response": <GenerateContentResponse>}
+    candidates = response.get('candidates') or []
+    if not candidates:
+        reason = (response.get('promptFeedback') or response.get('prompt_feedback') or {}).get('blockReason')
+        return key, None, "Response has no candidates" + (f" (blocked: {reason})" if reason else "")
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return key, "".join(p.get('text', '') for p in parts), None
+
+
+class OpenAIBatchEndpoint():
+    """
+    Batch jobs through the OpenAI Batch API (files + batches, 24h completion window).
+
+    Args:
+        client (openai.OpenAI, optional): Default: OpenAI() configured from the environment.
+        completion_window (str): The batch completion window.
+    """
+
+    format = 'openai'
+
+    def __init__(self, client=None, completion_window: str='24h'):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, path: str, model: str, display_name: Optional[str]=None) -> str:
+        with open(path, 'rb') as fh:
+            input_file = self.client.files.create(file=fh, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id, endpoint='/v1/chat/completions',
+            completion_window=self.completion_window,
+            metadata={'description': display_name} if display_name else None,
+        )
+        return batch.id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        batch = self.client.batches.retrieve(job_id)
+        state = {'validating': 'running', 'in_progress': 'running', 'finalizing': 'running', 'cancelling': 'running',
+                 'completed': 'succeeded'}.get(batch.status, 'failed')
+        counts = batch.request_counts
+        return {
+            'state': state, 'detail': batch.status,
+            'completed': getattr(counts, 'completed', None), 'failed': getattr(counts, 'failed', None),
+            'total': getattr(counts, 'total', None),
+        }
+
+    def download(self, job_id: str, dest_path: str):
+        batch = self.client.batches.retrieve(job_id)
+        with open(dest_path, 'w', encoding='utf-8') as out:
+            # failed requests are reported in a separate error file
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    text = self.client.files.content(file_id).text
+                    out.write(text if text.endswith("\n") or not text else text + "\n")
+
+
+class GeminiBatchEndpoint():
+    """
+    Batch jobs through the Gemini Batch API (an uploaded JSONL file as the source).
+
+    Args:
+        client (google.genai.Client, optional): Default: genai.Client() configured from the environment.
+    """
+
+    format = 'gemini'
+
+    def __init__(self, client=None):
+        if client is None:
+            from google import genai
+            client = genai.Client()
+        self.client = client
+
+    def submit(self, path: str, model: str, display_name: Optional[str]=None) -> str:
+        from google.genai import types
+
+        uploaded = self.client.files.upload(
+            file=path, config=types.UploadFileConfig(display_name=display_name or os.path.basename(path),
+                                                     mime_type='jsonl')
+        )
+        job = self.client.batches.create(model=model, src=uploaded.name,
+                                         config={'display_name': display_name or os.path.basename(path)})
+        return job.name
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        job = self.client.batches.get(name=job_id)
+        detail = getattr(job.state, 'name', str(job.state))
+        if detail.endswith('SUCCEEDED'):
+            state = 'succeeded'
+        elif detail.endswith(('FAILED', 'CANCELLED', 'EXPIRED')):
+            state = 'failed'
+        else:
+            state = 'running'
+        return {'state': state, 'detail': detail, 'completed': None, 'failed': None, 'total': None}
+
+    def download(self, job_id: str, dest_path: str):
+        job = self.client.batches.get(name=job_id)
+        data = self.client.files.download(file=job.dest.file_name)
+        with open(dest_path, 'wb') as out:
+            out.write(data if isinstance(data, bytes) else data.encode('utf-8'))
+
+
+class BatchExtractionJob(ExtractionJob):
+    """
+    Runs an InfoExtractor over many items through a provider batch API instead of
+    one `invoke` per item: slower to finish (minutes to hours) but billed at batch
+    prices and outside the interactive rate limits, which suits overnight backfills.
+
+    Each round renders the base prompt of every pending item into a batch-job file
+    (`endpoint.format`: 'openai' or 'gemini' JSONL), submits it, polls until the job
+    is finished and downloads the output. Outputs go through the usual parsing
+    (with local repair) and DataSchema validation; results are checkpointed like
+    ExtractionJob records. Only the failures go into the next round: an output
+    that does not parse or validate is sent back with the fix prompt, a request the
+    provider failed is sent again unchanged. An item gets `max_retries` rounds.
+
+    The job state (round, provider job ids) is kept in `work_dir`, so a run can be
+    stopped at any time and resumed later, e.g. submit with run(items, wait=False)
+    in the evening and call run() again in the morning.
+
+    A model cascade set on the extractor is not used: every request goes to `model`.
+
+    Args:
+        extractor (InfoExtractor): A fully configured extractor.
+        endpoint: OpenAIBatchEndpoint, GeminiBatchEndpoint or mock_providers.MockBatchEndpoint.
+        checkpoint_path (str): Checkpoint of the results (see CheckpointStore).
+        work_dir (str): Request, output and state files of the batch rounds.
+        model (str, optional): Model of the batch requests. Default: the extractor's model.
+        max_retries (int): Rounds per item (the first request plus follow-ups).
+        poll_interval (float): Seconds between status checks.
+        max_batch_requests (int): Requests per provider job; larger rounds are split.
+        temperature (float, optional): Sampling temperature of the requests.
+    """
+
+    def __init__(self, extractor, endpoint, checkpoint_path: str, work_dir: str, model: Optional[str]=None,
+                 format: Optional[str]=None, max_retries: int=3, retry_failed: bool=False, flush_every: int=50,
+                 verbose: bool=False, poll_interval: float=60.0, max_batch_requests: int=50000,
+                 temperature: Optional[float]=None):
+
+        super().__init__(extractor, checkpoint_path, format=format, max_retries=max_retries,
+                         retry_failed=retry_failed, flush_every=flush_every, verbose=verbose)
+        self.endpoint = endpoint
+        self.work_dir = work_dir
+        self.model = model or getattr(extractor, 'model', None)
+        self.poll_interval = poll_interval
+        self.max_batch_requests = max_batch_requests
+        self.temperature = temperature
+
+        os.makedirs(work_dir, exist_ok=True)
+        self.state_path = os.path.join(work_dir, 'batch_state.json')
+
+    # state
+
+    def load_state(self) -> Dict[str, Any]:
+        """The batch state: current round, its provider jobs, and whether it is still in progress."""
+        if not os.path.exists(self.state_path):
+            return {'round': 0, 'jobs': [], 'in_progress': False}
+        with open(self.state_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(state, fh, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _round_path(self, round_no: int, name: str) -> str:
+        return os.path.join(self.work_dir, f"round-{round_no:03d}.{name}")
+
+    # running
+
+    def run(self, items: Union[Dict[str, str], Iterable[Tuple[str, str, str]], None]=None,
+            on_record: Optional[Callable[[Dict[str, Any]], None]]=None, wait: bool=True) -> Dict[str, Any]:
+        """
+        Submit items as a batch (unless a batch of this job is still in progress) and
+        process rounds until no failures are left to resubmit.
+
+        Args:
+            items: As for ExtractionJob.run(). Ignored while a submitted round is unfinished.
+            on_record: Called with every checkpoint record as it is written.
+            wait: Poll until done. With wait=False the call checks the current round
+                once (collecting it and submitting the follow-up if it is finished)
+                and returns; call run() again later to continue.
+
+        Returns:
+            dict: Counts of completed, failed, skipped and resubmitted items, the
+            current round and whether work is still in progress at the provider.
+        """
+
+        self.extractor.validate_setup(require_source=False)
+        summary = {'completed': 0, 'failed': 0, 'skipped': 0, 'resubmitted': 0}
+        start = time.time()
+
+        try:
+            state = self.load_state()
+            if not state['in_progress']:
+                if items is None:
+                    print("Nothing to do: no batch in progress and no items given.")
+                    summary.update(round=state['round'], in_progress=False, elapsed_s=0.0)
+                    return summary
+                state = self._submit_round(state['round'] + 1, self._first_requests(items, summary))
+
+            while state['in_progress']:
+                status = self._wait(state, block=wait)
+                if status is None:
+                    break
+                summary['resubmitted'] += self._finish_round(state, on_record, summary)
+                state = self.load_state()
+        finally:
+            self.store.close()
+
+        summary.update(round=state['round'], in_progress=state['in_progress'],
+                       elapsed_s=round(time.time() - start, 3))
+        print(f"Batch job: {summary['completed']} completed, {summary['failed']} failed, "
+              f"{summary['skipped']} skipped"
+              + (f", round {state['round']} still running at the provider" if state['in_progress'] else ""))
+        return summary
+
+    def _first_requests(self, items, summary: Dict[str, Any]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        # (request line, item metadata) for the items that are not checkpointed yet
+        done_ids = self.store.completed_ids(include_failed=not self.retry_failed)
+        for item_id, technology_name, info_source in self._iter_items(items):
+            if str(item_id) in done_ids:
+                summary['skipped'] += 1
+                continue
+            done_ids.add(str(item_id))
+            messages = self.extractor.base_prompt.format_messages(
+                technology_name=technology_name, info_source=info_source,
+                format_instructions=self.extractor.parser.get_format_instructions(),
+            )
+            meta = {'item_id': str(item_id), 'technology_name': technology_name, 'attempt': 1,
+                    'first_submitted_at': time.time()}
+            yield self._request(str(item_id), messages), meta
+
+    def _request(self, key: str, messages: List[Any]) -> Dict[str, Any]:
+        chat = to_chat_messages(messages)
+        if self.endpoint.format == 'openai':
+            return openai_request(key, chat, self.model, self.temperature)
+        return gemini_request(key, chat, self.temperature)
+
+    def _submit_round(self, round_no: int, requests: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, Any]:
+        """Write the round's request files (one per provider job) and submit them."""
+
+        parts, count = [], 0
+        out = None
+        with open(self._round_path(round_no, 'items.jsonl'), 'w', encoding='utf-8') as items_file:
+            for line, meta in requests:
+                if count % self.max_batch_requests == 0:
+                    if out is not None:
+                        out.close()
+                    parts.append(self._round_path(round_no, f"requests-{len(parts) + 1:03d}.jsonl"))
+                    out = open(parts[-1], 'w', encoding='utf-8')
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                items_file.write(json.dumps(meta, ensure_ascii=False) + "\n")
+                count += 1
+        if out is not None:
+            out.close()
+
+        if not count:
+            os.remove(self._round_path(round_no, 'items.jsonl'))
+            state = {'round': round_no - 1, 'jobs': [], 'in_progress': False}
+            self._save_state(state)
+            return state
+
+        # a crash between submit() and saving the state re-submits the round on the next run
+        jobs = []
+        for path in parts:
+            job_id = self.endpoint.submit(path, self.model, display_name=os.path.basename(path))
+            jobs.append({'job_id': job_id, 'requests': os.path.basename(path)})
+        state = {'round': round_no, 'jobs': jobs, 'in_progress': True, 'requests': count,
+                 'submitted_at': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        self._save_state(state)
+        print(f"📦 Submitted batch round {round_no}: {count} requests in {len(jobs)} job(s) to {self.model}")
+        return state
+
+    def _wait(self, state: Dict[str, Any], block: bool=True) -> Optional[List[Dict[str, Any]]]:
+        """Poll the round's jobs until all are finished; None if not finished and block is False."""
+
+        started = time.time()
+        while True:
+            statuses = [self.endpoint.status(job['job_id']) for job in state['jobs']]
+            if all(s['state'] != 'running' for s in statuses):
+                for job, s in zip(state['jobs'], statuses):
+                    if s['state'] == 'failed':
+                        print(f"⚠️ Batch job {job['job_id']} ended as {s['detail']}; its items are resubmitted")
+                return statuses
+
+            done = [s['completed'] for s in statuses]
+            progress = (f"{sum(done)}/{state['requests']} requests done" if None not in done
+                        else ", ".join(s['detail'] for s in statuses))
+            print(f"⏳ Batch round {state['round']}: {progress} "
+                  f"({(time.time() - started) / 60:.0f} min waited)")
+            if not block:
+                return None
+            time.sleep(self.poll_interval)
+
+    def _finish_round(self, state: Dict[str, Any], on_record, summary: Dict[str, Any]) -> int:
+        """Download and process the round's outputs; submit the follow-up round. Returns its size."""
+
+        round_no = state['round']
+        outputs = {}
+        for i, job in enumerate(state['jobs'], 1):
+            path = self._round_path(round_no, f"output-{i:03d}.jsonl")
+            try:
+                self.endpoint.download(job['job_id'], path)
+            except Exception as e:
+                # e.g. a job that failed as a whole has no output: all of its items go again
+                print(f"⚠️ No output for batch job {job['job_id']}: {type(e).__name__}: {e}")
+                continue
+            with open(path, 'r', encoding='utf-8') as fh:
+                for raw in fh:
+                    if raw.strip():
+                        key, text, error = parse_output_line(json.loads(raw))
+                        outputs[key] = (text, error)
+
+        # a re-run after a crash while collecting: items recorded then are not redone
+        done_ids = self.store.completed_ids()
+        metas = {}
+        with open(self._round_path(round_no, 'items.jsonl'), 'r', encoding='utf-8') as fh:
+            for raw in fh:
+                meta = json.loads(raw)
+                if meta['item_id'] not in done_ids:
+                    metas[meta['item_id']] = meta
+
+        fixes = []          # (request line, meta) with the fix prompt
+        resend = {}         # item_id -> meta of requests to send again unchanged
+        for item_id, meta in metas.items():
+            text, error = outputs.get(item_id, (None, "No output for this request"))
+            retry = meta['attempt'] < self.max_retries
+            next_meta = dict(meta, attempt=meta['attempt'] + 1)
+
+            if text is None:
+                if retry:
+                    resend[item_id] = next_meta
+                else:
+                    self._write(self._record(meta, None, f"BatchRequestError: {error}"), on_record, summary)
+                continue
+
+            try:
+                self._write(self._record(meta, self._parse(text)), on_record, summary)
+            except Exception as e:
+                if not retry:
+                    self._write(self._record(meta, None, f"{type(e).__name__}: {e}"), on_record, summary)
+                    continue
+                if self.verbose:
+                    print(f"❌ {item_id}: {type(e).__name__}: {str(e)[:200]}. Resubmitting with the fix prompt...")
+                messages = self.extractor.fix_prompt.format_messages(
+                    technology_name=meta['technology_name'],
+                    format_instructions=self.extractor.parser.get_format_instructions(),
+                    malformed_output=text,
+                )
+                fixes.append((self._request(item_id, messages), next_meta))
+        self.store.flush()
+
+        def follow_ups():
+            yield from fixes
+            # requests the provider failed go again as they were (streamed from the round's files)
+            for job in state['jobs']:
+                with open(os.path.join(self.work_dir, job['requests']), 'r', encoding='utf-8') as fh:
+                    for raw in fh:
+                        line = json.loads(raw)
+                        meta = resend.get(request_id(line))
+                        if meta is not None:
+                            yield line, meta
+
+        if fixes or resend:
+            print(f"🔁 Round {round_no}: {len(fixes)} outputs to fix, {len(resend)} requests to resend")
+        self._submit_round(round_no + 1, follow_ups())
+        return len(fixes) + len(resend)
+
+    def _parse(self, text: str) -> Dict[str, Any]:
+        try:
+            parsed = self.extractor.parser.parse(text)
+        except OutputParserException:
+            parsed = self.extractor.parser.parse(local_repair(text))
+        return self._validate(parsed)
+
+    @staticmethod
+    def _record(meta: Dict[str, Any], result: Optional[Dict[str, Any]], error: Optional[str]=None) -> Dict[str, Any]:
+        return {
+            'item_id': meta['item_id'],
+            'technology_name': meta['technology_name'],
+            'result': result,
+            'status': 'ok' if error is None else 'failed',
+            'error': error,
+            # turnaround from the first submission, not compute time
+            'elapsed_s': round(time.time() - meta['first_submitted_at'], 3),
+            'finished_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+
+    def _write(self, record: Dict[str, Any], on_record, summary: Dict[str, Any]):
+        self.store.append(record)
+        summary['completed' if record['status'] == 'ok' else 'failed'] += 1
+        if on_record is not None:
+            on_record(record)
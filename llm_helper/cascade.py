@@ -0,0 +1,165 @@
+"""Model cascade: answer with a fast, cheap model first and escalate to stronger ones only when a check fails."""
+
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+
+
+class Escalate(Exception):
+    """Raised by a tier attempt whose answer is not good enough; the next tier is tried."""
+
+    def __init__(self, reason: str, detail: str=''):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+empty_values = (None, '', 'unknown', 'n/a', 'na', 'none', 'not specified', 'not available')
+
+
+def filled_fraction(result: Dict[str, Any]) -> float:
+    """Share of the fields of result that have a value (not None, empty, or a placeholder like 'unknown')."""
+    if not isinstance(result, dict):
+        raise TypeError(f"filled_fraction() scores dict results, not {type(result).__name__}; "
+                        "pass a confidence function to the cascade")
+    if not result:
+        return 0.0
+    filled = 0
+    for value in result.values():
+        if isinstance(value, str) and value.strip().lower() in empty_values:
+            continue
+        if value is None or (isinstance(value, (list, dict)) and not value):
+            continue
+        filled += 1
+    return filled / len(result)
+
+
+class ModelCascade():
+    """
+    Ordered tiers of models, cheapest first.
+
+    run(attempt) calls attempt(tier) for the first tier and returns its result
+    unless the attempt raises (Escalate for a failed check, or any error) or the
+    result's confidence is below `min_confidence`; then the next tier is tried.
+    The last tier's error is raised; a low-confidence result of the last tier is
+    returned, as nothing stronger is left.
+
+    Per-tier counters (calls, hits, escalations by reason, latency) show how many
+    items each tier settles.
+
+    Args:
+        tiers (list): Models, in escalation order (model names or model objects).
+        names (list, optional): Display names. Default: str() of the tier, or its `model` attribute.
+        confidence (callable, optional): result -> score in [0, 1]. Default: filled_fraction, which
+            only scores dict results; other results need their own function.
+        min_confidence (float, optional): Escalate below this score. Default: no confidence check.
+        costs (list, optional): Relative cost of one call per tier, for the cost estimate in stats().
+    """
+
+    def __init__(self, tiers: List[Any], names: Optional[List[str]]=None,
+                 confidence: Optional[Callable[[Any], float]]=None, min_confidence: Optional[float]=None,
+                 costs: Optional[List[float]]=None):
+        if not tiers:
+            raise ValueError("A cascade needs at least one tier")
+        if names is not None and len(names) != len(tiers):
+            raise ValueError("names must have one entry per tier")
+        if costs is not None and len(costs) != len(tiers):
+            raise ValueError("costs must have one entry per tier")
+
+        self.tiers = list(tiers)
+        self.names = list(names) if names is not None else [
+            t if isinstance(t, str) else str(getattr(t, 'model', None) or type(t).__name__) for t in self.tiers
+        ]
+        self.confidence = confidence
+        self.min_confidence = min_confidence
+        self.costs = costs
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.items = 0
+            self.failed = 0
+            self._tiers = [{'calls': 0, 'hits': 0, 'escalations': {}, 'seconds': 0.0} for _ in self.tiers]
+
+    def run(self, attempt: Callable[[Any], Any]) -> Any:
+        """Run attempt(tier) up the cascade until a result passes; see the class docstring."""
+
+        last = len(self.tiers) - 1
+        for i, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            try:
+                result = attempt(tier)
+            except Exception as e:
+                reason = e.reason if isinstance(e, Escalate) else type(e).__name__
+                self._record(i, start, escalated=reason, final=(i == last))
+                if i == last:
+                    raise
+                continue
+
+            if self.min_confidence is not None and i < last:
+                score = (self.confidence or filled_fraction)(result)
+                if score < self.min_confidence:
+                    self._record(i, start, escalated='low confidence')
+                    continue
+
+            self._record(i, start)
+            return result
+
+    def _record(self, i: int, start: float, escalated: Optional[str]=None, final: bool=False):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            tier = self._tiers[i]
+            tier['calls'] += 1
+            tier['seconds'] += elapsed
+            if i == 0:
+                self.items += 1
+            if escalated is None:
+                tier['hits'] += 1
+            else:
+                tier['escalations'][escalated] = tier['escalations'].get(escalated, 0) + 1
+                if final:
+                    self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier calls, hits, hit rate, share of items settled, escalation reasons and mean latency."""
+        with self._lock:
+            items = max(self.items, 1)
+            tiers = []
+            for name, tier in zip(self.names, self._tiers):
+                tiers.append({
+                    'tier': name,
+                    'calls': tier['calls'],
+                    'hits': tier['hits'],
+                    'hit_rate': round(tier['hits'] / tier['calls'], 3) if tier['calls'] else None,
+                    'share_of_items': round(tier['hits'] / items, 3),
+                    'escalations': dict(tier['escalations']),
+                    'mean_latency_s': round(tier['seconds'] / tier['calls'], 3) if tier['calls'] else None,
+                })
+            stats = {
+                'items': self.items,
+                'failed': self.failed,
+                'tiers': tiers,
+                'mean_latency_s': round(sum(t['seconds'] for t in self._tiers) / items, 3),
+            }
+            if self.costs is not None:
+                spent = sum(cost * t['calls'] for cost, t in zip(self.costs, self._tiers))
+                # the alternative: every item on the strongest tier
+                stats['cost_vs_last_tier'] = round(spent / (self.costs[-1] * items), 3) if self.costs[-1] else None
+            return stats
+
+    def report(self):
+        """Print the per-tier hit rates."""
+        stats = self.stats()
+        print(f"Cascade: {stats['items']} items, {stats['failed']} failed on every tier, "
+              f"{stats['mean_latency_s']:.2f}s mean latency per item"
+              + (f", {stats['cost_vs_last_tier']:.0%} of the cost of the last tier alone"
+                 if stats.get('cost_vs_last_tier') is not None else ""))
+        for t in stats['tiers']:
+            hit_rate = f"{t['hit_rate']:.0%}" if t['hit_rate'] is not None else "-"
+            latency = f"{t['mean_latency_s']:.2f}s" if t['mean_latency_s'] is not None else "-"
+            reasons = ", ".join(f"{reason} {n}" for reason, n in sorted(t['escalations'].items(), key=lambda x: -x[1]))
+            print(f"  {t['tier'][:28]:<28} calls {t['calls']:>6}  hits {t['hits']:>6} ({hit_rate:>4})  "
+                  f"settles {t['share_of_items']:>5.0%} of items  {latency:>7}/call"
+                  + (f"  escalated: {reasons}" if reasons else ""))
@@ -0,0 +1,366 @@
+"""Record/replay transport: run helpers and extractors against recorded provider responses, offline."""
+
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from .mock_providers import _contents_to_text
+
+
+def _text(content: Any) -> str:
+    """Message content as text (Gemini may return a list of parts)."""
+    if isinstance(content, list):
+        return "".join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+def _with_stop(stop, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(kwargs, stop=stop) if stop is not None else kwargs
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class Cassette():
+    """
+    File of recorded request/response pairs, one JSON line per response (gzip
+    compressed when the path ends with .gz).
+
+    Requests are matched by a fingerprint: a hash of the model, the full messages
+    and the generation options. Only the fingerprint and a short preview of the
+    prompt are stored, so cassettes stay small even with large attachments.
+    Identical requests recorded several times are replayed in recorded order.
+
+    Modes:
+    - 'replay': never call the provider; unknown requests raise CassetteMiss.
+    - 'record': always call the provider and record the responses (the file is started over).
+    - 'auto': replay what is recorded, call the provider and record the rest.
+
+    With simulate_latency=True replays sleep for the recorded time (times
+    `latency_scale`), including the delays between streamed chunks, so timings of
+    whole jobs can be reproduced without network.
+
+    Args:
+        path (str): Cassette file (.jsonl or .jsonl.gz).
+        mode (str): 'replay', 'record' or 'auto'.
+        simulate_latency (bool): Sleep for the recorded latency when replaying.
+        latency_scale (float): Multiplier for simulated latency.
+    """
+
+    def __init__(self, path: str, mode: str='replay', simulate_latency: bool=False, latency_scale: float=1.0):
+        if mode not in ('replay', 'record', 'auto'):
+            raise ValueError(f"Unknown cassette mode: {mode} (expected 'replay', 'record' or 'auto')")
+
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._entries = {}       # fingerprint -> list of entries
+        self._played = {}        # fingerprint -> number of entries replayed
+
+        if mode == 'record':
+            if os.path.exists(path):
+                os.remove(path)
+        elif os.path.exists(path):
+            with self._open('rt') as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry['fingerprint'], []).append(entry)
+        elif mode == 'replay':
+            raise FileNotFoundError(f"Cassette not found: {path}")
+
+    @staticmethod
+    def fingerprint(payload: Dict[str, Any]) -> str:
+        """Stable hash of a request payload."""
+        canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Next recorded entry for the fingerprint (the last one repeats when exhausted)."""
+        if self.mode == 'record':
+            return None
+        with self._lock:
+            entries = self._entries.get(fingerprint)
+            if not entries:
+                return None
+            i = self._played.get(fingerprint, 0)
+            self._played[fingerprint] = i + 1
+            self.hits += 1
+            return entries[min(i, len(entries) - 1)]
+
+    def record(self, fingerprint: str, kind: str, preview: str, response: Dict[str, Any],
+               latency_s: float, chunks: Optional[List[List[Any]]]=None):
+        """Append a response to the cassette file."""
+        entry = {'fingerprint': fingerprint, 'kind': kind, 'preview': preview[:200],
+                 'latency_s': round(latency_s, 4), 'response': response}
+        if chunks is not None:
+            entry['chunks'] = chunks
+        with self._lock:
+            self._entries.setdefault(fingerprint, []).append(entry)
+            if self.mode == 'auto':
+                # keep replaying in order: this entry counts as played
+                self._played[fingerprint] = len(self._entries[fingerprint])
+            with self._open('at') as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+    def call(self, kind: str, payload: Dict[str, Any], preview: str, live: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Replay the response for payload, or get it from live() and record it."""
+        fingerprint = self.fingerprint(payload)
+        entry = self.lookup(fingerprint)
+        if entry is not None:
+            if self.simulate_latency:
+                time.sleep(entry['latency_s'] * self.latency_scale)
+            if 'chunks' in entry and 'content' not in entry['response']:
+                return dict(entry['response'], content="".join(text for _, text in entry['chunks']))
+            return entry['response']
+
+        self._miss(kind, preview)
+        start = time.perf_counter()
+        response = live()
+        self.record(fingerprint, kind, preview, response, time.perf_counter() - start)
+        return response
+
+    def stream(self, kind: str, payload: Dict[str, Any], preview: str, live: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Replay the chunks for payload, or stream them from live() and record them with their timing."""
+        fingerprint = self.fingerprint(payload)
+        entry = self.lookup(fingerprint)
+        if entry is not None:
+            chunks = entry.get('chunks') or [[entry['latency_s'], entry['response'].get('content', '')]]
+            for delay, text in chunks:
+                if self.simulate_latency:
+                    time.sleep(delay * self.latency_scale)
+                yield text
+            return
+
+        self._miss(kind, preview)
+        start = last = time.perf_counter()
+        chunks = []
+        for text in live():
+            now = time.perf_counter()
+            chunks.append([round(now - last, 4), text])
+            last = now
+            yield text
+        # only complete streams are recorded; a consumer stopping early leaves nothing behind
+        self.record(fingerprint, kind, preview, {}, time.perf_counter() - start, chunks=chunks)
+
+    def _miss(self, kind: str, preview: str):
+        with self._lock:
+            self.misses += 1
+        if self.mode == 'replay':
+            raise CassetteMiss(f"No recorded {kind} response in {self.path} for request: {preview[:200]!r}")
+
+    def _open(self, mode: str):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode, encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses, 'recorded': self.recorded}
+
+    # transports
+
+    def inference_client(self, client=None) -> 'CassetteInferenceClient':
+        """Stand-in for huggingface_hub.InferenceClient, for AIHelper(client=...)."""
+        return CassetteInferenceClient(self, client)
+
+    def genai_client(self, client=None) -> 'CassetteGenaiClient':
+        """Stand-in for google.genai.Client, for AIHelper_Google(client=...)."""
+        return CassetteGenaiClient(self, client)
+
+    def chat_model(self, llm=None, model: Optional[str]=None) -> 'CassetteChatModel':
+        """
+        LangChain chat model, for InfoExtractor(llm=...). On replay without llm, pass the
+        model name the responses were recorded with (it is part of the fingerprint).
+        """
+        return CassetteChatModel(cassette=self, llm=llm, model=model)
+
+
+class CassetteInferenceClient():
+    """Records or replays huggingface_hub.InferenceClient.chat_completion calls."""
+
+    def __init__(self, cassette: Cassette, client=None):
+        self.cassette = cassette
+        self.client = client
+
+    def chat_completion(self, model: str=None, messages: List[Dict[str, str]]=None, max_tokens: int=None,
+                        temperature: float=None, stream: bool=False, **kwargs):
+        payload = {'provider': 'huggingface', 'model': model, 'messages': messages,
+                   'max_tokens': max_tokens, 'temperature': temperature, 'options': kwargs}
+        preview = messages[-1]['content'] if messages else ''
+
+        def call_options():
+            return dict(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature, **kwargs)
+
+        if stream:
+            def live():
+                for chunk in self.client.chat_completion(stream=True, **call_options()):
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+
+            return (
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(role='assistant', content=text))])
+                for text in self.cassette.stream('chat_completion', payload, preview, live)
+            )
+
+        def live():
+            response = self.client.chat_completion(**call_options())
+            choice = response.choices[0]
+            return {'content': choice.message.content, 'finish_reason': getattr(choice, 'finish_reason', None)}
+
+        response = self.cassette.call('chat_completion', payload, preview, live)
+        return SimpleNamespace(choices=[SimpleNamespace(
+            message=SimpleNamespace(role='assistant', content=response['content']),
+            finish_reason=response.get('finish_reason')
+        )])
+
+
+class _CassetteModels():
+    def __init__(self, owner: 'CassetteGenaiClient'):
+        self.owner = owner
+
+    def generate_content(self, model: str=None, contents: Any=None, config: Any=None):
+        owner = self.owner
+        options = {}
+        if config is not None:
+            options = config.model_dump(mode='json', exclude_none=True) if hasattr(config, 'model_dump') else dict(vars(config))
+            # cache names differ between runs; the cached content itself identifies the request
+            cached_name = options.pop('cached_content', None)
+            if cached_name:
+                options['cached_digest'] = owner.caches._digests.get(cached_name, cached_name)
+
+        prompt = _contents_to_text(contents)
+        payload = {'provider': 'google', 'model': model, 'contents': prompt, 'config': options}
+
+        def live():
+            response = owner.client.models.generate_content(model=model, contents=contents, config=config)
+            usage = getattr(response, 'usage_metadata', None)
+            return {
+                'text': response.text,
+                'usage': {k: getattr(usage, k, None) for k in
+                          ('prompt_token_count', 'cached_content_token_count', 'candidates_token_count')},
+            }
+
+        response = owner.cassette.call('generate_content', payload, prompt, live)
+        return SimpleNamespace(text=response['text'], usage_metadata=SimpleNamespace(**response.get('usage', {})))
+
+
+class _CassetteCaches():
+    """Context caches: passed through when recording, emulated locally when replaying."""
+
+    def __init__(self, owner: 'CassetteGenaiClient'):
+        self.owner = owner
+        self._digests = {}      # cache name -> digest of its contents
+
+    def create(self, model: str=None, config: Any=None):
+        digest = Cassette.fingerprint({'model': model, 'contents': _contents_to_text(getattr(config, 'contents', None)),
+                                       'tools': str(getattr(config, 'tools', None))})
+        if self.owner.client is not None and self.owner.cassette.mode != 'replay':
+            cache = self.owner.client.caches.create(model=model, config=config)
+            name = cache.name
+        else:
+            name = f"cachedContents/replay-{digest[:16]}"
+            cache = self._view(name, model, getattr(config, 'ttl', None))
+        self._digests[name] = digest
+        return cache
+
+    def get(self, name: str):
+        return self._live('get', name=name) or self._view(name)
+
+    def update(self, name: str, config: Any=None):
+        return self._live('update', name=name, config=config) or self._view(name, ttl=getattr(config, 'ttl', None))
+
+    def delete(self, name: str):
+        self._live('delete', name=name)
+        self._digests.pop(name, None)
+
+    def list(self):
+        return self._live('list') or [self._view(name) for name in self._digests]
+
+    def _live(self, method: str, **kwargs):
+        if self.owner.client is not None and self.owner.cassette.mode != 'replay':
+            return getattr(self.owner.client.caches, method)(**kwargs)
+        return None
+
+    @staticmethod
+    def _view(name: str, model: str=None, ttl: Optional[str]=None) -> SimpleNamespace:
+        seconds = float(ttl.rstrip('s')) if ttl else 3600.0
+        return SimpleNamespace(name=name, model=model, expire_time=time.time() + seconds)
+
+
+class CassetteGenaiClient():
+    """Records or replays google.genai.Client.models.generate_content, emulating context caches on replay."""
+
+    def __init__(self, cassette: Cassette, client=None):
+        self.cassette = cassette
+        self.client = client
+        self.models = _CassetteModels(self)
+        self.caches = _CassetteCaches(self)
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    LangChain chat model that records or replays another chat model (`llm`),
+    including streamed chunks. Usable as InfoExtractor(llm=...).
+    """
+
+    cassette: Any
+    llm: Any = None
+    model: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return 'cassette'
+
+    def _payload(self, messages, stop) -> Dict[str, Any]:
+        model = self.model or getattr(self.llm, 'model', None) or getattr(self.llm, 'model_name', None)
+        if isinstance(model, str) and model.startswith('models/'):
+            model = model[len('models/'):]
+        return {'provider': 'langchain', 'model': model, 'stop': stop,
+                'messages': [[m.type, m.content] for m in messages]}
+
+    def _live_llm(self):
+        # plain callables (e.g. mock_providers.MockChatModel) are wrapped like LangChain does in a chain
+        return self.llm if hasattr(self.llm, 'invoke') else RunnableLambda(self.llm)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        def live():
+            response = self._live_llm().invoke(messages, **_with_stop(stop, kwargs))
+            return {'content': _text(response.content)}
+
+        response = self.cassette.call('chat', self._payload(messages, stop), messages[-1].content, live)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response['content']))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        def live():
+            for chunk in self._live_llm().stream(messages, **_with_stop(stop, kwargs)):
+                text = _text(chunk.content)
+                if text:
+                    yield text
+
+        for text in self.cassette.stream('chat', self._payload(messages, stop), messages[-1].content, live):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,498 @@
+"""
+Command-line batch runner.
+
+    llm-helper extract --schema schema.json --prompts prompts.json --inputs docs/ --workers 16
+    llm-helper ask --input questions.csv --workers 8 --output answers.jsonl
+
+Inputs are read lazily, at most a bounded number of requests are in flight, and
+every result is appended to a checkpoint (JSONL file or Parquet directory) as it
+completes, so an interrupted run resumes where it stopped when started again
+with the same --output.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from .job_runner import CheckpointStore, ExtractionJob, run_bounded
+from .scheduler import priority_classes
+
+
+source_extensions = ('.txt', '.md', '.pdf')
+
+
+class Progress():
+    """Single status line on stderr: done/total, throughput, ETA and failures."""
+
+    def __init__(self, total: Optional[int]=None, skipped: int=0, interval: float=0.5, stream=None):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.done = 0
+        self.failed = 0
+        self.start = time.time()
+        self._last = 0.0
+        self._closed = False
+
+    def update(self, record: Dict[str, Any]):
+        self.done += 1
+        if record.get('status') != 'ok':
+            self.failed += 1
+        if self.total is not None and self.skipped + self.done >= self.total:
+            self.close()
+        elif time.time() - self._last >= self.interval:
+            self.show()
+
+    def show(self, end: str=''):
+        self._last = time.time()
+        elapsed = max(self._last - self.start, 1e-9)
+        rate = self.done / elapsed
+        if self.total is not None:
+            remaining = max(self.total - self.skipped - self.done, 0)
+            eta = _format_seconds(remaining / rate) if rate > 0 else '?'
+            count = f"{self.skipped + self.done}/{self.total}"
+        else:
+            eta = '?'
+            count = f"{self.skipped + self.done}"
+        self.stream.write(f"\r{count} | {rate:.2f} items/s | ETA {eta} | failed {self.failed} "
+                          f"| elapsed {_format_seconds(elapsed)}" + end)
+        self.stream.flush()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.show(end='\n')
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+# inputs
+
+def _load_json(path: str) -> Any:
+    with open(path, 'r', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _iter_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a .jsonl or .csv file, one at a time."""
+    with open(path, 'r', encoding='utf-8', newline='') as fh:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(fh)
+            return
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _count_rows(path: str) -> int:
+    """Number of data rows, counted without parsing (used for the ETA)."""
+    with open(path, 'rb') as fh:
+        lines = sum(1 for line in fh if line.strip())
+    return lines - 1 if path.endswith('.csv') else lines
+
+
+def _source_files(directory: str) -> List[str]:
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(source_extensions) and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def _read_source(path: str) -> str:
+    if path.lower().endswith('.pdf'):
+        from .utils import read_pdf2text
+        return read_pdf2text(path)
+    with open(path, 'r', encoding='utf-8') as fh:
+        return fh.read()
+
+
+def iter_extract_inputs(path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    (item_id, technology_name, info_source) tuples for `extract --inputs`.
+
+    A directory yields one item per .txt/.md/.pdf file (the file name without its
+    extension is the id and the technology name); a .jsonl or .csv file yields one
+    item per row with `technology_name`, `info_source` and an optional `item_id`.
+    Files are read only when their item is about to be processed.
+    """
+
+    if os.path.isdir(path):
+        for file_path in _source_files(path):
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            yield name, name, _read_source(file_path)
+        return
+
+    for i, row in enumerate(_iter_rows(path)):
+        item_id = row.get('item_id') or row['technology_name'] or str(i)
+        yield str(item_id), row['technology_name'], row['info_source']
+
+
+def count_inputs(path: str) -> int:
+    return len(_source_files(path)) if os.path.isdir(path) else _count_rows(path)
+
+
+# extract
+
+def build_extractor(args: argparse.Namespace):
+    from .info_extractor import InfoExtractor
+
+    cassette = _open_cassette(args)
+    replay = cassette is not None and cassette.mode == 'replay'
+    if replay:
+        extractor = InfoExtractor(api_provider=args.provider, model=args.model, llm=cassette.chat_model(model=args.model))
+    else:
+        extractor = InfoExtractor(api_provider=args.provider, model=args.model)
+        if cassette is not None:
+            extractor.llm = cassette.chat_model(extractor.llm, model=args.model)
+
+    if args.cascade:
+        models = args.cascade.split(',')
+        if cassette is not None:
+            models = [cassette.chat_model(None if replay else extractor._build_llm(m), model=m) for m in models]
+        extractor.set_cascade(models, min_confidence=args.min_confidence, names=args.cascade.split(','))
+
+    extractor.load_data_schema(_load_json(args.schema))
+    prompts = _load_json(args.prompts)
+    extractor.load_prompt_templates(prompts['base'], prompts['fix'])
+    return extractor
+
+
+def run_extract(args: argparse.Namespace) -> int:
+    extractor = build_extractor(args)
+    if args.pipeline:
+        return run_pipeline(args, extractor)
+    if args.batch:
+        return run_batch(args, extractor)
+
+    job = ExtractionJob(
+        extractor, args.output, max_retries=args.max_retries, retry_failed=args.retry_failed,
+        flush_every=args.flush_every, verbose=args.verbose, priority=args.priority, max_workers=args.workers,
+    )
+
+    done_ids = job.store.completed_ids(include_failed=not args.retry_failed)
+    progress = Progress(total=count_inputs(args.inputs), skipped=len(done_ids))
+    summary = job.run(iter_extract_inputs(args.inputs), on_record=progress.update)
+    progress.close()
+    if extractor.cascade is not None:
+        extractor.cascade.report()
+
+    if args.export:
+        job.collect().to_parquet(args.export)
+    return 130 if summary['interrupted'] else (1 if summary['failed'] else 0)
+
+
+def run_batch(args: argparse.Namespace, extractor) -> int:
+    """extract --batch: submit the inputs through the provider's batch API and collect the results."""
+    from .batch_jobs import BatchExtractionJob, GeminiBatchEndpoint, OpenAIBatchEndpoint
+
+    endpoint = OpenAIBatchEndpoint() if args.batch == 'openai' else GeminiBatchEndpoint()
+    job = BatchExtractionJob(
+        extractor, endpoint, args.output, args.batch_dir or args.output + '.batch', model=args.model,
+        max_retries=args.max_retries, retry_failed=args.retry_failed, flush_every=args.flush_every,
+        verbose=args.verbose, poll_interval=args.poll_interval,
+    )
+    summary = job.run(iter_extract_inputs(args.inputs), wait=not args.no_wait)
+
+    if args.export and not summary['in_progress']:
+        job.collect().to_parquet(args.export)
+    if summary['in_progress']:
+        return 0
+    return 1 if summary['failed'] else 0
+
+
+def run_pipeline(args: argparse.Namespace, extractor) -> int:
+    """extract --pipeline: parse, chunk and extract the input files concurrently."""
+    from .pipeline import IngestionPipeline
+
+    pipeline = IngestionPipeline(
+        extractor, args.output, parse_processes=args.parse_processes, extract_concurrency=args.workers,
+        max_source_chars=args.max_source_chars, max_retries=args.max_retries, retry_failed=args.retry_failed,
+        verbose=args.verbose, priority=args.priority, flush_every=args.flush_every,
+    )
+    progress = Progress()
+    try:
+        summary = pipeline.run(args.inputs, on_record=progress.update)
+    except KeyboardInterrupt:
+        progress.close()
+        print(f"⏸️ Interrupted; completed results are saved in {args.output}")
+        return 130
+    progress.close()
+    pipeline.report()
+    if extractor.cascade is not None:
+        extractor.cascade.report()
+
+    if args.export:
+        pipeline.job.collect().to_parquet(args.export)
+    return 1 if summary['failed'] else 0
+
+
+# work queue
+
+def run_enqueue(args: argparse.Namespace) -> int:
+    from .work_queue import WorkQueue
+
+    queue = WorkQueue(args.queue)
+    if args.inputs:
+        print(f"➕ Added {queue.add(iter_extract_inputs(args.inputs))} items to {args.queue}")
+    if args.retry_failed:
+        print(f"🔁 Re-queued {queue.retry_failed()} failed items")
+    queue.report()
+    return 0
+
+
+def run_worker(args: argparse.Namespace) -> int:
+    from functools import partial
+    from .work_queue import QueueWorker, WorkQueue, run_workers
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts, wal=args.wal)
+    options = {'max_retries': args.max_retries, 'verbose': args.verbose, 'priority': args.priority,
+               'max_workers': args.workers}
+
+    # built here as well, so a bad schema or prompt file fails before any worker starts
+    extractor = build_extractor(args)
+    if args.processes > 1:
+        stats = run_workers(partial(build_extractor, args), queue, processes=args.processes, **options)
+    else:
+        progress = Progress(total=queue.unfinished())
+        QueueWorker(extractor, queue, **options).run(on_record=progress.update)
+        progress.close()
+        queue.report()
+        stats = queue.stats()
+
+    if args.export:
+        QueueWorker(extractor, queue).collect().to_parquet(args.export)
+    return 1 if stats['failed'] else 0
+
+
+# ask
+
+def build_helper(args: argparse.Namespace):
+    from .ai_helper import AIHelper
+
+    cassette = _open_cassette(args)
+    client = cassette.inference_client() if cassette is not None and cassette.mode == 'replay' else None
+    helper = AIHelper(model_name=args.model, display_response=False, client=client)
+    if cassette is not None and client is None:
+        helper.client = cassette.inference_client(helper.client)
+
+    if args.cascade:
+        helper.set_cascade([m.strip() for m in args.cascade.split(',')])
+    if args.guidelines:
+        for name, guideline in _load_json(args.guidelines).items():
+            helper.add_guideline(name, guideline)
+    for path in args.data or []:
+        import pandas as pd
+        name = os.path.splitext(os.path.basename(path))[0]
+        helper.attach_data(name, pd.read_csv(path) if path.endswith('.csv') else _read_source(path))
+    return helper
+
+
+def iter_prompts(path: str, prompt_field: str, id_field: Optional[str]) -> Iterator[Tuple[str, str]]:
+    """(item_id, prompt) pairs of a .csv or .jsonl file; the row number is the id without --id-field."""
+    for i, row in enumerate(_iter_rows(path)):
+        yield str(row[id_field]) if id_field else str(i), row[prompt_field]
+
+
+def run_ask(args: argparse.Namespace) -> int:
+    import datetime
+
+    helper = build_helper(args)
+    store = _AskOutput(args.output)
+    done_ids = store.completed_ids(include_failed=not args.retry_failed)
+
+    def todo():
+        for item_id, prompt in iter_prompts(args.input, args.prompt_field, args.id_field):
+            if item_id not in done_ids:
+                done_ids.add(item_id)
+                yield item_id, prompt
+
+    def answer(item):
+        # every prompt is independent: guidelines and attachments, but no chat history
+        item_id, prompt = item
+        start = time.time()
+        record = {'item_id': item_id, 'prompt': prompt}
+        try:
+            messages = helper._build_messages(prompt, with_history=False)
+            record.update(result=helper._complete(messages, max_tokens=args.max_tokens), status='ok', error=None)
+        except Exception as e:
+            record.update(result=None, status='failed', error=f"{type(e).__name__}: {e}")
+        record['elapsed_s'] = round(time.time() - start, 3)
+        record['finished_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return record
+
+    from .scheduler import request_priority
+
+    progress = Progress(total=_count_rows(args.input), skipped=len(done_ids))
+    failed = 0
+    try:
+        with request_priority(args.priority):
+            for record in run_bounded(answer, todo(), max_workers=args.workers):
+                store.append(record)
+                failed += record['status'] != 'ok'
+                progress.update(record)
+    except KeyboardInterrupt:
+        progress.close()
+        print(f"⏸️ Interrupted; completed answers are saved in {args.output}")
+        return 130
+    finally:
+        store.close()
+    progress.close()
+    if helper.cascade is not None:
+        helper.cascade.report()
+    print(f"✅ {progress.done - failed} answered, {failed} failed -> {args.output}")
+    return 1 if failed else 0
+
+
+class _AskOutput():
+    """Answers of `ask`: a resumable JSONL checkpoint, or a Parquet file written in row groups."""
+
+    def __init__(self, path: str, row_group_size: int=500):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.row_group_size = row_group_size
+        self._buffer = []
+        self._writer = None
+        self._store = None if self.parquet else CheckpointStore(path, format='jsonl', flush_every=1)
+
+    def completed_ids(self, include_failed: bool=True) -> set:
+        # a Parquet file is rewritten on every run, so only JSONL output can resume
+        return set() if self.parquet else self._store.completed_ids(include_failed=include_failed)
+
+    def append(self, record: Dict[str, Any]):
+        if not self.parquet:
+            self._store.append(record)
+            return
+        self._buffer.append(record)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._buffer:
+            return
+        table = pa.Table.from_pylist(self._buffer, schema=_ask_schema())
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def close(self):
+        if not self.parquet:
+            self._store.close()
+            return
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _ask_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('item_id', pa.string()), ('prompt', pa.string()), ('result', pa.string()), ('status', pa.string()),
+        ('error', pa.string()), ('elapsed_s', pa.float64()), ('finished_at', pa.string()),
+    ])
+
+
+# shared
+
+def _open_cassette(args: argparse.Namespace):
+    if not args.cassette:
+        return None
+    from .cassette import Cassette
+    return Cassette(args.cassette, mode=args.cassette_mode)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='llm-helper', description="Batch extraction and prompting with llm_helper.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    running = argparse.ArgumentParser(add_help=False)
+    running.add_argument('--workers', type=int, default=4, help="requests in flight at once (default: 4)")
+    running.add_argument('--priority', default='batch', choices=priority_classes,
+                         help="scheduler priority class (default: batch)")
+    running.add_argument('--cassette', help="record/replay provider responses in this file")
+    running.add_argument('--cassette-mode', default='replay', choices=['replay', 'record', 'auto'])
+
+    common = argparse.ArgumentParser(add_help=False, parents=[running])
+    common.add_argument('--output', required=True,
+                        help="checkpoint to write and resume from (.jsonl; extract: otherwise a Parquet directory)")
+    common.add_argument('--retry-failed', action='store_true', help="process items that failed in a previous run again")
+
+    extraction = argparse.ArgumentParser(add_help=False)
+    extraction.add_argument('--schema', required=True, help="schema JSON (tech_type, fields) as for load_data_schema()")
+    extraction.add_argument('--prompts', required=True, help='prompt JSON: {"base": {system, human}, "fix": {system, human}}')
+    extraction.add_argument('--provider', default='google')
+    extraction.add_argument('--model', default='gemini-2.5-flash')
+    extraction.add_argument('--max-retries', type=int, default=3)
+    extraction.add_argument('--cascade', help="comma-separated models, cheapest first (e.g. gemini-2.5-flash-lite,gemini-2.5-flash)")
+    extraction.add_argument('--min-confidence', type=float,
+                            help="--cascade: escalate results with a smaller share of filled fields")
+    extraction.add_argument('--export', help="also write the successful results to this Parquet file")
+    extraction.add_argument('--verbose', action='store_true', help="print the extractor's per-item output")
+
+    inputs_help = "directory of .txt/.md/.pdf files, or a .jsonl/.csv with technology_name and info_source"
+
+    extract = commands.add_parser('extract', parents=[common, extraction], help="extract structured records from documents")
+    extract.add_argument('--inputs', required=True, help=inputs_help)
+    extract.add_argument('--flush-every', type=int, default=50,
+                         help="Parquet --output: records per part file; a crash loses at most this many - 1 results "
+                              "(default: 50)")
+    extract.add_argument('--pipeline', action='store_true',
+                         help="parse files in a process pool while extracting (directory of .pdf/.txt/.md/.csv files)")
+    extract.add_argument('--parse-processes', type=int, help="--pipeline: parser processes (default: CPU count)")
+    extract.add_argument('--max-source-chars', type=int,
+                         help="--pipeline: split longer documents into parts extracted separately")
+    extract.add_argument('--batch', choices=['openai', 'gemini'],
+                         help="submit through the provider's batch API (cheaper, finishes within hours)")
+    extract.add_argument('--batch-dir', help="--batch: request/output files and job state (default: OUTPUT.batch)")
+    extract.add_argument('--poll-interval', type=float, default=60, help="--batch: seconds between status checks")
+    extract.add_argument('--no-wait', action='store_true',
+                         help="--batch: submit (or check the running batch) and exit; run again to continue")
+
+    enqueue = commands.add_parser('enqueue', help="add extraction inputs to a shared work queue")
+    enqueue.add_argument('--queue', required=True, help="SQLite queue file")
+    enqueue.add_argument('--inputs', help=inputs_help)
+    enqueue.add_argument('--retry-failed', action='store_true', help="put failed items back in the queue")
+
+    worker = commands.add_parser('worker', parents=[running, extraction],
+                                 help="process a shared work queue (run on as many hosts as needed)")
+    worker.add_argument('--queue', required=True, help="SQLite queue file, on a filesystem all workers share")
+    worker.add_argument('--processes', type=int, default=1, help="worker processes on this host (default: 1)")
+    worker.add_argument('--lease-seconds', type=float, default=120)
+    worker.add_argument('--max-attempts', type=int, default=3)
+    worker.add_argument('--wal', action='store_true', help="WAL journaling (only when all workers are on this host)")
+
+    ask = commands.add_parser('ask', parents=[common], help="answer a file of prompts")
+    ask.add_argument('--input', required=True, help=".csv or .jsonl with one prompt per row")
+    ask.add_argument('--prompt-field', default='prompt')
+    ask.add_argument('--id-field', help="column with a stable id (default: the row number)")
+    ask.add_argument('--model', default='Mistral-7B', help="key of llm_models")
+    ask.add_argument('--guidelines', help='JSON {"name": "guideline text"} added to every prompt')
+    ask.add_argument('--data', nargs='*', help="files (.csv, .txt, .md, .pdf) attached to every prompt")
+    ask.add_argument('--max-tokens', type=int)
+    ask.add_argument('--cascade', help="comma-separated llm_models keys, cheapest first; "
+                                       "an empty answer goes to the next model (e.g. Mistral-7B,Llama-3.1)")
+
+    return parser
+
+
+def main(argv: Optional[List[str]]=None) -> int:
+    args = build_parser().parse_args(argv)
+    commands = {'extract': run_extract, 'enqueue': run_enqueue, 'worker': run_worker, 'ask': run_ask}
+    return commands[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
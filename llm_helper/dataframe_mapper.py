@@ -0,0 +1,132 @@
+"""Row-wise LLM column mapping for pandas DataFrames, with several rows packed per call."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import re
+
+import pandas as pd
+
+from .scheduler import propagate, request_priority
+
+
+pack_instruction = (
+    "Answer the task below separately for each of the {n_rows} items that follow.\n"
+    "Each item starts with a tag such as [[0]]. Reply with exactly one answer per item, "
+    "starting each answer with the item's tag on its own line, in the same order, "
+    "and write nothing else.\n\n"
+    "[Task Start]\n{task}\n[Task End]\n"
+)
+
+_tag_pattern = re.compile(r"^\s*\[\[(\d+)\]\]\s*$", re.MULTILINE)
+
+
+def render_row(template: str, row: pd.Series, index) -> str:
+    """Fill template with the row's column values; `{index}` refers to the row label."""
+    return template.format(index=index, **{str(k): v for k, v in row.items()})
+
+
+def pack_prompt(rendered_rows: List[str], task: Optional[str]=None) -> str:
+    """Pack several rendered rows into a single prompt with index-tagged items."""
+
+    prompt = pack_instruction.format(n_rows=len(rendered_rows), task=task or "Respond to each item.")
+    for i, text in enumerate(rendered_rows):
+        prompt += f"\n[[{i}]]\n{text}\n"
+    return prompt
+
+
+def parse_packed_response(response: str, n_rows: int) -> Dict[int, str]:
+    """
+    Split a packed response back into per-item answers.
+
+    Returns a dict {position: answer} containing only the items whose tag was
+    found with a non-empty answer; missing items are left out so they can be re-asked.
+    """
+
+    answers = {}
+    matches = list(_tag_pattern.finditer(response or ''))
+    for i, match in enumerate(matches):
+        position = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        answer = response[match.end():end].strip()
+        if 0 <= position < n_rows and answer and position not in answers:
+            answers[position] = answer
+    return answers
+
+
+def map_dataframe(helper, df: pd.DataFrame, template: str, output_col: str, rows_per_call: int=10,
+                  task: Optional[str]=None, max_workers: int=4, max_retries: int=2,
+                  with_guideline: bool=True, with_data: bool=False, priority: str='batch') -> pd.DataFrame:
+    """
+    Ask the LLM about every row of df and store the answers in a new column.
+
+    Rows are rendered with `template` (e.g. "Name: {name}, Title: {title}"), packed
+    `rows_per_call` at a time into one prompt with index-tagged output, and the
+    calls run concurrently. Rows whose answer could not be parsed are re-asked, up
+    to `max_retries` more times; rows that still fail get None.
+
+    Args:
+        helper (AIHelper): Helper used to call the model. Its chat history is not used or modified.
+        df (pd.DataFrame): Input frame.
+        template (str): Per-row prompt, formatted with the row's columns and `{index}`.
+        output_col (str): Name of the new column.
+        rows_per_call (int): Rows packed into one request. 1 disables packing.
+        task (str, optional): Instruction shared by all rows, sent once per packed call.
+        max_workers (int): Concurrent requests.
+        max_retries (int): Extra rounds for rows whose answers were missing.
+        with_guideline (bool): Include the helper's guidelines as system message.
+        with_data (bool): Include the helper's attached data as system message.
+        priority (str): Scheduler priority class of the calls ('interactive', 'batch' or 'backfill').
+
+    Returns:
+        pd.DataFrame: A copy of df with output_col added.
+    """
+
+    if rows_per_call < 1:
+        raise ValueError("rows_per_call must be at least 1")
+
+    system_msg = helper._build_system_message(with_guideline=with_guideline, with_data=with_data)
+    rendered = [render_row(template, row, index) for index, row in df.iterrows()]
+    answers = [None] * len(rendered)
+
+    def ask_batch(positions: List[int]) -> Dict[int, str]:
+        messages = [{"role": "system", "content": system_msg}] if system_msg else []
+
+        if rows_per_call == 1:
+            # no packing: the whole response is the answer
+            prompt = rendered[positions[0]] if task is None else f"{task}\n\n{rendered[positions[0]]}"
+            messages.append({"role": "user", "content": prompt})
+            response = (helper._complete(messages) or '').strip()
+            return {positions[0]: response} if response else {}
+
+        messages.append({"role": "user", "content": pack_prompt([rendered[p] for p in positions], task)})
+        parsed = parse_packed_response(helper._complete(messages), len(positions))
+        return {positions[i]: answer for i, answer in parsed.items()}
+
+    pending = list(range(len(rendered)))
+    n_calls = 0
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+
+        batches = [pending[i:i + rows_per_call] for i in range(0, len(pending), rows_per_call)]
+        n_calls += len(batches)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, request_priority(priority):
+            for batch, future in [(b, executor.submit(propagate(ask_batch), b)) for b in batches]:
+                try:
+                    for position, answer in future.result().items():
+                        answers[position] = answer
+                except Exception as e:
+                    print(f"❌ Request for {len(batch)} rows failed: {e}")
+
+        pending = [p for p in pending if answers[p] is None]
+        if pending and attempt < max_retries:
+            print(f"Re-asking {len(pending)} rows with missing answers...")
+
+    if pending:
+        print(f"⚠️ {len(pending)} rows still have no answer after {max_retries} retries")
+    print(f"Mapped {len(rendered) - len(pending)}/{len(rendered)} rows into '{output_col}' with {n_calls} calls")
+
+    result = df.copy()
+    result[output_col] = answers
+    return result
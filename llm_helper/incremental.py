@@ -0,0 +1,188 @@
+"""Incremental re-extraction: refresh only the fields whose evidence changed between source versions."""
+
+from typing import Any, Dict, List
+import hashlib
+import json
+import os
+
+from .utils import chunk_text
+
+
+evidence_field = 'source_evidence'
+
+
+def chunk_id(chunk: str) -> str:
+    """Stable id of a chunk, derived from its content."""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()[:12]
+
+
+class IncrementalExtractor():
+    """
+    Wraps a configured InfoExtractor and keeps, per item, the chunk hashes of the
+    last source version, a field -> evidence chunk mapping, and the last result.
+
+    The first extraction of an item sends the whole source, split into tagged chunks,
+    and asks the model which chunks support each field. When the source changes, the
+    chunks are diffed and only the fields whose evidence chunks changed (and the
+    fields that had no evidence, when chunks were added) are re-extracted from the
+    changed chunks; the answers are merged into the previous result.
+
+    The state file is an append-only log: each extraction appends one JSON line with
+    the item's new state, and the last line per item wins when the file is loaded.
+    The log is compacted (rewritten with one line per item) when it grows beyond
+    `compact_ratio` times the number of items.
+
+    Args:
+        extractor (InfoExtractor): Extractor with schema and prompts loaded.
+        state_path (str): JSONL file where the per-item state is kept between runs.
+        target_chunk_size (int): Passed to utils.chunk_text().
+        compact_ratio (float): Compact when the log has more than this many lines per item.
+    """
+
+    def __init__(self, extractor, state_path: str, target_chunk_size: int=1500, compact_ratio: float=2.0):
+        self.extractor = extractor
+        self.state_path = state_path
+        self.target_chunk_size = target_chunk_size
+        self.compact_ratio = compact_ratio
+        self._log_lines = 0
+        self.state = self._load_state()
+
+    def extract(self, technology_name: str, info_source: str, max_retries: int=3, verbose: bool=False):
+        """
+        Extract (or refresh) the item, returning a validated DataSchema instance.
+        """
+
+        self.extractor.validate_setup(require_source=False)
+
+        chunks = chunk_text(info_source, target_size=self.target_chunk_size)
+        ids = [chunk_id(c) for c in chunks]
+        by_id = dict(zip(ids, chunks))
+        field_names = list(self.extractor.schema_data['fields'])
+
+        previous = self.state.get(technology_name)
+        if previous is None or set(previous['result']) != set(field_names):
+            print(f"Full extraction for {technology_name}: {len(field_names)} fields, {len(chunks)} chunks")
+            values, evidence = self._extract_fields(technology_name, field_names, ids, by_id, max_retries, verbose)
+            result, evidence_map = values, evidence
+        else:
+            old_ids = set(previous['chunk_ids'])
+            removed = old_ids - set(ids)
+            added = [i for i in ids if i not in old_ids]
+
+            affected = [
+                f for f in field_names
+                if set(previous['evidence'].get(f, [])) & removed
+                or (added and not previous['evidence'].get(f))
+            ]
+
+            if not affected:
+                print(f"No relevant changes for {technology_name} ({len(added)} chunks added, {len(removed)} removed); "
+                      f"reusing previous result")
+                result, evidence_map = dict(previous['result']), dict(previous['evidence'])
+            else:
+                # changed chunks, plus the unchanged evidence of the affected fields for context
+                context_ids = list(added)
+                for f in affected:
+                    context_ids += [i for i in previous['evidence'].get(f, []) if i in by_id and i not in context_ids]
+                context_ids.sort(key=ids.index)
+
+                print(f"Incremental extraction for {technology_name}: re-extracting {len(affected)}/{len(field_names)} "
+                      f"fields from {len(context_ids)}/{len(chunks)} chunks")
+                values, evidence = self._extract_fields(technology_name, affected, context_ids, by_id, max_retries, verbose)
+
+                result = dict(previous['result'])
+                result.update(values)
+                evidence_map = {f: [i for i in ev if i in by_id] for f, ev in previous['evidence'].items()}
+                evidence_map.update(evidence)
+
+        validated = self.extractor.DataSchema.model_validate(result)
+        self.state[technology_name] = {
+            'chunk_ids': ids,
+            'evidence': evidence_map,
+            'result': validated.model_dump(mode='json'),
+        }
+        self._append_state(technology_name)
+        return validated
+
+    def _extract_fields(self, technology_name: str, field_names: List[str], chunk_ids: List[str],
+                        by_id: Dict[str, str], max_retries: int, verbose: bool):
+        """Extract a subset of the schema fields, with evidence, from the given chunks."""
+
+        extractor = self.extractor
+        field_specs = {f: extractor.schema_data['fields'][f] for f in field_names}
+        field_specs[evidence_field] = {
+            'field_type': 'Dict[str, List[str]]',
+            'description': "For each extracted field, the ids of the source chunks (the [chunk ...] tags) "
+                           "that support its value; an empty list if the source does not mention it",
+        }
+        partial_model = extractor._build_schema_model(f"{extractor.DataSchema.__name__}Partial", field_specs)
+
+        from langchain_core.output_parsers import JsonOutputParser
+        parser = JsonOutputParser(pydantic_object=partial_model)
+
+        tagged_source = "\n\n".join(f"[chunk {i}]\n{by_id[i]}" for i in chunk_ids)
+        response = (extractor.base_prompt | extractor._chat_model()).invoke({
+            "technology_name": technology_name,
+            "info_source": tagged_source,
+            "format_instructions": parser.get_format_instructions()
+        })
+        parsed = extractor._parse_with_fix(response.content, technology_name, parser, max_retries, verbose)
+        validated = extractor._validate_with_fix(parsed, model=partial_model, parser=parser,
+                                                 max_retries=max_retries, verbose=verbose)
+        if validated is None:
+            raise ValueError(f"Could not extract fields {field_names} for {technology_name}")
+
+        data = validated.model_dump(mode='json')
+        raw_evidence = data.pop(evidence_field) or {}
+        evidence = {f: [i for i in raw_evidence.get(f, []) if i in by_id] for f in field_names}
+        return data, evidence
+
+    def forget(self, technology_name: str):
+        """Drop the stored state of an item, so its next extraction is a full one."""
+        if self.state.pop(technology_name, None) is not None:
+            self._append_state(technology_name)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return {}
+
+        state = {}
+        rewrite = False
+        with open(self.state_path, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from a crash; that item is simply extracted again
+                    rewrite = True
+                    continue
+                self._log_lines += 1
+                if entry['state'] is None:
+                    state.pop(entry['item'], None)
+                else:
+                    state[entry['item']] = entry['state']
+
+        if rewrite:
+            self._compact(state)
+        return state
+
+    def _append_state(self, technology_name: str):
+        """Append the item's current state (None after forget()) to the log."""
+        entry = {'item': technology_name, 'state': self.state.get(technology_name)}
+        with open(self.state_path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._log_lines += 1
+
+        if self._log_lines > self.compact_ratio * max(len(self.state), 1):
+            self._compact(self.state)
+
+    def _compact(self, state: Dict[str, Any]):
+        """Rewrite the log with one line per item."""
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            for item, item_state in state.items():
+                fh.write(json.dumps({'item': item, 'state': item_state}) + "\n")
+        os.replace(tmp_path, self.state_path)
+        self._log_lines = len(state)
@@ -1,7 +1,9 @@
 
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+import json
 import os
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, create_model
 
 from langchain_core.exceptions import OutputParserException
 
@@ -9,21 +11,126 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from .cascade import Escalate, ModelCascade
+from .scheduler import ScheduledChatModel, get_scheduler, propagate
+
+# rough output size (tokens) of one field value, by declared field type
+field_token_estimates = {
+    'str': 60,
+    'int': 6,
+    'float': 8,
+    'bool': 4,
+    'List': 80,
+    'Dict': 80,
+}
+
+
+def estimate_field_tokens(field_name: str, field_info: Dict[str, str]) -> int:
+    """
+    Estimates the number of output tokens a field adds to the JSON answer.
+    """
+    field_type = field_info['field_type']
+    for type_name, estimate in field_token_estimates.items():
+        if type_name in field_type:
+            return estimate + len(field_name) // 4 + 2
+    return field_token_estimates['str'] + len(field_name) // 4 + 2
+
+
+def partition_fields(field_specs: Dict[str, Dict[str, str]], max_group_tokens: int=300) -> List[List[str]]:
+    """
+    Splits schema fields into groups whose estimated output size stays under
+    max_group_tokens (first-fit decreasing), so they can be extracted in parallel.
+    """
+    sizes = {name: estimate_field_tokens(name, info) for name, info in field_specs.items()}
+
+    groups = []
+    group_sizes = []
+    for name in sorted(sizes, key=lambda n: -sizes[n]):
+        for i, size in enumerate(group_sizes):
+            if size + sizes[name] <= max_group_tokens:
+                groups[i].append(name)
+                group_sizes[i] += sizes[name]
+                break
+        else:
+            groups.append([name])
+            group_sizes.append(sizes[name])
+
+    # keep the schema's field order inside each group
+    order = list(field_specs)
+    return [sorted(group, key=order.index) for group in groups]
+
+
+def local_repair(text: str) -> str:
+    """
+    Deterministic fixes for common JSON slips, tried before asking a model to repair
+    its output: code fences and prose around the object, trailing commas, and Python
+    literals (None/True/False).
+    """
+    import re
+
+    start, end = text.find('{'), text.rfind('}')
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    text = re.sub(r',\s*([}\]])', r'\1', text)
+    text = re.sub(r'(?<=[:\[,\s])None(?=\s*[,}\]])', 'null', text)
+    text = re.sub(r'(?<=[:\[,\s])True(?=\s*[,}\]])', 'true', text)
+    return re.sub(r'(?<=[:\[,\s])False(?=\s*[,}\]])', 'false', text)
+
+
 class InfoExtractor():
-    def __init__(self, api_provider: str='google', model: str='gemini-2.5-flash', path_env: str=''):
+    def __init__(self, api_provider: str='google', model: str='gemini-2.5-flash', path_env: str='', llm=None):
 
         self.DataSchema = None  # Placeholder for the Pydantic model
-        
-        if api_provider == 'google':
-            llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.0
-        )
-        else:
-            raise ValueError(f"Unsupported API provider: {api_provider}")
-        
+        self.api_provider = api_provider
+        self.model = model
+        self.cascade = None     # ModelCascade set by set_cascade()
+        self.schemas = {}       # schemas registered for extract_multi()
+
+        # a pre-built chat model can be passed in, e.g. shared between extractors or a local stand-in
+        if llm is None:
+            llm = self._build_llm(model)
+
         self.llm = llm
+        self.scheduler_session = f"InfoExtractor-{id(self):x}"     # fair-queuing key when a scheduler is set
+
+    def _build_llm(self, model: str):
+        if self.api_provider == 'google':
+            return ChatGoogleGenerativeAI(
+                model=model,
+                google_api_key=os.getenv("GEMINI_API_KEY"),
+                temperature=0.0
+            )
+        raise ValueError(f"Unsupported API provider: {self.api_provider}")
+
+    def _chat_model(self, llm=None):
+        """The chat model for a chain: llm (default self.llm), routed through the process-wide scheduler when one is set."""
+        llm = llm if llm is not None else self.llm
+        if get_scheduler() is None:
+            return llm
+        return ScheduledChatModel(llm=llm, session=self.scheduler_session)
+
+    def set_cascade(self, models: Optional[List[Any]], min_confidence: Optional[float]=None,
+                    confidence=None, costs: Optional[List[float]]=None,
+                    names: Optional[List[str]]=None) -> Optional[ModelCascade]:
+        """
+        Extract with a cascade of models, cheapest first: extract_from() (and the jobs
+        built on it) tries each model in turn and keeps the first result that parses
+        (directly or after local_repair()), validates against the DataSchema, and, with
+        min_confidence, scores at least that high (default score: share of filled fields).
+        Only the last model gets the fix prompt. models are model names of the
+        extractor's provider or chat model objects; None turns the cascade off.
+        Returns the ModelCascade, whose report() shows the per-tier hit rates.
+        """
+
+        if models is None:
+            self.cascade = None
+            return None
+
+        tiers = [self._build_llm(m) if isinstance(m, str) else m for m in models]
+        names = names or [m if isinstance(m, str) else str(getattr(m, 'model', None) or type(m).__name__) for m in models]
+        self.cascade = ModelCascade(tiers, names=names, confidence=confidence, min_confidence=min_confidence, costs=costs)
+        print(f"Cascade: {' -> '.join(names)}")
+        return self.cascade
 
 
     def load_data_schema(self, schema_data: Dict[str, Any]) -> BaseModel:
@@ -31,22 +138,65 @@ class InfoExtractor():
         Dynamically creates a Pydantic model based on the provided schema data.
         """
 
+        self.schema_data = schema_data
+        self.DataSchema = self._build_schema_model(schema_data['tech_type'], schema_data['fields'])
+
+        self.parser = JsonOutputParser(pydantic_object=self.DataSchema)
+
+        # container used to extract many entities in one call
+        self.DataSchemaList = create_model(
+            f"{schema_data['tech_type']}List",
+            items=(List[self.DataSchema], Field(description=f"All {schema_data['tech_type']} entities found in the source")),
+        )
+        self.list_parser = JsonOutputParser(pydantic_object=self.DataSchemaList)
+    
+
+    @staticmethod
+    def _build_schema_model(model_name: str, field_specs: Dict[str, Dict[str, str]]) -> type:
+        """
+        Builds a Pydantic model from {field_name: {'field_type', 'description'}} specs.
+        """
+
         # Dynamically build the fields dictionary
         fields = {}
-        for field_name, field_info in schema_data['fields'].items():
+        for field_name, field_info in field_specs.items():
             field_type = eval(field_info['field_type'])
             field_description = field_info['description']
             fields[field_name] = (field_type, Field(description=field_description))
 
         # Create the Pydantic model dynamically
-        self.DataSchema = type(schema_data['tech_type'], (BaseModel,), {
+        return type(model_name, (BaseModel,), {
             '__annotations__': {k: v[0] for k, v in fields.items()},
             **{k: v[1] for k, v in fields.items()},
             '__doc__': "Schema for a storage technology."
         })
 
-        self.parser = JsonOutputParser(pydantic_object=self.DataSchema)
-    
+
+    def register_schema(self, schema_name: str, schema_data: Dict[str, Any]):
+        """
+        Registers an additional schema for extract_multi(), which extracts all
+        registered schemas from one source in a single call.
+        """
+        model = self._build_schema_model(schema_data['tech_type'], schema_data['fields'])
+        self.schemas[schema_name] = {
+            'model': model,
+            'parser': JsonOutputParser(pydantic_object=model),
+            'description': schema_data.get('description', f"{schema_data['tech_type']} information"),
+        }
+        print(f"Schema registered: {schema_name} ({len(schema_data['fields'])} fields)")
+
+
+    def create_result_collector(self, **kwargs):
+        """
+        Returns a ResultCollector with typed columns derived from the loaded DataSchema,
+        for exporting many results to pandas, Arrow or Parquet in one step.
+        """
+        if self.DataSchema is None:
+            raise ValueError("DataSchema not loaded. Call load_data_schema() first.")
+
+        from .result_collector import ResultCollector
+        return ResultCollector(self.DataSchema, **kwargs)
+
 
     def load_prompt_templates(self, base_prompt_dict: Dict[str, str], fix_prompt_dict: Dict[str, str]):
         """
@@ -76,10 +226,16 @@ class InfoExtractor():
         self.info_source = info_source
 
 
-    def validate_setup(self) -> bool:
+    def validate_setup(self, require_source: bool=True, require_schema: bool=True) -> bool:
         """
         Validates that all required components are set up before extraction.
         
+        Args:
+            require_source (bool): Also check that load_info_source() was called.
+                Set to False when the source is passed directly to extract_from().
+            require_schema (bool): Also check that load_data_schema() was called.
+                Set to False for extract_multi(), which uses the registered schemas.
+        
         Returns:
             bool: True if all required components are configured.
         
@@ -88,10 +244,10 @@ class InfoExtractor():
         """
         errors = []
         
-        if self.DataSchema is None:
+        if require_schema and self.DataSchema is None:
             errors.append("DataSchema not loaded. Call load_data_schema() first.")
         
-        if not hasattr(self, 'parser') or self.parser is None:
+        if require_schema and (not hasattr(self, 'parser') or self.parser is None):
             errors.append("Parser not initialized. Call load_data_schema() first.")
         
         if not hasattr(self, 'base_prompt') or self.base_prompt is None:
@@ -100,10 +256,10 @@ class InfoExtractor():
         if not hasattr(self, 'fix_prompt') or self.fix_prompt is None:
             errors.append("Fix prompt not loaded. Call load_prompt_templates() first.")
         
-        if not hasattr(self, 'technology_name') or not self.technology_name:
+        if require_source and (not hasattr(self, 'technology_name') or not self.technology_name):
             errors.append("Technology name not set. Call load_info_source() first.")
         
-        if not hasattr(self, 'info_source') or not self.info_source:
+        if require_source and (not hasattr(self, 'info_source') or not self.info_source):
             errors.append("Info source not set. Call load_info_source() first.")
         
         if errors:
@@ -122,28 +278,96 @@ class InfoExtractor():
         if not self.validate_setup():
             return None
 
-        print(f"Attempting to generate technology description for: **{self.technology_name}**")
+        return self.extract_from(self.technology_name, self.info_source, max_retries=max_retries)
+
+
+    def extract_from(self, technology_name: str, info_source: str, max_retries: int=3, verbose: bool=True) -> BaseModel:
+        """
+        Same as extract_tech_info(), but takes the source directly instead of
+        reading it from load_info_source(). Does not modify the extractor, so it
+        can be used for batch jobs over many items.
+        """
+
+        if not self.validate_setup(require_source=False):
+            return None
+
+        if self.cascade is not None:
+            last = self.cascade.tiers[-1]
+            return self.cascade.run(lambda llm: self._extract_tier(
+                llm, technology_name, info_source, final=(llm is last), max_retries=max_retries, verbose=verbose
+            ))
+
+        if verbose:
+            print(f"Attempting to generate technology description for: **{technology_name}**")
         
         # 1. First Attempt - Use the base generation chain
-        base_chain = self.base_prompt | self.llm 
+        base_chain = self.base_prompt | self._chat_model() 
         
         # Get the LLM's initial response (potentially malformed JSON string)
         initial_response = base_chain.invoke({
-            "technology_name": self.technology_name, 
-            "info_source": self.info_source,
+            "technology_name": technology_name, 
+            "info_source": info_source,
             "format_instructions": self.parser.get_format_instructions()
         })
         json_output = initial_response.content
 
-        print(f"Initial JSON Output:\n{json_output}")
+        if verbose:
+            print(f"Initial JSON Output:\n{json_output}")
+
+        # 2. Parse, repairing with the fix prompt when needed
+        return self._parse_with_fix(json_output, technology_name, self.parser, max_retries, verbose)
+
+
+    def _extract_tier(self, llm, technology_name: str, info_source: str, final: bool,
+                      max_retries: int=3, verbose: bool=True) -> Dict[str, Any]:
+        """One cascade attempt: raises Escalate when the tier's answer cannot be used."""
+
+        if verbose:
+            print(f"Attempting to generate technology description for: **{technology_name}** "
+                  f"({getattr(llm, 'model', None) or type(llm).__name__})")
+
+        response = (self.base_prompt | self._chat_model(llm)).invoke({
+            "technology_name": technology_name,
+            "info_source": info_source,
+            "format_instructions": self.parser.get_format_instructions()
+        })
+        json_output = response.content
+
+        if final:
+            # nothing stronger is left: use the fix prompt as usual
+            parsed = self._parse_with_fix(json_output, technology_name, self.parser, max_retries, verbose, llm=llm)
+        else:
+            try:
+                parsed = self.parser.parse(json_output)
+            except OutputParserException:
+                try:
+                    parsed = self.parser.parse(local_repair(json_output))
+                except OutputParserException as e:
+                    raise Escalate('parse', str(e)[:200])
+
+        try:
+            self.DataSchema.model_validate(parsed)
+        except ValidationError as e:
+            if final:
+                raise ValueError(f"Result does not match {self.DataSchema.__name__}: {e}")
+            raise Escalate('validation', str(e)[:200])
+        return parsed
+
+
+    def _parse_with_fix(self, json_output: str, technology_name: str, parser: JsonOutputParser,
+                        max_retries: int=3, verbose: bool=True, llm=None) -> Any:
+        """
+        Parses json_output with parser, running the fix prompt on failure until
+        parsing succeeds or max_retries is reached.
+        """
 
-        
-        # 2. Start the Retry Loop
         for attempt in range(max_retries):
             try:
                 # Attempt to parse the JSON using the Pydantic parser
-                print(f"\n✅ Attempt {attempt + 1}: Parsing successful!")
-                return self.parser.parse(json_output)
+                parsed = parser.parse(json_output)
+                if verbose:
+                    print(f"\n✅ Attempt {attempt + 1}: Parsing successful!")
+                return parsed
             
             except OutputParserException as e:
                 # If parsing fails, proceed to fixing mechanism
@@ -151,21 +375,387 @@ class InfoExtractor():
                     # Last attempt failed, raise error
                     raise OutputParserException(f"Failed to parse output after {max_retries} retries.")
                 
-                print(f"❌ Attempt {attempt + 1}: Parsing failed (Error: {e}). Retrying with fix prompt...")
+                if verbose:
+                    print(f"❌ Attempt {attempt + 1}: Parsing failed (Error: {e}). Retrying with fix prompt...")
                 
                 # Use the fixing prompt and LLM to repair the output
-                fix_chain = self.fix_prompt | self.llm
+                fix_chain = self.fix_prompt | self._chat_model(llm)
                 
                 fix_response = fix_chain.invoke({
-                    "technology_name": self.technology_name, 
-                    "format_instructions": self.parser.get_format_instructions(),
+                    "technology_name": technology_name, 
+                    "format_instructions": parser.get_format_instructions(),
                     "malformed_output": json_output 
                 })
                 
                 # Update json_output with the new, hopefully fixed, JSON content
                 json_output = fix_response.content
 
-                print(f"Fixed JSON Output:\n{json_output}")
+                if verbose:
+                    print(f"Fixed JSON Output:\n{json_output}")
         
         # Should not be reached if max_retries is hit, but included for completeness
-        raise OutputParserException(f"Failed to parse output after {max_retries} retries. Last output: {json_output}")
\ No newline at end of file
+        raise OutputParserException(f"Failed to parse output after {max_retries} retries. Last output: {json_output}")
+
+
+    def extract_entities(self, entity_names: Optional[List[str]]=None, max_entities_per_call: int=10,
+                         max_retries: int=3, verbose: bool=True, discover: bool=True) -> List[BaseModel]:
+        """
+        Extracts many entities from the loaded info source into a list of DataSchema
+        objects, instead of one extract_tech_info() call per entity.
+
+        Args:
+            entity_names (List[str], optional): Entities to extract. They are split into
+                calls of at most max_entities_per_call names. If None, the technology name
+                from load_info_source() describes what to look for (see discover).
+            max_entities_per_call (int): Maximum number of named entities per call.
+            max_retries (int): Retry budget for the whole response and for each element.
+            verbose (bool): Print intermediate outputs.
+            discover (bool): Without entity_names, first list the entity names in the
+                source (a short answer), then extract them in groups as above, so a
+                source with many entities does not overflow one response. False
+                requests all entities in a single call.
+
+        Returns:
+            List[BaseModel]: One validated DataSchema instance per entity. Elements that
+            cannot be repaired are skipped and listed in self.failed_entities.
+        """
+
+        if not self.validate_setup():
+            return None
+
+        calls = 0
+        if not entity_names and discover:
+            entity_names = self._discover_entities(max_retries=max_retries, verbose=verbose)
+            calls += 1
+
+        if entity_names:
+            name_groups = [
+                entity_names[i:i + max_entities_per_call]
+                for i in range(0, len(entity_names), max_entities_per_call)
+            ]
+        else:
+            name_groups = [None]
+
+        self.failed_entities = []
+        entities = []
+        for names in name_groups:
+            technology_name = ", ".join(names) if names else self.technology_name
+            if verbose:
+                print(f"Attempting to extract entities for: **{technology_name}**")
+
+            base_chain = self.base_prompt | self._chat_model()
+            response = base_chain.invoke({
+                "technology_name": technology_name,
+                "info_source": self.info_source,
+                "format_instructions": self.list_parser.get_format_instructions()
+            })
+            if verbose:
+                print(f"Initial JSON Output:\n{response.content}")
+
+            parsed = self._parse_with_fix(response.content, technology_name, self.list_parser, max_retries, verbose)
+
+            # accept both {"items": [...]} and a bare list
+            elements = parsed.get('items', []) if isinstance(parsed, dict) else parsed
+            for element in elements or []:
+                entity = self._validate_with_fix(element, max_retries=max_retries, verbose=verbose)
+                if entity is not None:
+                    entities.append(entity)
+                else:
+                    self.failed_entities.append(element)
+
+        print(f"Extracted {len(entities)} entities in {calls + len(name_groups)} call(s)"
+              + (f"; {len(self.failed_entities)} failed validation" if self.failed_entities else ""))
+        return entities
+
+
+    def _discover_entities(self, max_retries: int=3, verbose: bool=True) -> List[str]:
+        """Names of the entities in the loaded info source, for extract_entities()."""
+        names_model = create_model(
+            f"{self.DataSchema.__name__}Names",
+            names=(List[str], Field(description=f"The name of every {self.technology_name} described in the source")),
+        )
+        parser = JsonOutputParser(pydantic_object=names_model)
+        response = (self.base_prompt | self._chat_model()).invoke({
+            "technology_name": self.technology_name,
+            "info_source": self.info_source,
+            "format_instructions": parser.get_format_instructions()
+        })
+        parsed = self._parse_with_fix(response.content, self.technology_name, parser, max_retries, verbose)
+        names = parsed.get('names', []) if isinstance(parsed, dict) else parsed
+
+        # keep the order of first mention, without duplicates
+        unique = list(dict.fromkeys(str(n).strip() for n in names or [] if str(n).strip()))
+        if verbose:
+            print(f"Found {len(unique)} entities: {', '.join(unique)}")
+        return unique
+
+
+    def _validate_with_fix(self, element: Any, model: type=None, parser: JsonOutputParser=None,
+                           max_retries: int=3, verbose: bool=True) -> Optional[BaseModel]:
+        """
+        Validates a single element against model (default: DataSchema), repairing only
+        that element with the fix prompt when validation fails. Returns None if it
+        still fails after max_retries attempts.
+        """
+
+        model = model or self.DataSchema
+        parser = parser or self.parser
+
+        name = element.get('name', model.__name__) if isinstance(element, dict) else model.__name__
+        for attempt in range(max_retries):
+            try:
+                return model.model_validate(element)
+            except ValidationError as e:
+                if attempt >= max_retries - 1:
+                    break
+                if verbose:
+                    print(f"❌ Element '{name}' failed validation (Error: {e}). Retrying with fix prompt...")
+
+                fix_chain = self.fix_prompt | self._chat_model()
+                fix_response = fix_chain.invoke({
+                    "technology_name": name,
+                    "format_instructions": parser.get_format_instructions(),
+                    "malformed_output": json.dumps(element, default=str)
+                })
+                try:
+                    element = parser.parse(fix_response.content)
+                except OutputParserException:
+                    continue
+
+        if verbose:
+            print(f"⚠️ Skipping element '{name}' after {max_retries} attempts")
+        return None
+
+
+    def extract_multi(self, max_retries: int=3, verbose: bool=True) -> Dict[str, Optional[BaseModel]]:
+        """
+        Extracts every schema registered with register_schema() from the loaded info
+        source in a single LLM call, using an envelope schema with one section per
+        registered schema. Each section is validated on its own, and only failing
+        sections are sent through the fix prompt. A section missing from the response
+        is re-extracted on its own with the base prompt.
+
+        Returns:
+            Dict[str, BaseModel]: {schema_name: validated object}. Sections that cannot
+            be repaired are None and listed in self.failed_sections.
+        """
+
+        if not self.schemas:
+            raise ValueError("Setup validation failed:\n- No schemas registered. Call register_schema() first.")
+        self.validate_setup(require_schema=False)
+
+        envelope, envelope_parser = self._envelope()
+
+        if verbose:
+            print(f"Attempting to extract {len(self.schemas)} schemas for: **{self.technology_name}**")
+
+        base_chain = self.base_prompt | self._chat_model()
+        response = base_chain.invoke({
+            "technology_name": self.technology_name,
+            "info_source": self.info_source,
+            "format_instructions": envelope_parser.get_format_instructions()
+        })
+        if verbose:
+            print(f"Initial JSON Output:\n{response.content}")
+
+        parsed = self._parse_with_fix(response.content, self.technology_name, envelope_parser, max_retries, verbose)
+        if not isinstance(parsed, dict):
+            parsed = {}
+
+        self.failed_sections = []
+        results = {}
+        reextracted = 0
+        for schema_name, schema in self.schemas.items():
+            section = parsed.get(schema_name)
+            if not isinstance(section, dict):
+                # nothing to repair: ask for this schema alone, with the source
+                if verbose:
+                    print(f"❌ Section '{schema_name}' missing from the response. Re-extracting it...")
+                reextracted += 1
+                response = base_chain.invoke({
+                    "technology_name": self.technology_name,
+                    "info_source": self.info_source,
+                    "format_instructions": schema['parser'].get_format_instructions()
+                })
+                try:
+                    section = self._parse_with_fix(response.content, self.technology_name, schema['parser'],
+                                                   max_retries, verbose)
+                except OutputParserException:
+                    section = None
+            results[schema_name] = None if not isinstance(section, dict) else self._validate_with_fix(
+                section, model=schema['model'], parser=schema['parser'], max_retries=max_retries, verbose=verbose
+            )
+            if results[schema_name] is None:
+                self.failed_sections.append(schema_name)
+
+        print(f"Extracted {len(self.schemas) - len(self.failed_sections)}/{len(self.schemas)} schemas in {1 + reextracted} call(s)"
+              + (f"; failed: {', '.join(self.failed_sections)}" if self.failed_sections else ""))
+        return results
+
+
+    def _envelope(self):
+        """Envelope model with one field per registered schema, and its parser."""
+        envelope = create_model(
+            'MultiSchemaEnvelope',
+            **{name: (schema['model'], Field(description=schema['description'])) for name, schema in self.schemas.items()}
+        )
+        return envelope, JsonOutputParser(pydantic_object=envelope)
+
+
+    def extract_tech_info_grouped(self, groups: Optional[List[List[str]]]=None, max_group_tokens: int=300,
+                                  max_workers: int=8, max_retries: int=3, verbose: bool=False) -> BaseModel:
+        """
+        Extracts the loaded info source with the schema split into field groups that
+        are requested concurrently, then merged into one DataSchema instance. Latency
+        follows the largest group instead of the whole object, and a malformed field
+        only sends its own group through the fix prompt.
+
+        Args:
+            groups (List[List[str]], optional): Field names per group. Fields left out
+                form one extra group. Default: partition_fields() by estimated output size.
+            max_group_tokens (int): Estimated output size per group for automatic partitioning.
+            max_workers (int): Maximum concurrent requests.
+            max_retries (int): Retry budget per group.
+            verbose (bool): Print intermediate outputs.
+
+        Returns:
+            BaseModel: Validated DataSchema instance.
+        """
+
+        if not self.validate_setup():
+            return None
+
+        field_specs = self.schema_data['fields']
+        if groups is None:
+            groups = partition_fields(field_specs, max_group_tokens=max_group_tokens)
+        else:
+            unknown = [f for group in groups for f in group if f not in field_specs]
+            if unknown:
+                raise ValueError(f"Unknown fields in groups: {unknown}")
+            covered = {f for group in groups for f in group}
+            rest = [f for f in field_specs if f not in covered]
+            groups = [list(group) for group in groups if group] + ([rest] if rest else [])
+
+        print(f"Extracting {len(field_specs)} fields for **{self.technology_name}** in {len(groups)} parallel groups")
+
+        def extract_group(i: int, field_names: List[str]) -> Dict[str, Any]:
+            model = self._build_schema_model(f"{self.DataSchema.__name__}Group{i + 1}",
+                                             {f: field_specs[f] for f in field_names})
+            parser = JsonOutputParser(pydantic_object=model)
+
+            response = (self.base_prompt | self._chat_model()).invoke({
+                "technology_name": self.technology_name,
+                "info_source": self.info_source,
+                "format_instructions": parser.get_format_instructions()
+            })
+            parsed = self._parse_with_fix(response.content, self.technology_name, parser, max_retries, verbose)
+            validated = self._validate_with_fix(parsed, model=model, parser=parser, max_retries=max_retries, verbose=verbose)
+            if validated is None:
+                raise OutputParserException(f"Failed to extract field group {i + 1} ({', '.join(field_names)}) "
+                                            f"after {max_retries} retries.")
+            return validated.model_dump()
+
+        merged = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(propagate(extract_group), i, group) for i, group in enumerate(groups)]
+            for future in futures:
+                merged.update(future.result())
+
+        return self.DataSchema.model_validate(merged)
+
+
+    def extract_tech_info_streaming(self, max_retries: int=3, max_preamble: int=200,
+                                    on_field=None, verbose: bool=True) -> BaseModel:
+        """
+        Like extract_tech_info(), but streams the response into an incremental JSON
+        validator. Completed fields are validated (and passed to on_field(name, value))
+        while the rest is still being generated; as soon as the output is clearly
+        off-schema the stream is stopped right away. Malformed JSON (unknown key, type
+        mismatch, malformed value) goes to the fix prompt; a long prose preamble or a
+        truncated response has no usable JSON to fix, so the base prompt is re-run.
+
+        Args:
+            max_retries (int): Retry budget for the repair.
+            max_preamble (int): Characters of text allowed before the JSON object.
+            on_field (callable, optional): Called with (field_name, value) for every validated field.
+            verbose (bool): Print progress.
+
+        Returns:
+            BaseModel: Validated DataSchema instance.
+        """
+
+        from .stream_validator import StreamAbort, StreamingJSONValidator
+
+        if not self.validate_setup():
+            return None
+
+        def report_field(name, value):
+            if verbose:
+                print(f"✅ {name}: {value!r}")
+            if on_field is not None:
+                on_field(name, value)
+
+        validator = StreamingJSONValidator(self.DataSchema, max_preamble=max_preamble, on_field=report_field)
+
+        if verbose:
+            print(f"Streaming technology description for: **{self.technology_name}**")
+
+        base_chain = self.base_prompt | self._chat_model()
+        base_input = {
+            "technology_name": self.technology_name,
+            "info_source": self.info_source,
+            "format_instructions": self.parser.get_format_instructions()
+        }
+        stream = base_chain.stream(base_input)
+
+        abort = None
+        try:
+            for chunk in stream:
+                content = chunk.content
+                if isinstance(content, list):
+                    content = "".join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+                validator.feed(content)
+                if validator.complete:
+                    break
+            result = validator.finish()
+        except StreamAbort as e:
+            abort = e
+        finally:
+            # stops the generation on the provider side
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+        if abort is None:
+            validated = self._validate_with_fix(result, max_retries=max_retries, verbose=verbose)
+            if validated is not None:
+                return validated
+            json_output = json.dumps(result, default=str)
+            reason = "validation failed"
+        elif abort.kind in ('preamble', 'truncated'):
+            # the fix prompt does not include the source, so it cannot complete a missing object
+            if verbose:
+                print(f"❌ Stopped after {len(abort.received)} characters: {abort.reason}. Re-running the base prompt...")
+            response = base_chain.invoke(base_input)
+            parsed = self._parse_with_fix(response.content, self.technology_name, self.parser, max_retries, verbose)
+            validated = self._validate_with_fix(parsed, max_retries=max_retries, verbose=verbose)
+            if validated is None:
+                raise OutputParserException(f"Failed to parse output after {max_retries} retries.")
+            return validated
+        else:
+            json_output = abort.received
+            reason = abort.reason
+
+        if verbose:
+            print(f"❌ Stopped after {len(json_output)} characters: {reason}. Repairing with fix prompt...")
+
+        fix_response = (self.fix_prompt | self._chat_model()).invoke({
+            "technology_name": self.technology_name,
+            "format_instructions": self.parser.get_format_instructions(),
+            "malformed_output": f"{json_output}\n\n[Output stopped: {reason}]"
+        })
+        parsed = self._parse_with_fix(fix_response.content, self.technology_name, self.parser, max_retries, verbose)
+        validated = self._validate_with_fix(parsed, max_retries=max_retries, verbose=verbose)
+        if validated is None:
+            raise OutputParserException(f"Failed to parse output after {max_retries} retries.")
+        return validated
@@ -0,0 +1,335 @@
+"""Checkpointed, resumable batch jobs for InfoExtractor."""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import datetime
+import json
+import os
+import signal
+import threading
+import time
+
+from pydantic import BaseModel, ValidationError
+
+from .scheduler import propagate, request_priority
+
+
+def run_bounded(fn: Callable[[Any], Any], items: Iterable[Any], max_workers: int=1,
+                max_pending: Optional[int]=None) -> Iterator[Any]:
+    """
+    Apply fn to items with at most `max_workers` calls in flight, yielding results as
+    they complete. Items are consumed lazily: at most `max_pending` (default
+    2 * max_workers) are taken from the iterable ahead of the results.
+    """
+
+    if max_workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    max_pending = max_pending or 2 * max_workers
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = set()
+    try:
+        for item in items:
+            pending.add(executor.submit(propagate(fn), item))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # the consumer stopped early (or an error): drop what has not started yet
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _is_part(record: Dict[str, Any]) -> bool:
+    """Whether a record is one part of a split document (see pipeline.IngestionPipeline)."""
+    return isinstance(record.get('part_of'), str)
+
+
+class CheckpointStore():
+    """
+    Append-only store of per-item job records.
+
+    Two formats are supported:
+    - 'jsonl': one JSON record per line, flushed and fsync'ed after every append.
+    - 'parquet': a directory of part files, one written every `flush_every` records
+      (requires pandas + pyarrow). Records still buffered are written by flush() and
+      close(), but a crash (or kill -9) loses them, so up to `flush_every - 1` items
+      are redone on the next run; a lower value narrows that window at the cost of
+      more, smaller part files.
+
+    Each record has at least `item_id` and `status` ('ok' or 'failed').
+    """
+
+    def __init__(self, path: str, format: Optional[str]=None, flush_every: int=50):
+
+        if format is None:
+            format = 'jsonl' if path.endswith('.jsonl') else 'parquet'
+        if format not in ('jsonl', 'parquet'):
+            raise ValueError(f"Unsupported checkpoint format: {format}")
+
+        self.path = path
+        self.format = format
+        self.flush_every = flush_every
+
+        self._buffer = []
+        self._file = None
+        self._lock = threading.Lock()
+
+        if format == 'parquet':
+            os.makedirs(path, exist_ok=True)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """Read every record written so far (including previous runs)."""
+
+        if self.format == 'jsonl':
+            if not os.path.exists(self.path):
+                return []
+            records = []
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                for line in fh:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # a torn last line from a crash; the item will simply be redone
+                        continue
+            return records
+
+        import pandas as pd
+
+        records = []
+        for part in self._part_files():
+            df = pd.read_parquet(os.path.join(self.path, part))
+            for row in df.to_dict(orient='records'):
+                raw = row.pop('result_json', None)
+                row['result'] = json.loads(raw) if raw else None
+                records.append(row)
+        return records
+
+    def completed_ids(self, include_failed: bool=True) -> Set[str]:
+        """Item ids already recorded, optionally ignoring failure records."""
+        return {
+            str(r['item_id']) for r in self.load_records()
+            if include_failed or r.get('status') == 'ok'
+        }
+
+    def append(self, record: Dict[str, Any]):
+        """Add one record, persisting it according to the store format."""
+
+        with self._lock:
+            if self.format == 'jsonl':
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(json.dumps(record, default=str) + "\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            else:
+                self._buffer.append(record)
+                if len(self._buffer) >= self.flush_every:
+                    self._flush_parquet()
+
+    def flush(self):
+        """Persist any buffered records."""
+        with self._lock:
+            if self.format == 'parquet':
+                self._flush_parquet()
+
+    def close(self):
+        """Flush and release the underlying file."""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _part_files(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(f for f in os.listdir(self.path) if f.startswith('part-') and f.endswith('.parquet'))
+
+    def _flush_parquet(self):
+        if not self._buffer:
+            return
+
+        import pandas as pd
+
+        rows = []
+        for record in self._buffer:
+            row = {k: v for k, v in record.items() if k != 'result'}
+            row['result_json'] = json.dumps(record.get('result'), default=str) if record.get('result') is not None else None
+            rows.append(row)
+
+        # write to a temp name first so a crash never leaves a half-written part behind
+        part_name = f"part-{len(self._part_files()):05d}.parquet"
+        tmp_path = os.path.join(self.path, '.' + part_name + '.tmp')
+        pd.DataFrame(rows).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, part_name))
+
+        self._buffer = []
+
+
+class ExtractionJob():
+    """
+    Runs an InfoExtractor over many items, checkpointing every result as it completes.
+
+    Re-running the same job with the same checkpoint skips items that are already
+    recorded, so an interrupted or crashed run resumes where it stopped (a crash
+    with a Parquet checkpoint redoes the up to `flush_every - 1` results that were
+    still buffered; see CheckpointStore).
+    """
+
+    def __init__(self, extractor, checkpoint_path: str, format: Optional[str]=None,
+                 max_retries: int=3, retry_failed: bool=False, flush_every: int=50,
+                 verbose: bool=False, priority: str='batch', max_workers: int=1):
+
+        self.extractor = extractor
+        self.max_workers = max_workers
+        self.priority = priority    # scheduler priority class of the job's calls
+        self.store = CheckpointStore(checkpoint_path, format=format, flush_every=flush_every)
+        self.max_retries = max_retries
+        self.retry_failed = retry_failed
+        self.verbose = verbose
+
+        self._stop_requested = False
+
+    def request_stop(self):
+        """Ask the job to stop after the items currently being processed."""
+        self._stop_requested = True
+
+    def run(self, items: Union[Dict[str, str], Iterable[Tuple[str, str, str]]],
+            on_record: Optional[Callable[[Dict[str, Any]], None]]=None) -> Dict[str, Any]:
+        """
+        Process items and return a summary of the run.
+
+        Args:
+            items: Either a dict {technology_name: info_source} (the name is used as the
+                item id) or an iterable of (item_id, technology_name, info_source) tuples.
+                Iterables are consumed lazily.
+            on_record: Called with every checkpoint record as it is written (e.g. progress display).
+
+        Returns:
+            dict: Counts of completed, failed and skipped items and whether the run was interrupted.
+        """
+
+        self.extractor.validate_setup(require_source=False)
+
+        done_ids = self.store.completed_ids(include_failed=not self.retry_failed)
+        summary = {'completed': 0, 'failed': 0, 'skipped': 0, 'interrupted': False}
+
+        self._stop_requested = False
+        previous_handler = self._install_sigint_handler()
+
+        def todo():
+            for item_id, technology_name, info_source in self._iter_items(items):
+                if self._stop_requested:
+                    summary['interrupted'] = True
+                    break
+
+                if str(item_id) in done_ids:
+                    summary['skipped'] += 1
+                    continue
+
+                done_ids.add(str(item_id))
+                yield item_id, technology_name, info_source
+
+        def process(item):
+            with request_priority(self.priority):
+                return self.process_item(*item)
+
+        start = time.time()
+        try:
+            # with max_workers > 1 items run concurrently; records are written from this thread only
+            for record in run_bounded(process, todo(), max_workers=self.max_workers):
+                self.store.append(record)
+                summary['completed' if record['status'] == 'ok' else 'failed'] += 1
+                if on_record is not None:
+                    on_record(record)
+        finally:
+            self.store.close()
+            self._restore_sigint_handler(previous_handler)
+
+        summary['elapsed_s'] = round(time.time() - start, 3)
+        print(f"Job finished: {summary['completed']} completed, {summary['failed']} failed, "
+              f"{summary['skipped']} skipped" + (" (interrupted)" if summary['interrupted'] else ""))
+        return summary
+
+    def process_item(self, item_id: str, technology_name: str, info_source: str) -> Dict[str, Any]:
+        """Extract and validate a single item, returning its checkpoint record."""
+
+        start = time.time()
+        record = {'item_id': str(item_id), 'technology_name': technology_name}
+        try:
+            result = self.extractor.extract_from(
+                technology_name, info_source, max_retries=self.max_retries, verbose=self.verbose
+            )
+            record['result'] = self._validate(result)
+            record['status'] = 'ok'
+            record['error'] = None
+        except Exception as e:
+            record['result'] = None
+            record['status'] = 'failed'
+            record['error'] = f"{type(e).__name__}: {e}"
+
+        record['elapsed_s'] = round(time.time() - start, 3)
+        record['finished_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return record
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Successful results recorded in the checkpoint, in completion order (part records of split documents excluded)."""
+        return [r['result'] for r in self.store.load_records() if r.get('status') == 'ok' and not _is_part(r)]
+
+    def collect(self):
+        """Successful results as a ResultCollector (with an item_id column), ready for columnar export."""
+        import pyarrow as pa
+
+        collector = self.extractor.create_result_collector(extra_columns={'item_id': pa.string()}, validate=False)
+        for record in self.store.load_records():
+            if record.get('status') == 'ok' and not _is_part(record):
+                collector.append(record['result'], item_id=record['item_id'])
+        return collector
+
+    def _validate(self, result: Any) -> Dict[str, Any]:
+        """Validate a parsed result against the extractor's DataSchema."""
+        if isinstance(result, BaseModel):
+            return result.model_dump()
+        try:
+            return self.extractor.DataSchema.model_validate(result).model_dump()
+        except ValidationError as e:
+            raise ValueError(f"Result does not match {self.extractor.DataSchema.__name__}: {e}")
+
+    @staticmethod
+    def _iter_items(items) -> Iterator[Tuple[str, str, str]]:
+        if isinstance(items, dict):
+            for name, source in items.items():
+                yield name, name, source
+        else:
+            for item in items:
+                yield tuple(item)
+
+    def _install_sigint_handler(self):
+        # signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return None
+
+        def handler(signum, frame):
+            if self._stop_requested:
+                # second Ctrl-C: stop immediately
+                raise KeyboardInterrupt
+            print("\nStop requested - finishing the current item. Press Ctrl-C again to abort.")
+            self._stop_requested = True
+
+        return signal.signal(signal.SIGINT, handler)
+
+    @staticmethod
+    def _restore_sigint_handler(previous_handler):
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
@@ -0,0 +1,327 @@
+"""Local stand-ins for the LLM providers, for offline testing and load testing."""
+
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+import json
+import threading
+import time
+
+
+def _default_responder(messages: List[Dict[str, str]]) -> str:
+    return f"Mock answer to: {messages[-1]['content'][:200]}"
+
+
+class MockInferenceClient():
+    """
+    Drop-in stand-in for huggingface_hub.InferenceClient.chat_completion.
+
+    Each call sleeps for `latency` seconds (time to first token), then returns or
+    streams the responder's answer at `tokens_per_second` (one word = one token).
+    Call counts and the peak number of concurrent calls are recorded for load tests.
+    """
+
+    def __init__(self, responder: Optional[Callable[[List[Dict[str, str]]], str]]=None,
+                 latency: float=0.05, tokens_per_second: Optional[float]=None):
+        self.responder = responder or _default_responder
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+        self.calls = 0
+        self.active_calls = 0
+        self.max_active_calls = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, model: str=None, messages: List[Dict[str, str]]=None, max_tokens: int=None,
+                        temperature: float=None, stream: bool=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active_calls += 1
+            self.max_active_calls = max(self.max_active_calls, self.active_calls)
+
+        try:
+            time.sleep(self.latency)
+            text = self.responder(messages)
+        except Exception:
+            self._release()
+            raise
+
+        if stream:
+            return self._stream(text)
+
+        try:
+            if self.tokens_per_second:
+                time.sleep(len(text.split()) / self.tokens_per_second)
+            return SimpleNamespace(choices=[SimpleNamespace(
+                message=SimpleNamespace(role='assistant', content=text), finish_reason='stop'
+            )])
+        finally:
+            self._release()
+
+    def _stream(self, text: str):
+        try:
+            words = text.split(' ')
+            for i, word in enumerate(words):
+                if self.tokens_per_second:
+                    time.sleep(1.0 / self.tokens_per_second)
+                delta = word if i == 0 else ' ' + word
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(role='assistant', content=delta))])
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self.active_calls -= 1
+
+
+class MockChatModel():
+    """
+    Stand-in for a LangChain chat model, usable as InfoExtractor(llm=MockChatModel(...)).
+
+    The responder receives the rendered prompt as a string and returns the response text.
+    """
+
+    def __init__(self, responder: Callable[[str], str], latency: float=0.05):
+        self.responder = responder
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt_value: Any) -> SimpleNamespace:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        text = prompt_value.to_string() if hasattr(prompt_value, 'to_string') else str(prompt_value)
+        return SimpleNamespace(content=self.responder(text))
+
+
+class MockGenaiError(Exception):
+    """Mirrors the `code` attribute of google.genai.errors.APIError."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class _MockModels():
+    def __init__(self, owner: 'MockGenaiClient'):
+        self.owner = owner
+
+    def generate_content(self, model: str=None, contents: Any=None, config: Any=None):
+        owner = self.owner
+        cached_name = getattr(config, 'cached_content', None) if config is not None else None
+
+        cached_text = ''
+        if cached_name:
+            cache = owner.caches._get_live(cached_name)
+            cached_text = cache['text']
+            if getattr(config, 'tools', None) or getattr(config, 'system_instruction', None):
+                raise MockGenaiError(400, "CachedContent can not be used with tools or system_instruction in the request")
+
+        prompt = _contents_to_text(contents)
+        with owner._lock:
+            owner.calls += 1
+            owner.sent_chars += len(prompt)
+            owner.processed_chars += len(prompt) + len(cached_text)
+        time.sleep(owner.latency)
+
+        text = owner.responder(prompt, cached_text)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=(len(prompt) + len(cached_text)) // 4,
+                cached_content_token_count=len(cached_text) // 4,
+                candidates_token_count=len(text) // 4,
+            ),
+        )
+
+
+class _MockCaches():
+    def __init__(self, owner: 'MockGenaiClient'):
+        self.owner = owner
+        self._caches = {}
+        self._created = 0
+
+    def create(self, model: str=None, config: Any=None):
+        text = _contents_to_text(getattr(config, 'contents', None))
+        if len(text) // 4 < self.owner.min_cache_tokens:
+            raise MockGenaiError(400, f"Cached content is too small: minimum is {self.owner.min_cache_tokens} tokens")
+
+        with self.owner._lock:
+            self._created += 1
+            name = f"cachedContents/mock-{self._created}"
+            self._caches[name] = {
+                'name': name, 'model': model, 'text': text,
+                'expire_time': time.time() + _ttl_seconds(getattr(config, 'ttl', None)),
+            }
+            self.owner.uploaded_chars += len(text)
+        return self._view(name)
+
+    def get(self, name: str):
+        self._get_live(name)
+        return self._view(name)
+
+    def update(self, name: str, config: Any=None):
+        cache = self._get_live(name)
+        cache['expire_time'] = time.time() + _ttl_seconds(getattr(config, 'ttl', None))
+        return self._view(name)
+
+    def delete(self, name: str):
+        if self._caches.pop(name, None) is None:
+            raise MockGenaiError(404, f"CachedContent not found: {name}")
+
+    def list(self):
+        return [self._view(name) for name in list(self._caches) if self._caches[name]['expire_time'] > time.time()]
+
+    def _get_live(self, name: str) -> Dict[str, Any]:
+        cache = self._caches.get(name)
+        if cache is None or cache['expire_time'] <= time.time():
+            self._caches.pop(name, None)
+            raise MockGenaiError(404, f"CachedContent not found (or expired): {name}")
+        return cache
+
+    def _view(self, name: str) -> SimpleNamespace:
+        cache = self._caches[name]
+        return SimpleNamespace(name=name, model=cache['model'], expire_time=cache['expire_time'],
+                               usage_metadata=SimpleNamespace(total_token_count=len(cache['text']) // 4))
+
+
+class MockGenaiClient():
+    """
+    Stand-in for google.genai.Client covering `models.generate_content` and the
+    context caching endpoints (`caches.create/get/update/delete/list`).
+
+    Caches expire after their TTL like the real service, and the client counts the
+    characters sent per request, uploaded into caches, and processed in total, so
+    the effect of caching can be measured offline.
+    """
+
+    def __init__(self, responder: Optional[Callable[[str, str], str]]=None, latency: float=0.05,
+                 min_cache_tokens: int=1024):
+        self.responder = responder or (lambda prompt, cached: f"Mock answer to: {prompt[:200]}")
+        self.latency = latency
+        self.min_cache_tokens = min_cache_tokens
+
+        self.calls = 0
+        self.sent_chars = 0
+        self.uploaded_chars = 0
+        self.processed_chars = 0
+        self._lock = threading.Lock()
+
+        self.models = _MockModels(self)
+        self.caches = _MockCaches(self)
+
+
+def _contents_to_text(contents: Any) -> str:
+    if contents is None:
+        return ''
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_contents_to_text(c) for c in contents)
+    parts = getattr(contents, 'parts', None)
+    if parts is not None:
+        return "\n".join(p.text or '' for p in parts)
+    return str(contents)
+
+
+def _ttl_seconds(ttl: Optional[str]) -> float:
+    return float(ttl.rstrip('s')) if ttl else 3600.0
+
+
+_prefixes = {'system': 'System', 'user': 'Human', 'assistant': 'AI'}
+
+
+class MockBatchEndpoint():
+    """
+    Local stand-in for a provider batch API (the endpoint of batch_jobs.BatchExtractionJob).
+
+    Submitted request files (OpenAI or Gemini JSONL, per `format`) are answered by
+    the responder, which receives each request rendered like a LangChain prompt
+    string ("System: ...\\nHuman: ..."), so the responders of MockChatModel can be
+    reused. A job reports 'running' for `turnaround` seconds after submission; a
+    responder exception becomes an error line in the output, as a failed request
+    does at the provider. Counts of jobs and requests are recorded.
+
+    Args:
+        responder (callable): prompt string -> response text.
+        format (str): 'openai' or 'gemini'.
+        turnaround (float): Seconds until a submitted job is finished.
+        fail_jobs (int): Fail this many of the first submitted jobs as a whole (no output).
+    """
+
+    def __init__(self, responder: Callable[[str], str], format: str='openai', turnaround: float=0.5,
+                 fail_jobs: int=0):
+        if format not in ('openai', 'gemini'):
+            raise ValueError(f"Unsupported batch format: {format}")
+        self.responder = responder
+        self.format = format
+        self.turnaround = turnaround
+        self.fail_jobs = fail_jobs
+
+        self.jobs = {}
+        self.requests = 0
+        self.polls = 0
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, model: str, display_name: Optional[str]=None) -> str:
+        with open(path, 'r', encoding='utf-8') as fh:
+            lines = [json.loads(raw) for raw in fh if raw.strip()]
+        with self._lock:
+            job_id = f"batch-mock-{len(self.jobs) + 1}"
+            self.jobs[job_id] = {
+                'model': model, 'lines': lines, 'ready_at': time.time() + self.turnaround,
+                'failed': len(self.jobs) < self.fail_jobs, 'output': None,
+            }
+            self.requests += len(lines)
+        return job_id
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            self.polls += 1
+        job = self.jobs[job_id]
+        total = len(job['lines'])
+        if time.time() < job['ready_at']:
+            return {'state': 'running', 'detail': 'in_progress', 'completed': 0, 'failed': 0, 'total': total}
+        if job['failed']:
+            return {'state': 'failed', 'detail': 'failed', 'completed': 0, 'failed': total, 'total': total}
+        if job['output'] is None:
+            job['output'] = [self._answer(line) for line in job['lines']]
+        errors = sum(1 for line in job['output'] if line.get('error'))
+        return {'state': 'succeeded', 'detail': 'completed', 'completed': total - errors, 'failed': errors,
+                'total': total}
+
+    def download(self, job_id: str, dest_path: str):
+        if self.status(job_id)['state'] != 'succeeded':
+            raise RuntimeError(f"Batch job {job_id} has no output")
+        with open(dest_path, 'w', encoding='utf-8') as out:
+            for line in self.jobs[job_id]['output']:
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def _answer(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        if self.format == 'openai':
+            key = line['custom_id']
+            prompt = "\n".join(f"{_prefixes[m['role']]}: {m['content']}" for m in line['body']['messages'])
+        else:
+            key = line['key']
+            request = line['request']
+            system = request.get('system_instruction', {}).get('parts', [])
+            prompt = "\n".join(
+                [f"System: {p['text']}" for p in system]
+                + [f"{'AI' if c.get('role') == 'model' else 'Human'}: {''.join(p['text'] for p in c['parts'])}"
+                   for c in request['contents']]
+            )
+
+        try:
+            text = self.responder(prompt)
+        except Exception as e:
+            error = {'code': 500, 'message': f"{type(e).__name__}: {e}"}
+            return {'custom_id': key, 'response': None, 'error': error} if self.format == 'openai' \
+                else {'key': key, 'error': error}
+
+        if self.format == 'openai':
+            return {'custom_id': key, 'error': None, 'response': {'status_code': 200, 'body': {
+                'model': line['body'].get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            }}}
+        return {'key': key, 'response': {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}]}}
+
@@ -0,0 +1,412 @@
+"""Staged document ingestion: parse (process pool) -> chunk -> extract (async workers), with bounded queues."""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import asyncio
+import csv
+import datetime
+import json
+import os
+import time
+
+from .job_runner import ExtractionJob
+from .scheduler import propagate, request_priority
+from .utils import chunk_text
+
+
+document_extensions = ('.pdf', '.txt', '.md', '.csv')
+
+_done = object()    # end-of-stream marker passed between stages
+
+
+def parse_document(path: str) -> Tuple[List[Tuple[str, str, str]], float]:
+    """
+    Read one input file into (item_id, technology_name, text) items; runs in a worker process.
+
+    PDF, TXT and MD files are one item named after the file. A CSV with
+    `technology_name` and `info_source` columns gives one item per row (with an
+    optional `item_id` column); any other CSV is one item with the table as text.
+    Returns the items and the seconds spent.
+    """
+
+    start = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    lower = path.lower()
+
+    if lower.endswith('.pdf'):
+        from .utils import read_pdf2text
+        items = [(stem, stem, read_pdf2text(path))]
+    elif lower.endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as fh:
+            reader = csv.DictReader(fh)
+            if reader.fieldnames and {'technology_name', 'info_source'} <= set(reader.fieldnames):
+                items = [(str(row.get('item_id') or row['technology_name'] or f"{stem}-{i}"),
+                          row['technology_name'], row['info_source']) for i, row in enumerate(reader)]
+            else:
+                fh.seek(0)
+                items = [(stem, stem, fh.read())]
+    else:
+        with open(path, 'r', encoding='utf-8') as fh:
+            items = [(stem, stem, fh.read())]
+    return items, time.perf_counter() - start
+
+
+def merge_part_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the results extracted from the parts of one document, in part order: lists
+    are concatenated without duplicates, dicts are merged (earlier parts win per key),
+    and any other field takes the first part's non-empty value.
+    """
+
+    merged = {}
+    for result in results:
+        for name, value in result.items():
+            current = merged.get(name)
+            if isinstance(current, list) and isinstance(value, list):
+                seen = {json.dumps(v, sort_keys=True, default=str) for v in current}
+                current.extend(v for v in value if json.dumps(v, sort_keys=True, default=str) not in seen)
+            elif isinstance(current, dict) and isinstance(value, dict):
+                merged[name] = {**value, **current}
+            elif current is None or current == '' or current == [] or current == {}:
+                merged[name] = list(value) if isinstance(value, list) else value
+    return merged
+
+
+class StageStats():
+    """Counters of one pipeline stage."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_s = 0.0       # doing the stage's work, summed over workers
+        self.starved_s = 0.0    # waiting for input from the previous stage
+        self.blocked_s = 0.0    # waiting for room in the next stage's queue (backpressure)
+        self.max_queue = 0      # deepest the stage's input queue got
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'items_per_s': round(self.items_out / elapsed, 3),
+            'utilization': round(self.busy_s / (elapsed * self.workers), 3),
+            'busy_s': round(self.busy_s, 3),
+            'starved_s': round(self.starved_s, 3),
+            'blocked_s': round(self.blocked_s, 3),
+            'max_queue': self.max_queue,
+        }
+
+
+class IngestionPipeline():
+    """
+    Parses, chunks and extracts documents concurrently, so CPU-bound parsing
+    overlaps with network-bound extraction.
+
+    - parse: files are read in a pool of `parse_processes` processes (PDF text
+      extraction does not release the GIL);
+    - chunk: documents longer than `max_source_chars` are split with chunk_text() in
+      the event loop and the chunks packed into parts of up to that size (None: every
+      document is one source, passed on unchanged);
+    - extract: `extract_concurrency` async workers, each running InfoExtractor calls
+      in a thread (the provider clients are synchronous).
+
+    Stages are connected by queues of `queue_size` items, so a slow stage holds the
+    earlier ones back instead of letting parsed text pile up in memory. Results are
+    written to an ExtractionJob checkpoint as they complete; items already in the
+    checkpoint are skipped, and files whose item is done are not parsed again.
+
+    The parts of a split document are checkpointed as they complete, marked with
+    `part_of` (so an interrupted run resumes per part), and once every part is done
+    one record for the document is written with the parts merged by
+    merge_part_results(). ExtractionJob.results() and collect() skip part records.
+
+    Args:
+        extractor (InfoExtractor): A fully configured extractor.
+        checkpoint_path (str): As for ExtractionJob (.jsonl file or Parquet directory).
+        parse_processes (int, optional): Default: os.cpu_count().
+        extract_concurrency (int): Extractions in flight.
+        queue_size (int): Capacity of each queue between stages.
+        target_chunk_size, max_chunk_size (int): Passed to chunk_text().
+        max_source_chars (int, optional): Split documents into sources of at most this
+            many characters, extracted as "<id>#1", "<id>#2", ... and merged into "<id>".
+        flush_every (int): Records per Parquet part file, as for ExtractionJob.
+    """
+
+    def __init__(self, extractor, checkpoint_path: str, parse_processes: Optional[int]=None,
+                 extract_concurrency: int=8, queue_size: int=16, target_chunk_size: int=1500,
+                 max_chunk_size: int=4000, max_source_chars: Optional[int]=None, max_retries: int=3,
+                 retry_failed: bool=False, verbose: bool=False, priority: str='batch', flush_every: int=50):
+
+        self.job = ExtractionJob(extractor, checkpoint_path, max_retries=max_retries, retry_failed=retry_failed,
+                                 flush_every=flush_every, verbose=verbose, priority=priority,
+                                 max_workers=extract_concurrency)
+        self.parse_processes = parse_processes or os.cpu_count() or 1
+        self.extract_concurrency = extract_concurrency
+        self.queue_size = queue_size
+        self.target_chunk_size = target_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_source_chars = max_source_chars
+
+        self.stages = {}
+        self.elapsed_s = 0.0
+        self._documents = {}    # split document id -> name, path, part count and part records
+
+    @staticmethod
+    def list_documents(path: Union[str, Iterable[str]]) -> List[str]:
+        """Input files of a directory (PDF, TXT, MD, CSV), or the given paths."""
+        if isinstance(path, str):
+            if not os.path.isdir(path):
+                return [path]
+            return sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(document_extensions) and os.path.isfile(os.path.join(path, name))
+            )
+        return list(path)
+
+    def run(self, path: Union[str, Iterable[str]],
+            on_record: Optional[Callable[[Dict[str, Any]], None]]=None) -> Dict[str, Any]:
+        """Process a directory or list of files; returns the summary with per-stage counters."""
+        return asyncio.run(self.arun(path, on_record=on_record))
+
+    async def arun(self, path: Union[str, Iterable[str]],
+                   on_record: Optional[Callable[[Dict[str, Any]], None]]=None) -> Dict[str, Any]:
+        """Same as run(), for callers that already have an event loop (e.g. Jupyter: `await pipeline.arun(...)`)."""
+
+        self.job.extractor.validate_setup(require_source=False)
+        done_ids = self.job.store.completed_ids(include_failed=not self.job.retry_failed)
+        self._documents = {}
+        self._part_records = {}     # part records of earlier runs, by document id
+        for record in self.job.store.load_records():
+            if isinstance(record.get('part_of'), str):
+                self._part_records.setdefault(record['part_of'], {})[str(record['item_id'])] = record
+        files = self.list_documents(path)
+        # a PDF/TXT/MD file is a single item named after it (the merged record, when split into parts)
+        todo = [f for f in files if f.lower().endswith('.csv')
+                or os.path.splitext(os.path.basename(f))[0] not in done_ids]
+
+        summary = {'files': len(files), 'parsed': 0, 'completed': 0, 'failed': 0, 'parts': 0,
+                   'skipped': len(files) - len(todo), 'interrupted': False}
+        self.stages = {
+            'parse': StageStats('parse', self.parse_processes),
+            'chunk': StageStats('chunk', 1),
+            'extract': StageStats('extract', self.extract_concurrency),
+        }
+        parsed = asyncio.Queue(maxsize=self.queue_size)
+        units = asyncio.Queue(maxsize=self.queue_size)
+
+        def write(record):
+            self.job.store.append(record)
+            if isinstance(record.get('part_of'), str):
+                summary['parts'] += 1
+            else:
+                summary['completed' if record['status'] == 'ok' else 'failed'] += 1
+            if on_record is not None:
+                on_record(record)
+            if isinstance(record.get('part_of'), str):
+                self._add_part(record, write)
+
+        print(f"🚀 Pipeline: {len(todo)} files, {self.parse_processes} parse processes, "
+              f"{self.extract_concurrency} extraction workers")
+        start = time.perf_counter()
+        threads = ThreadPoolExecutor(max_workers=self.extract_concurrency)
+        try:
+            await asyncio.gather(
+                self._parse_stage(todo, parsed, write, summary),
+                self._chunk_stage(parsed, units, done_ids, write, summary),
+                *[self._extract_worker(units, threads, write) for _ in range(self.extract_concurrency)],
+            )
+        except asyncio.CancelledError:
+            summary['interrupted'] = True
+            raise
+        finally:
+            threads.shutdown(wait=False)
+            self.job.store.close()
+            self.elapsed_s = time.perf_counter() - start
+            summary['elapsed_s'] = round(self.elapsed_s, 3)
+            summary['stages'] = [s.as_dict(self.elapsed_s) for s in self.stages.values()]
+
+        print(f"Pipeline finished: {summary['completed']} completed, {summary['failed']} failed, "
+              f"{summary['skipped']} skipped in {summary['elapsed_s']:.1f}s")
+        return summary
+
+    async def _put(self, queue: asyncio.Queue, item: Any, stats: StageStats):
+        waited = time.perf_counter()
+        await queue.put(item)
+        stats.blocked_s += time.perf_counter() - waited
+        stats.items_out += 1
+
+    async def _get(self, queue: asyncio.Queue, stats: StageStats) -> Any:
+        stats.max_queue = max(stats.max_queue, queue.qsize())
+        waited = time.perf_counter()
+        item = await queue.get()
+        stats.starved_s += time.perf_counter() - waited
+        return item
+
+    async def _parse_stage(self, files: List[str], parsed: asyncio.Queue, write, summary: Dict[str, Any]):
+        stats = self.stages['parse']
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(self.parse_processes * 2)     # parsed text waits in the queue, not here
+
+        async def parse(pool, path):
+            try:
+                try:
+                    items, busy = await loop.run_in_executor(pool, parse_document, path)
+                except Exception as e:
+                    stem = os.path.splitext(os.path.basename(path))[0]
+                    write({'item_id': stem, 'technology_name': stem, 'result': None, 'status': 'failed',
+                           'error': f"{type(e).__name__} while parsing {path}: {e}", 'source': path})
+                    return
+                stats.busy_s += busy
+                summary['parsed'] += 1
+                await self._put(parsed, (path, items), stats)
+            finally:
+                in_flight.release()
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.parse_processes) as pool:
+                tasks = []
+                for path in files:
+                    await in_flight.acquire()
+                    stats.items_in += 1
+                    tasks.append(asyncio.ensure_future(parse(pool, path)))
+                await asyncio.gather(*tasks)
+        finally:
+            await parsed.put(_done)
+
+    async def _chunk_stage(self, parsed: asyncio.Queue, units: asyncio.Queue, done_ids: set, write,
+                           summary: Dict[str, Any]):
+        stats = self.stages['chunk']
+        try:
+            while True:
+                document = await self._get(parsed, stats)
+                if document is _done:
+                    return
+                stats.items_in += 1
+                path, items = document
+
+                for document_id, name, text in items:
+                    if document_id in done_ids:
+                        summary['skipped'] += 1
+                        continue
+                    done_ids.add(document_id)
+
+                    begin = time.perf_counter()
+                    parts = self._split(document_id, text)
+                    stats.busy_s += time.perf_counter() - begin
+
+                    part_of = None
+                    if len(parts) > 1:
+                        part_of = document_id
+                        self._documents[document_id] = {
+                            'name': name, 'path': path, 'parts': [item_id for item_id, _ in parts],
+                            'records': self._part_records.pop(document_id, {}),
+                        }
+
+                    todo_parts = [(i, source) for i, source in parts if part_of is None or i not in done_ids]
+                    summary['skipped'] += len(parts) - len(todo_parts)
+                    if not todo_parts:
+                        # every part was done in an earlier run: only the merge is missing
+                        self._merge_document(part_of, write)
+                    for item_id, source in todo_parts:
+                        done_ids.add(item_id)
+                        await self._put(units, (item_id, name, source, path, part_of), stats)
+        finally:
+            for _ in range(self.extract_concurrency):
+                await units.put(_done)
+
+    def _split(self, item_id: str, text: str) -> List[Tuple[str, str]]:
+        """Chunk a document and pack the chunks into sources of at most max_source_chars."""
+        if self.max_source_chars is None or len(text) <= self.max_source_chars:
+            # sent as read, so results match a plain ExtractionJob over the same files
+            return [(item_id, text)]
+
+        chunks = chunk_text(text, target_size=self.target_chunk_size, max_size=self.max_chunk_size)
+
+        parts, current, size = [], [], 0
+        for chunk in chunks:
+            if current and size + len(chunk) > self.max_source_chars:
+                parts.append("\n".join(current))
+                current, size = [], 0
+            current.append(chunk)
+            size += len(chunk) + 1
+        if current:
+            parts.append("\n".join(current))
+        if len(parts) == 1:
+            return [(item_id, parts[0])]
+        return [(f"{item_id}#{i + 1}", part) for i, part in enumerate(parts)]
+
+    def _add_part(self, record: Dict[str, Any], write):
+        document = self._documents.get(record['part_of'])
+        if document is None:
+            return
+        document['records'][record['item_id']] = record
+        if all(i in document['records'] for i in document['parts']):
+            self._merge_document(record['part_of'], write)
+
+    def _merge_document(self, document_id: str, write):
+        """Write the document's record from its part records."""
+        document = self._documents.pop(document_id, None)
+        if document is None:
+            return
+        parts = [document['records'].get(i) for i in document['parts']]
+        if any(r is None for r in parts):
+            # a part of an earlier run is missing from the checkpoint; it is redone next run
+            return
+
+        record = {'item_id': document_id, 'technology_name': document['name'], 'parts': len(parts),
+                  'elapsed_s': round(sum(r.get('elapsed_s') or 0 for r in parts), 3)}
+        failed = [r['item_id'] for r in parts if r.get('status') != 'ok']
+        if failed:
+            record.update(result=None, status='failed', error=f"parts failed: {', '.join(failed)}")
+        else:
+            try:
+                merged = merge_part_results([r['result'] for r in parts])
+                record.update(result=self.job._validate(merged), status='ok', error=None)
+            except Exception as e:
+                record.update(result=None, status='failed', error=f"{type(e).__name__} while merging parts: {e}")
+        record['finished_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        record['source'] = document['path']
+        write(record)
+
+    async def _extract_worker(self, units: asyncio.Queue, threads: ThreadPoolExecutor, write):
+        stats = self.stages['extract']
+        loop = asyncio.get_running_loop()
+
+        def process(item_id, name, source):
+            with request_priority(self.job.priority):
+                return self.job.process_item(item_id, name, source)
+
+        while True:
+            unit = await self._get(units, stats)
+            if unit is _done:
+                return
+            stats.items_in += 1
+            item_id, name, source, path, part_of = unit
+
+            begin = time.perf_counter()
+            record = await loop.run_in_executor(threads, propagate(process), item_id, name, source)
+            stats.busy_s += time.perf_counter() - begin
+            stats.items_out += 1
+
+            record['source'] = path
+            if part_of is not None:
+                record['part_of'] = part_of
+            write(record)
+
+    def report(self):
+        """Print the per-stage counters of the last run; the busiest stage is the bottleneck."""
+        if not self.stages:
+            print("No pipeline run yet")
+            return
+        rows = [s.as_dict(self.elapsed_s) for s in self.stages.values()]
+        print(f"Pipeline stages ({self.elapsed_s:.1f}s):")
+        for r in rows:
+            print(f"  {r['stage']:<8} x{r['workers']:<3} in {r['items_in']:>6}  out {r['items_out']:>6}  "
+                  f"{r['items_per_s']:>8.2f}/s  busy {r['utilization']:>6.1%}  "
+                  f"starved {r['starved_s']:>8.1f}s  blocked {r['blocked_s']:>8.1f}s  max queue {r['max_queue']:>4}")
+        bottleneck = max(rows, key=lambda r: r['utilization'])
+        print(f"  bottleneck: {bottleneck['stage']} ({bottleneck['utilization']:.0%} busy)")
@@ -0,0 +1,174 @@
+"""Columnar collection of extraction results, exported to pandas, Arrow or Parquet in one step."""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, get_args, get_origin
+import types as _types
+
+from pydantic import BaseModel
+
+
+def _arrow_type(annotation: Any) -> Tuple[Any, bool]:
+    """Map a field annotation to (pyarrow type, nullable)."""
+    import pyarrow as pa
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+
+    # Optional[T] / T | None -> nullable T
+    if origin is Union or (hasattr(_types, 'UnionType') and origin is getattr(_types, 'UnionType')):
+        non_null = [a for a in args if a is not type(None)]
+        inner, _ = _arrow_type(non_null[0]) if len(non_null) == 1 else (pa.string(), True)
+        return inner, len(non_null) < len(args)
+
+    if origin in (list, List, tuple, set):
+        item_type, _ = _arrow_type(args[0]) if args else (pa.string(), True)
+        return pa.list_(item_type), False
+    if origin in (dict, Dict):
+        key_type, _ = _arrow_type(args[0]) if args else (pa.string(), True)
+        value_type, _ = _arrow_type(args[1]) if len(args) > 1 else (pa.string(), True)
+        return pa.map_(key_type, value_type), False
+
+    scalar_types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+    if annotation in scalar_types:
+        return scalar_types[annotation], False
+
+    # anything else (nested models, Any, ...) is kept as its string form
+    return pa.string(), True
+
+
+def arrow_schema_from_model(DataSchema: type) -> Any:
+    """Derive a pyarrow schema from a Pydantic model such as InfoExtractor.DataSchema."""
+    import pyarrow as pa
+
+    fields = []
+    for name, field in DataSchema.model_fields.items():
+        arrow_type, nullable = _arrow_type(field.annotation)
+        fields.append(pa.field(name, arrow_type, nullable=nullable))
+    return pa.schema(fields)
+
+
+class ResultCollector():
+    """
+    Collects extraction results into typed columnar buffers.
+
+    Column types come from the compiled DataSchema: `List[...]` fields become Arrow
+    list arrays, `Dict[...]` fields map arrays, and `Optional[...]` fields nullable
+    columns. Results are appended to per-column buffers that are converted to Arrow
+    record batches every `batch_size` rows, so exporting is one concatenation rather
+    than a row-by-row DataFrame build.
+
+    Args:
+        DataSchema: Compiled Pydantic model (InfoExtractor.DataSchema).
+        extra_columns (dict, optional): Additional columns, {name: pyarrow type},
+            filled from keyword arguments of append() (e.g. item_id).
+        validate (bool): Validate dict results against DataSchema before appending.
+            Without validation, a column that receives a null is made nullable.
+        batch_size (int): Rows per Arrow record batch.
+    """
+
+    def __init__(self, DataSchema: type, extra_columns: Optional[Dict[str, Any]]=None,
+                 validate: bool=True, batch_size: int=65536):
+        import pyarrow as pa
+
+        self.DataSchema = DataSchema
+        self.validate = validate
+        self.batch_size = batch_size
+
+        schema = arrow_schema_from_model(DataSchema)
+        for name, arrow_type in (extra_columns or {}).items():
+            schema = schema.append(pa.field(name, arrow_type, nullable=True))
+        self.schema = schema
+
+        self._model_columns = list(DataSchema.model_fields)
+        self._extra_columns = list(extra_columns or {})
+        self._stringify = {
+            f.name for f in schema if f.name in self._model_columns
+            and pa.types.is_string(f.type) and DataSchema.model_fields[f.name].annotation not in (str, Optional[str])
+        }
+        self._buffers = {name: [] for name in schema.names}
+        self._batches = []
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, result: Union[BaseModel, Dict[str, Any]], **extra):
+        """Add one result (Pydantic object or dict). Extra keyword arguments fill extra_columns."""
+
+        if isinstance(result, dict):
+            if self.validate:
+                result = self.DataSchema.model_validate(result)
+            else:
+                for name in self._model_columns:
+                    value = result.get(name)
+                    if value is None and not self.schema.field(name).nullable:
+                        self._make_nullable(name)
+                    self._buffers[name].append(self._cell(name, value))
+                self._append_extra(extra)
+                return
+
+        for name in self._model_columns:
+            self._buffers[name].append(self._cell(name, getattr(result, name, None)))
+        self._append_extra(extra)
+
+    def extend(self, results: Iterable[Union[BaseModel, Dict[str, Any]]]):
+        """Add many results."""
+        for result in results:
+            self.append(result)
+
+    def _cell(self, name: str, value: Any) -> Any:
+        if name in self._stringify and value is not None:
+            return value.model_dump_json() if isinstance(value, BaseModel) else str(value)
+        return value
+
+    def _make_nullable(self, name: str):
+        """Relax a column to nullable, including the batches already built (no data is copied)."""
+        import pyarrow as pa
+
+        index = self.schema.get_field_index(name)
+        self.schema = self.schema.set(index, self.schema.field(name).with_nullable(True))
+        self._batches = [pa.RecordBatch.from_arrays(batch.columns, schema=self.schema) for batch in self._batches]
+        print(f"⚠️ Column '{name}' received a null without validation; it is now nullable")
+
+    def _append_extra(self, extra: Dict[str, Any]):
+        for name in self._extra_columns:
+            self._buffers[name].append(extra.get(name))
+        self._rows += 1
+        if len(self._buffers[self.schema.names[0]]) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+
+        if not self._buffers[self.schema.names[0]]:
+            return
+        arrays = [pa.array(self._buffers[f.name], type=f.type) for f in self.schema]
+        self._batches.append(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self._buffers = {name: [] for name in self.schema.names}
+
+    def to_arrow(self):
+        """Return all results as a pyarrow.Table."""
+        import pyarrow as pa
+
+        self._flush()
+        return pa.Table.from_batches(self._batches, schema=self.schema)
+
+    def to_pandas(self, arrow_dtypes: bool=True):
+        """
+        Return all results as a pandas DataFrame.
+
+        With arrow_dtypes=True the columns are backed by the Arrow buffers
+        (pd.ArrowDtype) without copying; otherwise they are converted to numpy/object dtypes.
+        """
+        import pandas as pd
+
+        table = self.to_arrow()
+        if arrow_dtypes:
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return table.to_pandas()
+
+    def to_parquet(self, path: str, **kwargs):
+        """Write all results to a Parquet file."""
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, **kwargs)
+        print(f"Wrote {self._rows} results to {path}")
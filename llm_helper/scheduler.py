@@ -0,0 +1,306 @@
+"""Process-wide request scheduler: priority classes, weighted fair queuing across sessions, metrics."""
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableLambda
+
+
+priority_classes = ('interactive', 'batch', 'backfill')     # highest first
+
+_priority = contextvars.ContextVar('llm_helper_priority', default=None)
+_session = contextvars.ContextVar('llm_helper_session', default=None)
+_scheduler = None
+
+
+class RequestCancelled(Exception):
+    """Raised in a caller whose queued request was cancelled with RequestScheduler.cancel()."""
+
+
+class _Ticket():
+    __slots__ = ('priority', 'session', 'start', 'tag', 'seq', 'enqueued_at', 'cancelled')
+
+    def __init__(self, priority: str, session: str, start: float, tag: float, seq: int):
+        self.priority = priority
+        self.session = session
+        self.start = start      # virtual start time
+        self.tag = tag          # virtual finish time: the queue order
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+    def __lt__(self, other: '_Ticket') -> bool:
+        return (self.tag, self.seq) < (other.tag, other.seq)
+
+
+class RequestScheduler():
+    """
+    Admission control for provider calls shared by all helpers of a process.
+
+    Calls wait in one queue per priority class and are started strictly by class:
+    a queued 'interactive' call always starts before queued 'batch' calls, which
+    start before 'backfill' calls, so low-priority work that has not started yet is
+    overtaken. `reserved_interactive` of the `max_concurrent` slots can only be used
+    by interactive calls, so a question does not wait for running batch calls to
+    finish. Within a class, sessions share the capacity by weighted fair queuing
+    (start-time fair queuing on request count), so one large batch cannot starve
+    another.
+
+    Args:
+        max_concurrent (int): Provider calls in flight at once.
+        rate (float, optional): Calls per second for all classes together (token bucket).
+        burst (int, optional): Token bucket size. Default: max(1, rate).
+        reserved_interactive (int): Slots kept free for interactive calls.
+        session_weights (dict, optional): {session: weight}; default weight 1.
+    """
+
+    def __init__(self, max_concurrent: int=8, rate: Optional[float]=None, burst: Optional[int]=None,
+                 reserved_interactive: int=1, session_weights: Optional[Dict[str, float]]=None):
+        if reserved_interactive >= max_concurrent:
+            raise ValueError("reserved_interactive must be smaller than max_concurrent")
+
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.burst = burst or (max(1, int(rate)) if rate else None)
+        self.reserved_interactive = reserved_interactive
+        self.session_weights = dict(session_weights or {})
+
+        self._cond = threading.Condition()
+        self._queues = {p: [] for p in priority_classes}
+        self._virtual_time = {p: 0.0 for p in priority_classes}
+        self._last_finish = {}          # (priority, session) -> virtual finish tag
+        self._seq = itertools.count()
+        self._running = {p: 0 for p in priority_classes}
+        self._tokens = float(self.burst or 0)
+        self._last_refill = time.monotonic()
+
+        self._waits = {p: deque(maxlen=2000) for p in priority_classes}
+        self._counts = {p: {'started': 0, 'cancelled': 0, 'max_depth': 0} for p in priority_classes}
+
+    # admission
+
+    def acquire(self, priority: str='interactive', session: str='default', weight: Optional[float]=None) -> _Ticket:
+        """Block until the call may start; returns the ticket to release()."""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority} (expected one of {priority_classes})")
+
+        with self._cond:
+            weight = weight or self.session_weights.get(session, 1.0)
+            key = (priority, session)
+            start_tag = max(self._virtual_time[priority], self._last_finish.get(key, 0.0))
+            self._last_finish[key] = start_tag + 1.0 / weight
+            ticket = _Ticket(priority, session, start_tag, start_tag + 1.0 / weight, next(self._seq))
+
+            heapq.heappush(self._queues[priority], ticket)
+            self._counts[priority]['max_depth'] = max(self._counts[priority]['max_depth'], len(self._queues[priority]))
+
+            try:
+                while True:
+                    if ticket.cancelled:
+                        raise RequestCancelled(f"Queued {priority} request of session {session!r} was cancelled")
+                    wait = self._try_start(ticket)
+                    if wait is None:
+                        break
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                # e.g. KeyboardInterrupt while waiting: do not leave the ticket blocking the queue
+                # cancel() replaces the queue list, so look up the current one
+                queue = self._queues[priority]
+                if ticket in queue:
+                    queue.remove(ticket)
+                    heapq.heapify(queue)
+                self._cond.notify_all()
+                raise
+
+            self._waits[priority].append(time.monotonic() - ticket.enqueued_at)
+            self._counts[priority]['started'] += 1
+            self._cond.notify_all()
+            return ticket
+
+    def _try_start(self, ticket: _Ticket) -> Optional[float]:
+        """Start ticket if it is next and there is capacity; otherwise return how long to wait (seconds)."""
+
+        # strict priority: the head of the highest non-empty class goes first
+        head = next((self._queues[p][0] for p in priority_classes if self._queues[p]), None)
+        if head is not ticket:
+            return 1.0
+
+        limit = self.max_concurrent - (0 if ticket.priority == 'interactive' else self.reserved_interactive)
+        if sum(self._running.values()) >= limit:
+            return 1.0
+
+        if self.rate:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+
+        heapq.heappop(self._queues[ticket.priority])
+        self._virtual_time[ticket.priority] = max(self._virtual_time[ticket.priority], ticket.start)
+        self._running[ticket.priority] += 1
+        if len(self._last_finish) > 10000:
+            # sessions whose last call is behind the virtual clock have no backlog left to remember
+            self._last_finish = {k: v for k, v in self._last_finish.items() if v > self._virtual_time[k[0]]}
+        return None
+
+    def release(self, ticket: _Ticket):
+        with self._cond:
+            self._running[ticket.priority] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Optional[str]=None, session: Optional[str]=None, weight: Optional[float]=None):
+        """Hold a slot for the duration of the block. Priority and session default to the current context."""
+        ticket = self.acquire(priority or current_priority(), session or _session.get() or 'default', weight)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def cancel(self, session: Optional[str]=None, priority: Optional[str]=None) -> int:
+        """Cancel queued (not yet started) calls of a session and/or class; returns how many."""
+        cancelled = 0
+        with self._cond:
+            for p, queue in self._queues.items():
+                if priority is not None and p != priority:
+                    continue
+                keep = []
+                for ticket in queue:
+                    if session is None or ticket.session == session:
+                        ticket.cancelled = True
+                        cancelled += 1
+                    else:
+                        keep.append(ticket)
+                heapq.heapify(keep)
+                self._queues[p] = keep
+                self._counts[p]['cancelled'] += len(queue) - len(keep)
+            self._cond.notify_all()
+        return cancelled
+
+    # metrics
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running calls and wait-time percentiles per priority class."""
+        with self._cond:
+            classes = {}
+            for p in priority_classes:
+                waits = sorted(self._waits[p])
+                pct = (lambda q: waits[min(len(waits) - 1, int(q * len(waits)))]) if waits else (lambda q: None)
+                classes[p] = {
+                    'queued': len(self._queues[p]),
+                    'running': self._running[p],
+                    **self._counts[p],
+                    'wait_p50_s': pct(0.50),
+                    'wait_p95_s': pct(0.95),
+                    'wait_max_s': waits[-1] if waits else None,
+                }
+            return {'max_concurrent': self.max_concurrent, 'running': sum(self._running.values()), 'classes': classes}
+
+    def report(self):
+        """Print the scheduler metrics."""
+        stats = self.stats()
+        print(f"Scheduler: {stats['running']}/{stats['max_concurrent']} running")
+        for p, s in stats['classes'].items():
+            waits = (f"wait p50 {s['wait_p50_s']:.3f}s, p95 {s['wait_p95_s']:.3f}s, max {s['wait_max_s']:.3f}s"
+                     if s['wait_p50_s'] is not None else "no calls yet")
+            print(f"  {p:<12} queued {s['queued']:>4} (max {s['max_depth']:>4}), running {s['running']:>3}, "
+                  f"started {s['started']:>6}, cancelled {s['cancelled']:>4}; {waits}")
+
+
+# process-wide scheduler and request context
+
+def set_scheduler(scheduler: Optional[RequestScheduler]):
+    """Route all helper and extractor calls through scheduler (None to call providers directly)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def get_scheduler() -> Optional[RequestScheduler]:
+    return _scheduler
+
+
+def current_priority() -> str:
+    return _priority.get() or 'interactive'
+
+
+@contextmanager
+def request_priority(priority: str, session: Optional[str]=None):
+    """Run the calls made in this block (and in threads started with propagate()) with the given priority."""
+    if priority not in priority_classes:
+        raise ValueError(f"Unknown priority: {priority} (expected one of {priority_classes})")
+    priority_token = _priority.set(priority)
+    session_token = _session.set(session) if session is not None else None
+    try:
+        yield
+    finally:
+        _priority.reset(priority_token)
+        if session_token is not None:
+            _session.reset(session_token)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap fn so it runs with the caller's priority and session, e.g. when submitted to a thread pool."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def scheduled_call(fn: Callable, session: str, *args, **kwargs) -> Any:
+    """Call fn through the process-wide scheduler, if one is set."""
+    if _scheduler is None:
+        return fn(*args, **kwargs)
+    with _scheduler.slot(session=_session.get() or session):
+        return fn(*args, **kwargs)
+
+
+def scheduled_stream(iterator_fn: Callable[[], Iterator], session: str) -> Iterator:
+    """Iterate iterator_fn() while holding a scheduler slot, if a scheduler is set."""
+    if _scheduler is None:
+        yield from iterator_fn()
+        return
+    with _scheduler.slot(session=_session.get() or session):
+        yield from iterator_fn()
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model wrapper that sends `llm` calls (invoke and stream) through the process-wide scheduler."""
+
+    llm: Any
+    session: str = 'default'
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scheduled'
+
+    def _live_llm(self):
+        return self.llm if hasattr(self.llm, 'invoke') else RunnableLambda(self.llm)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        from langchain_core.messages import AIMessage, BaseMessage
+        from langchain_core.outputs import ChatGeneration, ChatResult
+
+        if stop is not None:
+            kwargs['stop'] = stop
+        message = scheduled_call(self._live_llm().invoke, self.session, messages, **kwargs)
+        if not isinstance(message, BaseMessage):
+            message = AIMessage(content=message.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        from langchain_core.messages import AIMessageChunk
+        from langchain_core.outputs import ChatGenerationChunk
+
+        if stop is not None:
+            kwargs['stop'] = stop
+        for chunk in scheduled_stream(lambda: self._live_llm().stream(messages, **kwargs), self.session):
+            if not isinstance(chunk, AIMessageChunk):
+                chunk = AIMessageChunk(content=getattr(chunk, 'content', chunk))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,363 @@
+"""Semantic response cache: reuse answers for paraphrased prompts, using local embeddings."""
+
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+import threading
+import zlib
+
+import numpy as np
+
+
+# shorthand and synonyms that paraphrased questions use for the same thing
+_synonyms = {
+    'avg': 'average', 'mean': 'average', 'dept': 'department', 'emp': 'employee', 'num': 'number',
+    'qty': 'quantity', 'pct': 'percent', 'percentage': 'percent', 'yr': 'year', 'amt': 'amount',
+    'cnt': 'count', 'tot': 'total', 'mgr': 'manager', 'info': 'information', 'max': 'maximum',
+    'min': 'minimum', 'asc': 'ascending', 'desc': 'descending', 'sum': 'total', 'count': 'number',
+    'many': 'number',
+}
+
+# request phrasing and function words that do not change what is asked
+_stopwords = {
+    'a', 'an', 'the', 'of', 'by', 'per', 'for', 'each', 'every', 'across', 'in', 'on', 'to', 'and', 'with',
+    'what', 'whats', 'which', 'is', 'are', 'was', 'were', 'do', 'does', 'please', 'can', 'could', 'would',
+    'you', 'me', 'i', 'us', 'show', 'list', 'give', 'tell', 'display', 'find', 'get', 'how', 'there',
+    'have', 'has', 'all', 'this', 'that', 'these', 'those', 'between', 'during', 'from', 'it', 'its', 'their',
+}
+
+# words that change the answer while changing the text very little: they must match exactly
+_exact_words = {
+    'not': 'not', 'no': 'not', 'without': 'not', 'except': 'not', 'excluding': 'not',
+    'above': '>', 'over': '>', 'more': '>', 'greater': '>', 'higher': '>', 'exceeding': '>', 'after': '>',
+    'below': '<', 'under': '<', 'less': '<', 'fewer': '<', 'lower': '<', 'before': '<',
+    'older': 'older', 'younger': 'younger', 'ascending': 'ascending', 'descending': 'descending',
+    'maximum': 'maximum', 'highest': 'maximum', 'largest': 'maximum', 'most': 'maximum', 'top': 'maximum',
+    'minimum': 'minimum', 'lowest': 'minimum', 'smallest': 'minimum', 'least': 'minimum', 'bottom': 'minimum',
+    'first': 'first', 'last': 'last', 'earliest': 'first', 'latest': 'last', 'oldest': 'first', 'newest': 'last',
+}
+
+_tokens = re.compile(r"\d+(?:[.,]\d+)*|[<>!=]=?|[+*/%^-]|\w+")
+
+
+def _normalize_word(word: str) -> str:
+    word = _synonyms.get(word, word)
+    if len(word) > 3 and word.endswith('ies'):
+        word = word[:-3] + 'y'
+    elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return _synonyms.get(word, word)
+
+
+def exact_terms(text: str) -> Tuple[str, ...]:
+    """
+    Numbers, operators and negation/comparison/ordering words of text, in order.
+
+    Prompts that differ only in these ("age > 30" / "age < 30", "older than 30" /
+    "older than 40") look alike to any embedding but need different answers, so
+    SemanticCache only matches prompts whose exact terms are equal.
+    """
+
+    terms = []
+    for token in _tokens.findall(text.lower()):
+        if token[0].isdigit():
+            terms.append(token.replace(',', ''))
+        elif not token[0].isalnum() and token != '_':
+            terms.append(token)
+        else:
+            word = _normalize_word(token)
+            if word in _exact_words:
+                terms.append(_exact_words[word])
+    return tuple(terms)
+
+
+class HashedNgramEmbedder():
+    """
+    Dependency-free embedder: character n-grams and words hashed into a fixed-size
+    vector (the "hashing trick"), L2-normalized so dot product is cosine similarity.
+    Words are normalized first (common abbreviations and synonyms, plurals, and
+    request phrasing such as "show me" or "per" dropped), so "avg salary by dept"
+    and "average salary per department" embed alike.
+    """
+
+    # calibrated on paraphrase and near-miss question pairs (see tests/test_semantic_cache.py);
+    # same_request() does the fine-grained rejection, so the cosine only has to find the candidate
+    default_threshold = 0.75
+
+    def __init__(self, dim: int=2048, ngram_range: Tuple[int, int]=(3, 5), word_weight: float=1.0):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+
+    def content_words(self, text: str) -> List[str]:
+        """Normalized words of text without request phrasing and function words."""
+        words = [w for w in re.findall(r"\w+", text.lower()) if len(w) > 1 or w.isdigit()]
+        words = [_normalize_word(w) for w in words if w not in _stopwords] or words
+        return [w for w in words if w not in _stopwords] or words
+
+    def same_request(self, a: str, b: str, min_word_similarity: float=0.5) -> bool:
+        """
+        True when every content word of each text has a close match in the other
+        (Dice similarity of character trigrams), e.g. "summary"/"summarize". A
+        high cosine alone can come from long prompts that differ in one word
+        ("by month" / "by week"), which ask for something else.
+        """
+
+        def trigrams(word):
+            padded = f" {word} "
+            return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+        words_a = {w: trigrams(w) for w in self.content_words(a)}
+        words_b = {w: trigrams(w) for w in self.content_words(b)}
+
+        def covered(words, others):
+            for word, grams in words.items():
+                if word in others:
+                    continue
+                if not any(2 * len(grams & g) / (len(grams) + len(g)) >= min_word_similarity for g in others.values()):
+                    return False
+            return True
+
+        return covered(words_a, words_b) and covered(words_b, words_a)
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = self.content_words(text)
+
+        features = [("w:" + w, self.word_weight) for w in words]
+        for word in words:
+            padded = f" {word} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(padded) - n + 1):
+                    features.append(("c:" + padded[i:i + n], 1.0))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # the sign bit reduces the bias from hash collisions
+            vec[h % self.dim] += weight if (h >> 31) & 1 else -weight
+
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+
+class SentenceTransformerEmbedder():
+    """Embedder backed by a small local sentence-transformers model (optional dependency)."""
+
+    default_threshold = 0.9
+
+    def __init__(self, model_name: str='sentence-transformers/all-MiniLM-L6-v2'):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("SentenceTransformerEmbedder requires `pip install sentence-transformers`")
+
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, text: str) -> np.ndarray:
+        return np.asarray(self.model.encode(text, normalize_embeddings=True), dtype=np.float32)
+
+
+class SemanticCache():
+    """
+    Cache of (prompt, response) pairs looked up by embedding similarity.
+
+    Entries are grouped by scope (e.g. a fingerprint of the guidelines and attached
+    data) and by the prompt's exact terms (numbers, operators, negations; see
+    exact_terms()), so "age > 30" never returns the answer to "age < 30". Each
+    group keeps its vectors in a single NumPy matrix used as a ring buffer, so a
+    lookup is one matrix-vector product and dropping the oldest entry copies
+    nothing. If the embedder has a same_request(a, b) check, the best match must
+    also pass it.
+
+    Scopes change whenever guidelines or attached data change, so old scopes are
+    not reused; `max_total_entries` bounds all scopes together, dropping the
+    oldest entries of the whole cache first.
+
+    Args:
+        embedder (optional): Object with embed(text). Default: HashedNgramEmbedder().
+        threshold (float, optional): Minimum cosine similarity. Default: the embedder's default_threshold, or 0.9.
+        max_entries (int): Entries kept per scope; the oldest is dropped first.
+        max_total_entries (int): Entries kept across all scopes; the oldest is dropped first.
+        exact_key (callable, optional): prompt -> key that must be equal for a hit. Default: exact_terms.
+        max_similarities (int): Best-match similarities kept for stats().
+    """
+
+    def __init__(self, embedder=None, threshold: Optional[float]=None, max_entries: int=10000,
+                 max_total_entries: int=100000, exact_key: Optional[Callable[[str], Any]]=exact_terms,
+                 max_similarities: int=10000):
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.threshold = threshold if threshold is not None else getattr(self.embedder, 'default_threshold', 0.9)
+        self.max_entries = max_entries
+        self.max_total_entries = max_total_entries
+        self.exact_key = exact_key
+
+        # (scope, exact key) -> ring buffer: 'vectors' (capacity x dim), 'prompts', 'responses' and
+        # 'seqs' per slot, 'head' (slot of the oldest entry) and 'size'
+        self._index = {}
+        self._order = {}            # scope -> deque of (seq, group key) of its entries, oldest first
+        self._all = deque()         # (seq, group key) of all entries, oldest first; may hold dropped ones
+        self._size = 0
+        self._seq = 0
+        self._similarities = deque(maxlen=max_similarities)
+        self._lookups = 0
+        self._hits = 0
+        self._lock = threading.Lock()
+
+    def _key(self, prompt: str, scope: str) -> Tuple[str, Any]:
+        return scope, (self.exact_key(prompt) if self.exact_key is not None else None)
+
+    def lookup(self, prompt: str, scope: str='') -> Optional[Dict[str, Any]]:
+        """
+        Return the best cached entry for prompt in scope if its similarity reaches
+        the threshold, as a dict with 'response', 'prompt' and 'similarity'.
+        """
+
+        vec = self.embedder.embed(prompt)
+        key = self._key(prompt, scope)
+        with self._lock:
+            self._lookups += 1
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+
+            # the live slots are head..head+size, wrapping around the end of the buffer
+            vectors, head, size = entry['vectors'], entry['head'], entry['size']
+            tail = min(head + size, len(vectors))
+            scores = vectors[head:tail] @ vec
+            if head + size > len(vectors):
+                scores = np.concatenate([scores, vectors[:head + size - len(vectors)] @ vec])
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            self._similarities.append(similarity)
+
+            if similarity < self.threshold:
+                return None
+            slot = (head + best) % len(vectors)
+            cached_prompt = entry['prompts'][slot]
+            same_request = getattr(self.embedder, 'same_request', None)
+            if same_request is not None and not same_request(prompt, cached_prompt):
+                return None
+
+            self._hits += 1
+            return {'response': entry['responses'][slot], 'prompt': cached_prompt, 'similarity': similarity}
+
+    def add(self, prompt: str, response: str, scope: str=''):
+        """Store a response for prompt in scope."""
+
+        vec = self.embedder.embed(prompt)
+        key = self._key(prompt, scope)
+        with self._lock:
+            if len(self._order.get(scope, ())) >= self.max_entries:
+                self._drop_oldest(*self._order[scope][0])
+            while self._size >= self.max_total_entries:
+                self._drop_oldest(*self._all.popleft())
+            order = self._order.setdefault(scope, deque())
+
+            entry = self._index.get(key)
+            if entry is None:
+                entry = self._index[key] = {
+                    'vectors': np.zeros((16, len(vec)), dtype=np.float32), 'prompts': [None] * 16,
+                    'responses': [None] * 16, 'seqs': [0] * 16, 'head': 0, 'size': 0,
+                }
+            elif entry['size'] == len(entry['vectors']):
+                self._grow(entry)
+
+            self._seq += 1
+            slot = (entry['head'] + entry['size']) % len(entry['vectors'])
+            entry['vectors'][slot] = vec
+            entry['prompts'][slot] = prompt
+            entry['responses'][slot] = response
+            entry['seqs'][slot] = self._seq
+            entry['size'] += 1
+            self._size += 1
+            order.append((self._seq, key))
+            self._all.append((self._seq, key))
+
+            # entries dropped per scope stay in _all until they reach its front
+            if len(self._all) > 2 * self._size + 16:
+                self._all = deque(item for item in self._all if self._is_live(*item))
+
+    @staticmethod
+    def _grow(entry: Dict[str, Any]):
+        """Double a full ring buffer, moving the oldest entry to slot 0."""
+        capacity, head = len(entry['vectors']), entry['head']
+        slots = list(range(head, capacity)) + list(range(head))
+        vectors = np.zeros((2 * capacity, entry['vectors'].shape[1]), dtype=np.float32)
+        vectors[:capacity] = entry['vectors'][slots]
+        entry['vectors'] = vectors
+        for name in ('prompts', 'responses', 'seqs'):
+            entry[name] = [entry[name][i] for i in slots] + [None] * capacity
+        entry['head'] = 0
+
+    def _is_live(self, seq: int, key: Tuple[str, Any]) -> bool:
+        entry = self._index.get(key)
+        if entry is None:
+            return False
+        # entries of a group are dropped oldest first, so only the newer ones are left
+        return seq >= entry['seqs'][entry['head']]
+
+    def _drop_oldest(self, seq: int, key: Tuple[str, Any]):
+        """Drop the entry (seq, key), which is the oldest of its group and scope, unless already dropped."""
+        if not self._is_live(seq, key):
+            return
+        entry = self._index[key]
+        head = entry['head']
+        entry['prompts'][head] = entry['responses'][head] = None
+        entry['head'] = (head + 1) % len(entry['vectors'])
+        entry['size'] -= 1
+        self._size -= 1
+        if entry['size'] == 0:
+            del self._index[key]
+
+        scope = key[0]
+        order = self._order[scope]
+        order.popleft()
+        if not order:
+            del self._order[scope]
+
+    def clear(self):
+        """Remove all entries and statistics."""
+        with self._lock:
+            self._index = {}
+            self._order = {}
+            self._all = deque()
+            self._size = 0
+            self._similarities.clear()
+            self._lookups = 0
+            self._hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the distribution of best-match similarities seen by lookups."""
+
+        with self._lock:
+            sims = np.array(self._similarities, dtype=np.float32)
+            counts, edges = np.histogram(sims, bins=10, range=(-1.0, 1.0)) if len(sims) else ([], [])
+            return {
+                'entries': self._size,
+                'scopes': len({scope for scope, _ in self._index}),
+                'lookups': self._lookups,
+                'hits': self._hits,
+                'hit_rate': self._hits / self._lookups if self._lookups else 0.0,
+                'threshold': self.threshold,
+                'similarity_percentiles': {
+                    f"p{p}": float(np.percentile(sims, p)) for p in (10, 50, 90)
+                } if len(sims) else {},
+                'similarity_histogram': [
+                    (round(float(edges[i]), 1), round(float(edges[i + 1]), 1), int(counts[i])) for i in range(len(counts))
+                ],
+            }
+
+    def report(self):
+        """Print the cache statistics."""
+
+        stats = self.stats()
+        print(f"Semantic cache: {stats['hits']}/{stats['lookups']} hits "
+              f"(hit rate {stats['hit_rate']:.1%}, threshold {stats['threshold']}), "
+              f"{stats['entries']} entries in {stats['scopes']} scope(s)")
+        if stats['similarity_percentiles']:
+            print("Best-match similarity: " + ", ".join(f"{k}={v:.3f}" for k, v in stats['similarity_percentiles'].items()))
+            for low, high, count in stats['similarity_histogram']:
+                if count:
+                    print(f"  [{low:+.1f}, {high:+.1f}) {'#' * min(count, 50)} {count}")
@@ -0,0 +1,490 @@
+"""Multi-session ASGI service exposing AIHelper and InfoExtractor over HTTP.
+
+Endpoints (JSON in, JSON out):
+
+    POST   /sessions                          -> {"session_id": ...}
+    DELETE /sessions/{id}
+    POST   /sessions/{id}/guidelines          {"name", "guideline"}
+    POST   /sessions/{id}/data                {"name", "data"}  (string, or list of records -> DataFrame)
+    POST   /sessions/{id}/ask                 {"prompt", "with_guideline", "with_data", "with_history"}
+    POST   /sessions/{id}/ask/stream          same body, answered as server-sent events
+    GET    /sessions/{id}/history
+    POST   /extract                           {"schema", "base_prompt", "fix_prompt", "technology_name", "info_source"}
+    GET    /stats
+
+Run with `serve(create_app())` (requires uvicorn), or any other ASGI server.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from .ai_helper import AIHelper
+from .info_extractor import InfoExtractor
+from .scheduler import get_scheduler, request_priority
+
+
+class RateLimiter():
+    """Thread-safe token bucket: at most `rate` requests per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int]=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedClient():
+    """Wraps a chat client so that every call on it goes through one shared RateLimiter."""
+
+    def __init__(self, client, rate_limiter: Optional[RateLimiter]=None):
+        self.client = client
+        self.rate_limiter = rate_limiter
+
+    def chat_completion(self, *args, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return self.client.chat_completion(*args, **kwargs)
+
+
+class Session():
+    """One user's isolated AIHelper state."""
+
+    def __init__(self, session_id: str, helper: AIHelper):
+        self.session_id = session_id
+        self.helper = helper
+        self.lock = threading.Lock()   # one request at a time per session keeps the history consistent
+        self.in_use = 0                # requests holding the session (SessionStore.get/release); never evicted while > 0
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.size = 0                  # memory_bytes() as of the last request, kept by SessionStore
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the session's history, guidelines and attachments."""
+        size = sum(len(m['content']) for m in self.helper.chat_history)
+        size += sum(len(g) for g in self.helper.guideline.values())
+        size += self.helper.attached_data.resident_bytes()
+        return size
+
+    def close(self):
+        """Release the session's attachments (and their spill files)."""
+        self.helper.attached_data.clear()
+
+
+class SessionStore():
+    """
+    Sessions kept in least-recently-used order, bounded by count and total memory.
+
+    Sessions idle for more than `idle_timeout` seconds are evicted, as are the least
+    recently used sessions when `max_sessions` or `max_total_bytes` is exceeded. The
+    oldest chat history of a session is dropped when it exceeds `max_session_bytes`.
+
+    A session's size is measured once after each of its requests and the total is
+    kept up to date, so lookups and eviction do not walk every session. Evicted
+    sessions are released outside the store lock.
+
+    get() pins the session until release() is called, so a request's session is
+    not evicted between the lookup and the end of the request.
+    """
+
+    def __init__(self, create_helper: Callable[[], AIHelper], max_sessions: int=1000,
+                 max_total_bytes: int=512 * 1024 ** 2, max_session_bytes: int=32 * 1024 ** 2,
+                 idle_timeout: float=1800):
+        self.create_helper = create_helper
+        self.max_sessions = max_sessions
+        self.max_total_bytes = max_total_bytes
+        self.max_session_bytes = max_session_bytes
+        self.idle_timeout = idle_timeout
+
+        self._sessions = OrderedDict()     # least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = {'idle': 0, 'capacity': 0, 'memory': 0}
+
+    def create(self) -> Session:
+        session = Session(uuid.uuid4().hex, self.create_helper())
+        session.helper.scheduler_session = session.session_id
+        with self._lock:
+            self._sessions[session.session_id] = session
+            evicted = self._evict(keep=session.session_id)
+        self._close(evicted)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The session, pinned against eviction until release(); None if unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_used > self.idle_timeout and not session.in_use:
+                self._remove(session_id)
+                self.evictions['idle'] += 1
+                expired = session
+            else:
+                session.in_use += 1
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return session
+        self._close([expired])
+        return None
+
+    def release(self, session: Session):
+        """Unpin a session returned by get()."""
+        with self._lock:
+            session.in_use -= 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._remove(session_id)
+        if session is None:
+            return False
+        self._close([session])
+        return True
+
+    def touch(self, session: Session):
+        """Update usage after a request and enforce the memory limits."""
+        session.last_used = time.monotonic()
+        with session.lock:
+            history = session.helper.chat_history
+            size = session.memory_bytes()
+            while len(history) > 2 and size > self.max_session_bytes:
+                del history[:2]
+                size = session.memory_bytes()
+        with self._lock:
+            if session.session_id in self._sessions:
+                self._total_bytes += size - session.size
+            session.size = size
+            evicted = self._evict(keep=session.session_id)
+        self._close(evicted)
+
+    def _evict(self, keep: Optional[str]=None) -> List[Session]:
+        # caller holds self._lock; only pops sessions, the caller releases them after unlocking
+        evicted = []
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            # least recently used first: stop at the first session that is still active
+            if now - session.last_used <= self.idle_timeout:
+                break
+            if session_id != keep and not session.in_use:
+                evicted.append(self._remove(session_id))
+                self.evictions['idle'] += 1
+
+        for reason, over_limit in (('capacity', lambda: len(self._sessions) > self.max_sessions),
+                                   ('memory', lambda: self._total_bytes > self.max_total_bytes)):
+            while over_limit():
+                session = self._evict_lru(keep)
+                if session is None:
+                    break
+                evicted.append(session)
+                self.evictions[reason] += 1
+        return evicted
+
+    def _evict_lru(self, keep: Optional[str]) -> Optional[Session]:
+        for session_id, session in self._sessions.items():
+            if session_id != keep and not session.in_use:
+                return self._remove(session_id)
+        return None
+
+    def _remove(self, session_id: str) -> Optional[Session]:
+        # caller holds self._lock
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_bytes -= session.size
+        return session
+
+    @staticmethod
+    def _close(sessions: List[Session]):
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'memory_bytes': self._total_bytes,
+                'evictions': dict(self.evictions),
+            }
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMHelperApp():
+    """
+    ASGI application serving many isolated AIHelper sessions.
+
+    All sessions share one chat client (and so one connection pool) and one rate
+    limiter. Blocking model calls run on a bounded thread pool.
+
+    Args:
+        client: Chat client shared by all sessions. Default: one huggingface_hub InferenceClient.
+            Use llm_helper.mock_providers.MockInferenceClient for local load tests.
+        extractor_llm: LangChain chat model shared by /extract requests. Default: InfoExtractor's.
+        model_name (str): AIHelper model for new sessions.
+        requests_per_second (float, optional): Shared rate limit for all model calls.
+        max_workers (int): Maximum concurrent model calls.
+        **store_kwargs: Passed to SessionStore (max_sessions, max_total_bytes, idle_timeout, ...).
+    """
+
+    def __init__(self, client=None, extractor_llm=None, model_name: str='Mistral-7B',
+                 requests_per_second: Optional[float]=None, burst: Optional[int]=None,
+                 max_workers: int=32, **store_kwargs):
+
+        if client is None:
+            from huggingface_hub import InferenceClient
+            import os
+            client = InferenceClient(token=os.getenv("HF_TOKEN"))
+
+        self.rate_limiter = RateLimiter(requests_per_second, burst) if requests_per_second else None
+        self.client = RateLimitedClient(client, self.rate_limiter)
+        self.extractor_llm = extractor_llm
+        self._extractor_lock = threading.Lock()
+        self.model_name = model_name
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-helper')
+        self.sessions = SessionStore(self._create_helper, **store_kwargs)
+        self.requests = 0
+
+    def _create_helper(self) -> AIHelper:
+        return AIHelper(model_name=self.model_name, display_response=False, client=self.client, verbose=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        self.requests += 1
+        try:
+            await self._route(scope, receive, send)
+        except HTTPError as e:
+            await _send_json(send, e.status, {'error': str(e)})
+        except Exception as e:
+            await _send_json(send, 500, {'error': f"{type(e).__name__}: {e}"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _route(self, scope, receive, send):
+        method = scope['method']
+        parts = [p for p in scope['path'].split('/') if p]
+
+        if parts == ['stats'] and method == 'GET':
+            await _send_json(send, 200, self.stats())
+        elif parts == ['sessions'] and method == 'POST':
+            session = await self._run(self.sessions.create)
+            await _send_json(send, 201, {'session_id': session.session_id})
+        elif parts == ['extract'] and method == 'POST':
+            body = await _read_json(receive)
+            _require(body, 'schema', 'base_prompt', 'fix_prompt', 'technology_name', 'info_source')
+            result = await self._run(self._extract, body)
+            await _send_json(send, 200, {'result': result})
+        elif len(parts) >= 2 and parts[0] == 'sessions':
+            await self._session_route(method, parts[1], parts[2:], receive, send)
+        else:
+            raise HTTPError(404, f"Not found: {method} {scope['path']}")
+
+    async def _session_route(self, method, session_id, action, receive, send):
+        if action == [] and method == 'DELETE':
+            if not self.sessions.delete(session_id):
+                raise HTTPError(404, f"Unknown session: {session_id}")
+            await _send_json(send, 200, {'deleted': session_id})
+            return
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, f"Unknown or expired session: {session_id}")
+        try:
+            await self._session_action(session, method, action, receive, send)
+        finally:
+            self.sessions.release(session)
+
+    async def _session_action(self, session: Session, method, action, receive, send):
+        if action == ['history'] and method == 'GET':
+            await _send_json(send, 200, {'history': list(session.helper.chat_history)})
+            return
+        if method != 'POST':
+            raise HTTPError(405, f"Method not allowed: {method}")
+
+        body = await _read_json(receive)
+        if action == ['guidelines']:
+            _require(body, 'name', 'guideline')
+            await self._run(self._locked, session, session.helper.add_guideline, body['name'], body['guideline'])
+            await _send_json(send, 200, {'guidelines': list(session.helper.guideline)})
+        elif action == ['data']:
+            _require(body, 'name', 'data')
+            data = pd.DataFrame(body['data']) if isinstance(body['data'], list) else body['data']
+            await self._run(self._locked, session, session.helper.attach_data, body['name'], data)
+            await _send_json(send, 200, {'data': list(session.helper.attached_data)})
+        elif action == ['ask']:
+            _require(body, 'prompt')
+            response = await self._run(self._locked, session, session.helper.ask, body['prompt'],
+                                       display_response=False, **_ask_options(body))
+            await _send_json(send, 200, {'response': response})
+        elif action == ['ask', 'stream']:
+            _require(body, 'prompt')
+            await self._stream_ask(session, body, receive, send)
+        else:
+            raise HTTPError(404, f"Not found: POST /sessions/{session.session_id}/{'/'.join(action)}")
+
+        # waits for the session lock (a disconnected stream may still be finishing a chunk)
+        await self._run(self.sessions.touch, session)
+
+    async def _stream_ask(self, session: Session, body: Dict[str, Any], receive, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                with session.lock:
+                    for delta in session.helper.ask_stream(body['prompt'], **_ask_options(body)):
+                        if cancelled.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, ('delta', delta))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ('error', f"{type(e).__name__}: {e}"))
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, ('end', None))
+
+        async def watch_disconnect():
+            # the request body has been read, so the next message is the disconnect
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            cancelled.set()
+            queue.put_nowait(('disconnect', None))
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+        ]})
+        loop.run_in_executor(self.executor, produce)
+        watcher = asyncio.ensure_future(watch_disconnect())
+
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == 'disconnect':
+                    # client went away: the producer stops at its next chunk
+                    return
+                if kind == 'end':
+                    break
+                event = f"data: {json.dumps(payload)}\n\n" if kind == 'delta' else f"event: error\ndata: {json.dumps(payload)}\n\n"
+                await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b"event: done\ndata: {}\n\n", 'more_body': False})
+        except Exception:
+            cancelled.set()
+            raise
+        finally:
+            watcher.cancel()
+
+    def _extract(self, body: Dict[str, Any]) -> Any:
+        if self.extractor_llm is None:
+            # build the default model once and share it between requests
+            with self._extractor_lock:
+                if self.extractor_llm is None:
+                    self.extractor_llm = InfoExtractor().llm
+        extractor = InfoExtractor(llm=self.extractor_llm)
+        extractor.load_data_schema(body['schema'])
+        extractor.load_prompt_templates(body['base_prompt'], body['fix_prompt'])
+        # extraction runs behind interactive questions when a scheduler is set
+        with request_priority(body.get('priority', 'batch')):
+            return extractor.extract_from(body['technology_name'], body['info_source'],
+                                          max_retries=body.get('max_retries', 3), verbose=False)
+
+    @staticmethod
+    def _locked(session: Session, fn, *args, **kwargs):
+        with session.lock:
+            return fn(*args, **kwargs)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.sessions.stats()
+        stats['requests'] = self.requests
+        if get_scheduler() is not None:
+            stats['scheduler'] = get_scheduler().stats()
+        return stats
+
+
+def _ask_options(body: Dict[str, Any]) -> Dict[str, bool]:
+    return {k: bool(body.get(k, True)) for k in ('with_guideline', 'with_data', 'with_history')}
+
+
+def _require(body: Dict[str, Any], *fields: str):
+    """Reject a request body that lacks required fields with a 400."""
+    missing = [f for f in fields if f not in body]
+    if missing:
+        raise HTTPError(400, f"Missing field(s) in request body: {', '.join(missing)}")
+
+
+async def _read_json(receive) -> Dict[str, Any]:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        payload = json.loads(body) if body else {}
+    except json.JSONDecodeError as e:
+        raise HTTPError(400, f"Invalid JSON body: {e}")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return payload
+
+
+async def _send_json(send, status: int, payload: Any):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_app(**kwargs) -> LLMHelperApp:
+    """Create the ASGI application. See LLMHelperApp for the options."""
+    return LLMHelperApp(**kwargs)
+
+
+def serve(app: Optional[LLMHelperApp]=None, host: str='127.0.0.1', port: int=8000):
+    """Run the service with uvicorn (`pip install uvicorn`)."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise ImportError("serve() requires `pip install uvicorn`")
+
+    uvicorn.run(app or create_app(), host=host, port=port)
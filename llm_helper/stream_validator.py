@@ -0,0 +1,177 @@
+"""Incremental validation of a streamed JSON object against a Pydantic schema."""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+
+from pydantic import TypeAdapter, ValidationError
+
+
+class StreamAbort(Exception):
+    """
+    Raised by StreamingJSONValidator.feed() as soon as the output is clearly off-schema.
+
+    `kind` is 'preamble' (prose before the JSON object), 'truncated' (the stream ended
+    before the object was complete) or 'malformed' (unknown key, bad value or type).
+    """
+
+    def __init__(self, reason: str, received: str, kind: str='malformed'):
+        super().__init__(reason)
+        self.reason = reason
+        self.received = received
+        self.kind = kind
+
+
+class StreamingJSONValidator():
+    """
+    Consumes a model response chunk by chunk and validates the top-level JSON object
+    as it is generated.
+
+    - Text before the opening brace (other than whitespace and a ```json fence) is
+      allowed up to `max_preamble` characters.
+    - Every top-level key must be a field of the model.
+    - Every top-level value is parsed and validated against its field type as soon as
+      it is complete, and reported through `on_field(name, value)`.
+
+    feed() raises StreamAbort on the first violation, so the caller can stop the
+    generation and start the repair right away.
+    """
+
+    def __init__(self, model: type, max_preamble: int=200, on_field: Optional[Callable[[str, Any], None]]=None):
+        self.model = model
+        self.max_preamble = max_preamble
+        self.on_field = on_field
+
+        self._adapters = {name: TypeAdapter(field.annotation) for name, field in model.model_fields.items()}
+
+        self.received = ''
+        self.fields = {}
+        self.complete = False
+
+        self._started = False
+        self._preamble = ''
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = 'key'        # key -> colon -> value -> (',' -> key | '}')
+        self._token = ''           # current key or value text
+        self._key = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Process the next chunk; returns the fields completed by it."""
+
+        self.received += text
+        completed = []
+        for ch in text:
+            if self.complete:
+                break
+            if not self._started:
+                self._feed_preamble(ch)
+                continue
+            field = self._feed_object(ch)
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def finish(self) -> Dict[str, Any]:
+        """Call after the stream ended; returns the parsed object or raises StreamAbort."""
+        if not self.complete:
+            raise StreamAbort("response ended before the JSON object was complete", self.received, kind='truncated')
+        return dict(self.fields)
+
+    def _abort(self, reason: str, kind: str='malformed'):
+        raise StreamAbort(reason, self.received, kind)
+
+    def _feed_preamble(self, ch: str):
+        if ch == '{':
+            self._started = True
+            self._depth = 1
+            return
+        self._preamble += ch
+        stripped = self._preamble.strip()
+        for fence in ('```json', '```JSON', '```'):
+            if stripped.startswith(fence):
+                stripped = stripped[len(fence):].strip()
+                break
+        if len(stripped) > self.max_preamble:
+            self._abort(f"prose preamble longer than {self.max_preamble} characters before the JSON object", 'preamble')
+
+    def _feed_object(self, ch: str) -> Optional[Tuple[str, Any]]:
+        # string handling is the same at every depth
+        if self._in_string:
+            self._token += ch
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1 and self._state == 'key':
+                    self._key = json.loads(self._token)
+                    self._token = ''
+                    if self._key not in self._adapters:
+                        self._abort(f"unexpected key '{self._key}' (expected one of: {', '.join(self._adapters)})")
+                    self._state = 'colon'
+            return None
+
+        if ch == '"':
+            self._in_string = True
+            if self._depth == 1 and self._state == 'key':
+                self._token = ch
+                return None
+            self._token += ch
+            return None
+
+        if self._depth == 1 and self._state == 'key':
+            if ch == '}':
+                self._close_object()
+            elif not ch.isspace() and ch != ',':
+                self._abort(f"expected a key, got {ch!r}")
+            return None
+
+        if self._depth == 1 and self._state == 'colon':
+            if ch == ':':
+                self._state = 'value'
+                self._token = ''
+            elif not ch.isspace():
+                self._abort(f"expected ':' after key '{self._key}', got {ch!r}")
+            return None
+
+        # value
+        if ch in '{[':
+            self._depth += 1
+        elif ch in '}]':
+            if self._depth == 1:
+                if ch == ']':
+                    self._abort(f"unbalanced ']' in the value of '{self._key}'")
+                field = self._complete_value()
+                self._close_object()
+                return field
+            self._depth -= 1
+        elif ch == ',' and self._depth == 1:
+            field = self._complete_value()
+            self._state = 'key'
+            return field
+
+        self._token += ch
+        return None
+
+    def _complete_value(self) -> Tuple[str, Any]:
+        text = self._token.strip()
+        self._token = ''
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            self._abort(f"malformed value for '{self._key}': {text[:80]!r}")
+        try:
+            value = self._adapters[self._key].validate_python(value)
+        except ValidationError as e:
+            self._abort(f"type mismatch for '{self._key}': {e.errors()[0]['msg']}")
+
+        self.fields[self._key] = value
+        if self.on_field is not None:
+            self.on_field(self._key, value)
+        return self._key, value
+
+    def _close_object(self):
+        self._depth = 0
+        self.complete = True
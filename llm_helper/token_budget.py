@@ -0,0 +1,181 @@
+"""Pre-flight token accounting and context budget planning for AIHelper.ask."""
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence
+import os
+
+
+class ApproxTokenizer():
+    """Fallback when no real tokenizer can be loaded: about 4 characters per token."""
+
+    name = 'approx-4-chars-per-token'
+
+    def count(self, text: str) -> int:
+        return (len(text) + 3) // 4
+
+
+class HFTokenizer():
+    """Token counter backed by a Hugging Face fast tokenizer."""
+
+    def __init__(self, repo_id: str):
+        from transformers import AutoTokenizer
+        self.name = repo_id
+        self.tokenizer = AutoTokenizer.from_pretrained(repo_id, token=os.getenv("HF_TOKEN"))
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(repo_id: str):
+    """
+    Tokenizer for a model repo id (e.g. a value of ai_helper.llm_models), loaded once
+    per process. Falls back to ApproxTokenizer when transformers is not installed or
+    the tokenizer cannot be downloaded (offline, gated model without HF_TOKEN).
+    """
+    try:
+        return HFTokenizer(repo_id)
+    except Exception as e:
+        print(f"⚠️ Could not load tokenizer for {repo_id} ({type(e).__name__}); using approximate token counts")
+        return ApproxTokenizer()
+
+
+class BudgetPlanner():
+    """
+    Counts the tokens of every message segment before a request is sent and trims
+    segments that do not fit in the model's context window.
+
+    Segments are dicts with 'kind' ('guideline', 'data', 'history' or 'prompt'),
+    'name' and 'content'. When the input is too large, segments are removed kind by
+    kind following `policy`: history oldest first, guidelines and data largest first.
+    Data blocks are truncated instead of dropped when that is enough to fit. The
+    prompt itself is never trimmed.
+
+    max_tokens for the response is set from what is left of the window, capped at
+    `max_output_tokens`; trimming continues until at least `min_output_tokens` are left.
+    """
+
+    def __init__(self, tokenizer, context_window: int, max_output_tokens: int=2000, min_output_tokens: int=256,
+                 policy: Sequence[str]=('history', 'data', 'guideline'), message_overhead: int=4,
+                 safety_margin: int=32, cache_size: int=1024):
+        self.tokenizer = tokenizer
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.min_output_tokens = min_output_tokens
+        self.policy = list(policy)
+        self.message_overhead = message_overhead
+        self.safety_margin = safety_margin
+
+        self._cache_size = cache_size
+        self._counts = OrderedDict()
+
+    def count(self, text: str) -> int:
+        """Token count of text, cached since guidelines and data repeat on every call."""
+        if text in self._counts:
+            self._counts.move_to_end(text)
+            return self._counts[text]
+
+        n = self.tokenizer.count(text)
+        self._counts[text] = n
+        if len(self._counts) > self._cache_size:
+            self._counts.popitem(last=False)
+        return n
+
+    def _input_tokens(self, segments: List[Dict[str, Any]]) -> int:
+        n_messages = sum(1 for s in segments if s['kind'] in ('history', 'prompt'))
+        if any(s['kind'] in ('guideline', 'data') for s in segments):
+            n_messages += 1
+        return sum(s['tokens'] for s in segments) + n_messages * self.message_overhead
+
+    def plan(self, segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Decide what to send.
+
+        Returns:
+            dict: 'segments' (what to send, in order), 'breakdown' (one row per input
+            segment with its token count and action), 'tokens_by_kind', 'input_tokens',
+            'max_tokens', 'context_window' and 'trimmed' (bool).
+
+        Raises:
+            ValueError: If the prompt alone does not fit in the context window.
+        """
+
+        segments = [dict(s, tokens=self.count(s['content'])) for s in segments]
+        breakdown = [{'kind': s['kind'], 'name': s['name'], 'tokens': s['tokens'], 'action': 'keep'} for s in segments]
+        kept = list(range(len(segments)))
+
+        # the input must leave room for at least min_output_tokens
+        limit = self.context_window - self.safety_margin - min(self.min_output_tokens, self.max_output_tokens)
+
+        def over() -> int:
+            return self._input_tokens([segments[i] for i in kept]) - limit
+
+        for kind in self.policy:
+            if over() <= 0:
+                break
+
+            candidates = [i for i in kept if segments[i]['kind'] == kind]
+            if kind != 'history':
+                candidates.sort(key=lambda i: -segments[i]['tokens'])
+
+            while candidates and over() > 0:
+                i = candidates.pop(0)
+                excess = over()
+
+                if kind == 'data' and segments[i]['tokens'] > excess + 64:
+                    segments[i] = self._truncate(segments[i], segments[i]['tokens'] - excess - 16)
+                    breakdown[i]['action'] = f"truncated to {segments[i]['tokens']}"
+                    continue
+
+                kept.remove(i)
+                breakdown[i]['action'] = 'dropped'
+
+                # drop history in user/assistant pairs so the roles keep alternating
+                if kind == 'history' and candidates and segments[candidates[0]].get('role') == 'assistant':
+                    j = candidates.pop(0)
+                    kept.remove(j)
+                    breakdown[j]['action'] = 'dropped'
+
+        input_tokens = self._input_tokens([segments[i] for i in kept])
+        if over() > 0:
+            raise ValueError(
+                f"Prompt does not fit in the context window: {input_tokens} input tokens, "
+                f"window {self.context_window}, at least {self.min_output_tokens} tokens needed for the answer"
+            )
+
+        tokens_by_kind = {}
+        for i in kept:
+            tokens_by_kind[segments[i]['kind']] = tokens_by_kind.get(segments[i]['kind'], 0) + segments[i]['tokens']
+
+        return {
+            'segments': [segments[i] for i in kept],
+            'breakdown': breakdown,
+            'tokens_by_kind': tokens_by_kind,
+            'input_tokens': input_tokens,
+            'max_tokens': min(self.max_output_tokens, self.context_window - input_tokens - self.safety_margin),
+            'context_window': self.context_window,
+            'tokenizer': getattr(self.tokenizer, 'name', type(self.tokenizer).__name__),
+            'trimmed': any(row['action'] != 'keep' for row in breakdown),
+        }
+
+    def _truncate(self, segment: Dict[str, Any], target_tokens: int) -> Dict[str, Any]:
+        content = segment['content']
+        n_chars = max(0, int(len(content) * target_tokens / max(segment['tokens'], 1)))
+        marker = f"\n... [truncated {segment['tokens'] - target_tokens} tokens to fit the context window]"
+        truncated = content[:n_chars] + marker
+        # shrink until the count, including the marker, is within the target
+        while n_chars > 0 and self.count(truncated) > target_tokens:
+            n_chars = int(n_chars * 0.95)
+            truncated = content[:n_chars] + marker
+        return dict(segment, content=truncated, tokens=self.count(truncated))
+
+
+def print_plan(plan: Dict[str, Any]):
+    """Print a plan returned by BudgetPlanner.plan() as a table."""
+
+    print(f"Context budget ({plan['tokenizer']}): {plan['input_tokens']} input tokens, "
+          f"max_tokens={plan['max_tokens']}, window={plan['context_window']}"
+          + (" (trimmed)" if plan['trimmed'] else ""))
+    for row in plan['breakdown']:
+        print(f"  {row['kind']:<10} {str(row['name'])[:30]:<30} {row['tokens']:>8}  {row['action']}")
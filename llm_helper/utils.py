@@ -26,4 +26,52 @@ def read_pdf2text(pdf_path: str) -> str:
         for page in pdf.pages:
             pdf_text += page.extract_text() + "\n"
 
-    return pdf_text
\ No newline at end of file
+    return pdf_text
+
+
+def chunk_text(text: str, target_size: int=1500, max_size: int=4000) -> list:
+    """
+    Split text into chunks at line boundaries.
+
+    Chunk boundaries are content-defined: a line ends a chunk when the chunk has
+    reached target_size and the line's hash picks it as a boundary (or when max_size
+    would be exceeded). An edit therefore only changes the chunks around it, and the
+    chunks of unchanged regions stay identical between document versions.
+    Args:
+        text (str): The text to split.
+        target_size (int): Minimum chunk size (in characters) before a boundary may be placed.
+        max_size (int): Maximum chunk size; longer lines are cut into pieces of this size.
+    Returns:
+        list: The chunks, in order, with blank lines removed.
+    Example:
+        >>> chunks = chunk_text(read_pdf2text("/path/to/document.pdf"))
+    """
+    import zlib
+
+    lines = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        while len(line) > max_size:
+            lines.append(line[:max_size])
+            line = line[max_size:]
+        if line.strip():
+            lines.append(line)
+
+    chunks = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) > max_size:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+
+        current.append(line)
+        size += len(line) + 1
+
+        if size >= target_size and zlib.crc32(line.encode("utf-8")) % 8 == 0:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
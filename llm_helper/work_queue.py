@@ -0,0 +1,469 @@
+"""Shared SQLite work queue for running extraction jobs in several processes or on several hosts."""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from .job_runner import ExtractionJob, run_bounded
+from .scheduler import request_priority
+
+
+_schema = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    technology_name TEXT NOT NULL,
+    info_source TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',     -- pending | leased | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, seq);
+CREATE TABLE IF NOT EXISTS results (
+    item_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    worker TEXT,
+    record TEXT NOT NULL
+);
+"""
+
+
+class WorkQueue():
+    """
+    Work items and results of an extraction job in one SQLite file.
+
+    Workers claim items under a lease that they extend with heartbeats while they
+    work. When a worker dies, its leases run out and the items are handed to the
+    next worker that asks for work; an item whose lease expired `max_attempts`
+    times is marked failed instead. Results are written once: the first 'ok'
+    record of an item wins, so a slow worker that finishes an item after it was
+    reclaimed and completed elsewhere changes nothing. A failed attempt puts the
+    item back in the queue until it has used `max_attempts`.
+
+    The file can be shared by processes on one machine or, on a shared filesystem
+    with working POSIX locks, by several hosts. WAL journaling (wal=True) allows
+    more concurrency but only works when all processes are on the same host.
+
+    Args:
+        path (str): SQLite file, created if needed.
+        lease_seconds (float): How long a claim is valid without a heartbeat.
+        max_attempts (int): Claims per item before it is marked failed.
+        wal (bool): Use write-ahead logging (single host only).
+    """
+
+    def __init__(self, path: str, lease_seconds: float=120, max_attempts: int=3, wal: bool=False):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.wal = wal
+
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().executescript(_schema)
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread (the worker's heartbeat runs in its own thread)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            if self.wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+        return _Transaction(conn)
+
+    # coordinator side
+
+    def add(self, items: Union[Dict[str, str], Iterable[Tuple[str, str, str]]], batch_size: int=500) -> int:
+        """
+        Enqueue items (same forms as ExtractionJob.run). Items already in the queue
+        are left untouched, so adding the same input twice is safe. Returns the
+        number of new items.
+        """
+
+        added = 0
+        batch = []
+
+        def insert():
+            nonlocal added
+            with self._transaction() as conn:
+                start = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO items (item_id, technology_name, info_source, seq) VALUES (?, ?, ?, ?)",
+                    [(str(i), name, source, start + n + 1) for n, (i, name, source) in enumerate(batch)]
+                )
+                added += conn.total_changes - before
+            batch.clear()
+
+        for item in ExtractionJob._iter_items(items):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                insert()
+        if batch:
+            insert()
+        return added
+
+    def retry_failed(self) -> int:
+        """Put failed items back in the queue with a fresh attempt budget; returns how many."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE items SET status = 'pending', attempts = 0, worker = NULL, lease_until = NULL "
+                "WHERE status = 'failed'"
+            ).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Item counts per status, plus leases that have expired."""
+        conn = self._connection()
+        counts = dict.fromkeys(('pending', 'leased', 'done', 'failed'), 0)
+        counts.update(conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+        counts['expired'] = conn.execute(
+            "SELECT COUNT(*) FROM items WHERE status = 'leased' AND lease_until < ?", (time.time(),)
+        ).fetchone()[0]
+        counts['total'] = sum(counts[s] for s in ('pending', 'leased', 'done', 'failed'))
+        return counts
+
+    def unfinished(self) -> int:
+        """Items that are pending or leased."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')"
+        ).fetchone()[0]
+
+    def workers(self) -> Dict[str, int]:
+        """Items currently leased, per worker."""
+        return dict(self._connection().execute(
+            "SELECT worker, COUNT(*) FROM items WHERE status = 'leased' GROUP BY worker"
+        ).fetchall())
+
+    # CheckpointStore-compatible reads, so ExtractionJob.results() and collect() work on a queue
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """The result record of every finished item."""
+        rows = self._connection().execute("SELECT record FROM results ORDER BY rowid").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def completed_ids(self, include_failed: bool=True) -> set:
+        query = "SELECT item_id FROM results" + ("" if include_failed else " WHERE status = 'ok'")
+        return {row[0] for row in self._connection().execute(query)}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # worker side
+
+    def claim(self, worker: str, n: int=1) -> List[Tuple[str, str, str]]:
+        """Lease up to n items (pending ones first, then expired leases) to worker."""
+
+        now = time.time()
+        with self._transaction() as conn:
+            # leases that ran out too often: the item keeps killing its workers
+            abandoned = conn.execute(
+                "SELECT item_id, technology_name, attempts FROM items "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            ).fetchall()
+            for item_id, technology_name, attempts in abandoned:
+                record = {'item_id': item_id, 'technology_name': technology_name, 'result': None, 'status': 'failed',
+                          'error': f"lease expired {attempts} times (worker crashed or hung)"}
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (item_id, status, worker, record) VALUES (?, 'failed', NULL, ?)",
+                    (item_id, json.dumps(record))
+                )
+                conn.execute(
+                    "UPDATE items SET status = 'failed', worker = NULL, lease_until = NULL WHERE item_id = ?",
+                    (item_id,)
+                )
+            rows = conn.execute(
+                "SELECT item_id, technology_name, info_source FROM items "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY status = 'leased', seq LIMIT ?",
+                (now, n)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE items SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE item_id = ?",
+                [(worker, now + self.lease_seconds, row[0]) for row in rows]
+            )
+        return [tuple(row) for row in rows]
+
+    def heartbeat(self, worker: str, item_ids: Iterable[str]) -> List[str]:
+        """Extend worker's leases on item_ids; returns the ids it still holds."""
+
+        item_ids = list(item_ids)
+        if not item_ids:
+            return []
+        until = time.time() + self.lease_seconds
+        held = []
+        with self._transaction() as conn:
+            for item_id in item_ids:
+                cursor = conn.execute(
+                    "UPDATE items SET lease_until = ? WHERE item_id = ? AND worker = ? AND status = 'leased'",
+                    (until, item_id, worker)
+                )
+                if cursor.rowcount:
+                    held.append(item_id)
+        return held
+
+    def complete(self, worker: str, record: Dict[str, Any]) -> bool:
+        """
+        Store the result record of an item. Returns False when the write was
+        ignored because the item already has an 'ok' result.
+        """
+
+        item_id = str(record['item_id'])
+        ok = record.get('status') == 'ok'
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status, attempts, worker FROM items WHERE item_id = ?", (item_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown item: {item_id}")
+            status, attempts, holder = row
+            if status == 'done':
+                return False
+
+            if ok:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (item_id, status, worker, record) VALUES (?, 'ok', ?, ?)",
+                    (item_id, worker, json.dumps(record, default=str))
+                )
+                conn.execute(
+                    "UPDATE items SET status = 'done', worker = ?, lease_until = NULL WHERE item_id = ?",
+                    (worker, item_id)
+                )
+                return True
+
+            if status == 'leased' and holder != worker:
+                # reclaimed by another worker, which is trying again: leave the item to it
+                return False
+            if attempts < self.max_attempts:
+                conn.execute(
+                    "UPDATE items SET status = 'pending', worker = NULL, lease_until = NULL WHERE item_id = ?",
+                    (item_id,)
+                )
+                return True
+            conn.execute(
+                "INSERT OR REPLACE INTO results (item_id, status, worker, record) VALUES (?, 'failed', ?, ?)",
+                (item_id, worker, json.dumps(record, default=str))
+            )
+            conn.execute(
+                "UPDATE items SET status = 'failed', worker = ?, lease_until = NULL WHERE item_id = ?",
+                (worker, item_id)
+            )
+            return True
+
+    def release(self, worker: str, item_ids: Optional[Iterable[str]]=None) -> int:
+        """Return worker's leased items (or only item_ids) to the queue, e.g. on shutdown."""
+        with self._transaction() as conn:
+            if item_ids is None:
+                return conn.execute(
+                    "UPDATE items SET status = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+                    "WHERE worker = ? AND status = 'leased'", (worker,)
+                ).rowcount
+            return sum(conn.execute(
+                "UPDATE items SET status = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+                "WHERE worker = ? AND status = 'leased' AND item_id = ?", (worker, str(item_id))
+            ).rowcount for item_id in item_ids)
+
+    def report(self):
+        """Print the queue counts."""
+        stats = self.stats()
+        print(f"Queue {self.path}: {stats['done']}/{stats['total']} done, {stats['failed']} failed, "
+              f"{stats['pending']} pending, {stats['leased']} leased ({stats['expired']} expired)")
+
+
+class _Transaction():
+    """BEGIN IMMEDIATE ... COMMIT, so claims by concurrent workers never interleave."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
+
+
+class QueueWorker(ExtractionJob):
+    """
+    Processes items claimed from a WorkQueue until the queue is drained.
+
+    Start one per process (run_workers() does this on one machine); every worker
+    needs its own InfoExtractor. A background thread renews the leases of the
+    items in progress every `heartbeat_interval` seconds. When the queue has no
+    claimable items but other workers still hold leases, the worker waits and
+    picks up items whose leases run out.
+
+    Args:
+        extractor (InfoExtractor): A fully configured extractor.
+        queue (WorkQueue | str): The queue, or the path of its SQLite file.
+        worker_id (str, optional): Default: host name, process id and a random suffix.
+        max_workers (int): Items processed concurrently in this process.
+        heartbeat_interval (float, optional): Default: a third of the lease.
+        poll_interval (float): Seconds to wait when nothing is claimable.
+    """
+
+    def __init__(self, extractor, queue: Union[WorkQueue, str], worker_id: Optional[str]=None,
+                 max_retries: int=3, verbose: bool=False, priority: str='batch', max_workers: int=1,
+                 heartbeat_interval: Optional[float]=None, poll_interval: float=2.0):
+
+        self.extractor = extractor
+        self.store = queue if isinstance(queue, WorkQueue) else WorkQueue(queue)
+        self.queue = self.store
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.max_retries = max_retries
+        self.retry_failed = False
+        self.verbose = verbose
+        self.priority = priority
+        self.max_workers = max_workers
+        self.heartbeat_interval = heartbeat_interval or self.queue.lease_seconds / 3
+        self.poll_interval = poll_interval
+
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._stop_requested = False
+
+    def run(self, max_items: Optional[int]=None,
+            on_record: Optional[Callable[[Dict[str, Any]], None]]=None) -> Dict[str, Any]:
+        """
+        Claim and process items until the queue is drained, max_items were
+        processed, or a stop was requested. Returns this worker's counts.
+        """
+
+        self.extractor.validate_setup(require_source=False)
+        summary = {'worker': self.worker_id, 'completed': 0, 'failed': 0, 'ignored': 0, 'interrupted': False}
+        processed = 0
+
+        def claimed_items():
+            # claims while there is work to claim; an empty claim ends the round
+            nonlocal processed
+            while not self._stop_requested:
+                if max_items is not None and processed >= max_items:
+                    return
+                n = self.max_workers if max_items is None else min(self.max_workers, max_items - processed)
+                items = self.queue.claim(self.worker_id, n=n)
+                if not items:
+                    return
+                with self._held_lock:
+                    self._held.update(item[0] for item in items)
+                processed += len(items)
+                yield from items
+
+        def process(item):
+            with request_priority(self.priority):
+                return self.process_item(*item)
+
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_stop,), daemon=True)
+        heartbeat.start()
+
+        previous_handler = self._install_sigint_handler()
+        start = time.time()
+        try:
+            while not self._stop_requested and (max_items is None or processed < max_items):
+                before = processed
+                # at most max_workers items are leased at a time, none waiting behind the others
+                for record in run_bounded(process, claimed_items(), max_workers=self.max_workers,
+                                          max_pending=self.max_workers):
+                    accepted = self.queue.complete(self.worker_id, record)
+                    with self._held_lock:
+                        self._held.discard(record['item_id'])
+                    if not accepted:
+                        summary['ignored'] += 1
+                    else:
+                        summary['completed' if record['status'] == 'ok' else 'failed'] += 1
+                    if on_record is not None:
+                        on_record(record)
+
+                if processed == before:
+                    if self.queue.unfinished() == 0:
+                        break
+                    # other workers hold the rest: wait for them to finish, or for their leases to run out
+                    time.sleep(self.poll_interval)
+        finally:
+            summary['interrupted'] = self._stop_requested
+            heartbeat_stop.set()
+            heartbeat.join()
+            with self._held_lock:
+                held, self._held = list(self._held), set()
+            if held:
+                # interrupted mid-item: hand the items back instead of waiting for the leases to run out
+                self.queue.release(self.worker_id, held)
+            self._restore_sigint_handler(previous_handler)
+
+        summary['elapsed_s'] = round(time.time() - start, 3)
+        print(f"Worker {self.worker_id} finished: {summary['completed']} completed, {summary['failed']} failed, "
+              f"{summary['ignored']} duplicates ignored" + (" (interrupted)" if summary['interrupted'] else ""))
+        return summary
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            with self._held_lock:
+                held = list(self._held)
+            try:
+                self.queue.heartbeat(self.worker_id, held)
+            except sqlite3.OperationalError as e:
+                # a busy database: the next beat will try again (leases last three intervals)
+                print(f"⚠️ Heartbeat of {self.worker_id} failed: {e}")
+
+
+def _worker_process(extractor_factory: Callable[[], Any], queue_path: str, queue_options: Dict[str, Any],
+                    worker_options: Dict[str, Any]) -> None:
+    queue = WorkQueue(queue_path, **queue_options)
+    QueueWorker(extractor_factory(), queue, **worker_options).run()
+
+
+def run_workers(extractor_factory: Callable[[], Any], queue: Union[WorkQueue, str], processes: int=4,
+                start_method: Optional[str]=None, **worker_options) -> Dict[str, int]:
+    """
+    Coordinator for one machine: start `processes` worker processes on the queue
+    and wait until they have drained it. Returns the queue counts.
+
+    extractor_factory is called in every worker process to build its
+    InfoExtractor, so it must be picklable (a module-level function or a
+    functools.partial of one).
+    """
+
+    import multiprocessing
+
+    if not isinstance(queue, WorkQueue):
+        queue = WorkQueue(queue)
+    queue_options = {'lease_seconds': queue.lease_seconds, 'max_attempts': queue.max_attempts, 'wal': queue.wal}
+    context = multiprocessing.get_context(start_method)
+
+    print(f"🚀 Starting {processes} workers on {queue.path} ({queue.unfinished()} items to do)")
+    workers = [
+        context.Process(target=_worker_process, args=(extractor_factory, queue.path, queue_options, worker_options),
+                        name=f"llm-helper-worker-{i}")
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        # the workers got the Ctrl-C too: give them time to hand back their leases
+        for process in workers:
+            process.join(timeout=30)
+        raise
+
+    crashed = [p.name for p in workers if p.exitcode not in (0, None)]
+    if crashed:
+        print(f"⚠️ Workers exited with errors: {', '.join(crashed)}")
+    queue.report()
+    return queue.stats()
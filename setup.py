@@ -45,6 +45,11 @@ setup(
             "mypy>=1.0.0",
         ],
     },
+    entry_points={
+        "console_scripts": [
+            "llm-helper=llm_helper.cli:main",
+        ],
+    },
     include_package_data=True,
     keywords="llm ai machine-learning huggingface gemini openai data-analysis",
     project_urls={
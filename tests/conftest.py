@@ -0,0 +1,57 @@
+"""Shared fixtures: extractors and helpers backed by the local mock providers."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_helper import AIHelper, InfoExtractor
+from llm_helper.mock_providers import MockChatModel, MockInferenceClient
+
+
+SCHEMA = {
+    'tech_type': 'Technology',
+    'fields': {
+        'name': {'field_type': 'str', 'description': 'Name of the technology'},
+        'year': {'field_type': 'int', 'description': 'Year of introduction'},
+        'tags': {'field_type': 'List[str]', 'description': 'Keywords'},
+    },
+}
+
+BASE_PROMPT = {'system': 'Extract technology information.',
+               'human': 'BASE {technology_name}\nSOURCE {info_source}\n{format_instructions}'}
+FIX_PROMPT = {'system': 'Repair the output.',
+              'human': 'FIX {technology_name}\nOUTPUT {malformed_output}\n{format_instructions}'}
+
+
+def answer(name='Flywheel', year=1990, tags=()):
+    """A valid JSON answer for SCHEMA."""
+    return json.dumps({'name': name, 'year': year, 'tags': list(tags)})
+
+
+@pytest.fixture
+def make_extractor():
+    """make_extractor(responder, schema=SCHEMA) -> InfoExtractor on a MockChatModel; responder(prompt) -> text."""
+
+    def make(responder, schema=SCHEMA):
+        extractor = InfoExtractor(llm=MockChatModel(responder, latency=0))
+        if schema is not None:
+            extractor.load_data_schema(schema)
+        extractor.load_prompt_templates(BASE_PROMPT, FIX_PROMPT)
+        return extractor
+
+    return make
+
+
+@pytest.fixture
+def make_helper():
+    """make_helper(responder=None, **kwargs) -> AIHelper on a MockInferenceClient; responder(messages) -> text."""
+
+    def make(responder=None, **kwargs):
+        client = MockInferenceClient(responder, latency=0)
+        return AIHelper(client=client, display_response=False, verbose=False, **kwargs)
+
+    return make
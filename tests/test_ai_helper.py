@@ -0,0 +1,82 @@
+import pandas as pd
+
+
+def system_message(helper):
+    return helper._build_messages('question')[0]['content']
+
+
+def block_order(text):
+    names = []
+    for line in text.splitlines():
+        if line.startswith('[Guideline: ') and line.endswith(' Start]'):
+            names.append(line[len('[Guideline: '):-len(' Start]')])
+        elif line.startswith('[Data: ') and line.endswith(' Start]'):
+            names.append(line[len('[Data: '):-len(' Start]')])
+    return names
+
+
+def test_system_message_is_cached_until_something_changes(make_helper):
+    helper = make_helper()
+    helper.add_guideline('g1', 'Be brief.')
+    helper.attach_data('frame', pd.DataFrame({'a': [1, 2]}))
+    first = system_message(helper)
+    assert system_message(helper) is first
+
+    helper.add_guideline('g1', 'Be very brief.')
+    assert system_message(helper) != first
+
+
+def test_data_stays_in_the_prefix_when_a_guideline_changes(make_helper):
+    helper = make_helper()
+    helper.add_guideline('g1', 'one')
+    helper.add_guideline('g2', 'two')
+    helper.attach_data('frame', pd.DataFrame({'a': range(100)}))
+    before = system_message(helper)
+    assert block_order(before) == ['frame', 'g1', 'g2']
+
+    helper.add_guideline('g1', 'one, edited')
+    after = system_message(helper)
+    assert block_order(after) == ['frame', 'g2', 'g1']
+    data_block = helper.attached_data.block('frame')
+    assert after.startswith(data_block) and before.startswith(data_block)
+
+    helper.attach_data('notes', 'new attachment')
+    assert block_order(system_message(helper)) == ['frame', 'g2', 'g1', 'notes']
+    assert system_message(helper).startswith(after.rstrip())
+
+
+def test_spilled_attachment_text_is_not_cached(make_helper):
+    helper = make_helper()
+    helper.add_guideline('g', 'Be brief.')
+    helper.attach_data('small', pd.DataFrame({'a': [1, 2]}))
+    system_message(helper)
+    assert len(helper._system_cache) == 1
+
+    helper.attach_data('big', pd.DataFrame({'a': range(100)}), spill=True)
+    assert '99' in system_message(helper)
+    assert helper._system_cache == {}
+
+
+def test_system_message_assembly_is_thread_safe(make_helper):
+    import threading
+
+    helper = make_helper()
+    helper.attach_data('frame', pd.DataFrame({'a': range(20)}))
+    errors = []
+
+    def build(n):
+        try:
+            for i in range(200):
+                if n == 0:
+                    helper.add_guideline(f'g{i % 7}', f'guideline {i}')
+                helper._build_messages('question', with_guideline=bool(i % 2))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert block_order(system_message(helper))[0] == 'frame'
@@ -0,0 +1,114 @@
+import pytest
+
+
+def test_answer_is_streamed_and_kept_in_history(make_helper):
+    helper = make_helper(lambda messages: 'three word answer')
+    chunks = list(helper.ask_stream('question'))
+    assert chunks == ['three', ' word', ' answer']
+    assert helper.chat_history == [{'role': 'user', 'content': 'question'},
+                                   {'role': 'assistant', 'content': 'three word answer'}]
+
+
+def test_stopping_early_keeps_the_partial_answer(make_helper):
+    helper = make_helper(lambda messages: 'three word answer')
+    stream = helper.ask_stream('question')
+    assert next(stream) == 'three'
+    stream.close()
+    assert helper.chat_history[-1] == {'role': 'assistant', 'content': 'three'}
+    assert helper.client.active_calls == 0
+
+
+def test_cached_answer_arrives_as_one_chunk(make_helper):
+    helper = make_helper(lambda messages: 'three word answer')
+    helper.enable_semantic_cache()
+    list(helper.ask_stream('What is a flywheel?'))
+    assert helper.client.calls == 1
+
+    assert list(helper.ask_stream('What is a flywheel?')) == ['three word answer']
+    assert helper.client.calls == 1
+
+
+def test_cascaded_answer_arrives_as_one_chunk(make_helper):
+    helper = make_helper()
+    weak, strong = helper.llm_models['Llama-3.1'], helper.llm_models['Mistral-7B']
+    answers = {weak: '', strong: 'answer from the second model'}
+    models = []
+    chat_completion = helper.client.chat_completion
+
+    def routed(model=None, **kwargs):
+        # the mock responder does not see the model, so answer per model here
+        models.append(model)
+        helper.client.responder = lambda messages: answers[model]
+        return chat_completion(model=model, **kwargs)
+
+    helper.client.chat_completion = routed
+    helper.set_cascade(['Llama-3.1', 'Mistral-7B'])
+    assert list(helper.ask_stream('question')) == ['answer from the second model']
+    assert models == [weak, strong]
+
+
+def test_failed_stream_leaves_no_history(make_helper):
+    def responder(messages):
+        raise ConnectionError('provider down')
+
+    helper = make_helper(responder)
+    with pytest.raises(ConnectionError):
+        list(helper.ask_stream('question'))
+    assert helper.chat_history == []
+
+
+def open_widget(helper, monkeypatch):
+    shown = []
+    monkeypatch.setattr('llm_helper.ai_helper.display', lambda *items: shown.extend(items))
+    helper.chat_widget()
+    _, text_in, controls, cards = shown
+    return text_in, controls.children[0], cards
+
+
+def test_widget_answers_questions_in_the_background(make_helper, monkeypatch):
+    helper = make_helper(lambda messages: f"answer to {messages[-1]['content']}")
+    text_in, button, cards = open_widget(helper, monkeypatch)
+
+    for question in ('first', 'second'):
+        text_in.value = question
+        button.click()
+        assert text_in.value == ''
+    helper._widget_executor.shutdown(wait=True)
+
+    assert len(cards.children) == 2
+    for card in cards.children:
+        assert '✅ Answered in' in card.children[1].value
+    assert sorted(m['content'] for m in helper.chat_history if m['role'] == 'assistant') == \
+        ['answer to first', 'answer to second']
+
+
+def test_widget_stop_button_releases_the_card(make_helper, monkeypatch):
+    helper = make_helper(lambda messages: 'answer')
+    helper.client.latency = 0.5
+    text_in, button, cards = open_widget(helper, monkeypatch)
+
+    text_in.value = 'slow question'
+    button.click()
+    header = cards.children[0].children[0]
+    stop_button = header.children[1]
+    stop_button.click()
+    assert stop_button.disabled
+    assert '⏹ Stopped after' in cards.children[0].children[1].value
+    helper._widget_executor.shutdown(wait=True)
+    assert helper.client.active_calls == 0
+
+
+def test_concurrent_questions_keep_turns_paired(make_helper):
+    from concurrent.futures import ThreadPoolExecutor
+
+    helper = make_helper(lambda messages: f"answer to {messages[-1]['content']}")
+    helper.client.latency = 0.01
+    questions = [f'q{i}' for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda q: helper.ask(q) if q[-1] in '02468' else list(helper.ask_stream(q)), questions))
+
+    history = helper.chat_history
+    assert len(history) == 2 * len(questions)
+    for user, assistant in zip(history[::2], history[1::2]):
+        assert (user['role'], assistant['role']) == ('user', 'assistant')
+        assert assistant['content'] == f"answer to {user['content']}"
@@ -0,0 +1,79 @@
+import gc
+import os
+
+import pandas as pd
+
+from llm_helper.attachment_store import AttachmentStore
+
+
+def frame(n=50):
+    return pd.DataFrame({'a': range(n), 'b': [f'row {i}' for i in range(n)]})
+
+
+def test_dataframes_are_snapshotted_and_rendered_once():
+    store = AttachmentStore()
+    df = frame()
+    store.add('df', df)
+    df.loc[0, 'b'] = 'changed later'
+
+    block = store.block('df')
+    assert 'changed later' not in block and 'row 0' in block
+    assert store.block('df') is block
+    assert block.startswith('[Data: df Start]')
+
+
+def test_every_change_bumps_the_version():
+    store = AttachmentStore()
+    store['a'] = 'text'
+    store['b'] = frame()
+    version = store.version
+    store['a'] = 'new text'
+    del store['b']
+    assert store.version == version + 2
+    assert list(store) == ['a'] and store['a'] == 'new text'
+
+
+def test_spilled_frames_are_read_back_and_their_directory_removed():
+    store = AttachmentStore(spill_threshold_bytes=1)
+    store.add('big', frame(1000))
+    spill_dir = store.spill_dir
+    assert store.attachment('big').kind == 'spilled'
+    assert os.listdir(spill_dir)
+    assert 'row 999' in store['big']
+
+    del store['big']
+    assert not os.path.exists(spill_dir)
+
+    store.add('again', frame(), spill=True)
+    spill_dir = store.spill_dir
+    del store
+    gc.collect()
+    assert not os.path.exists(spill_dir)
+
+
+
+def test_membership_and_repeated_asks_do_not_render_blocks(make_helper, monkeypatch):
+    from llm_helper.attachment_store import Attachment
+
+    renders = []
+    block = Attachment.block
+
+    def counted(self):
+        # blocks held in memory are free; count serializations and reads from disk
+        if self._block is None:
+            renders.append(self.name)
+        return block(self)
+
+    monkeypatch.setattr(Attachment, 'block', counted)
+
+    helper = make_helper()
+    helper.attach_data('small', frame())
+    helper.attach_data('big', frame(100), spill=True)
+    assert 'big' in helper.attached_data and 'missing' not in helper.attached_data
+    assert renders == []
+
+    for question in ('one', 'two', 'three'):
+        helper.ask(question)
+    # the in-memory block is rendered once; the spilled one once per request, as it is not cached
+    assert renders.count('small') == 1
+    assert renders.count('big') == 3
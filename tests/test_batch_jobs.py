@@ -0,0 +1,76 @@
+import re
+import time
+
+import pytest
+
+from llm_helper.batch_jobs import BatchExtractionJob
+from llm_helper.mock_providers import MockBatchEndpoint
+
+from conftest import answer
+
+
+class Responder():
+    """Answers per technology name: 'bad' needs the fix prompt, 'flaky' fails once, 'hopeless' never parses."""
+
+    def __init__(self):
+        self.flaky_calls = 0
+
+    def __call__(self, prompt):
+        if prompt.startswith('System: Repair the output.'):
+            name = re.search(r'FIX (.*)', prompt).group(1)
+            return 'still not json' if name == 'hopeless' else answer(name=name, tags=['fixed'])
+        name = re.search(r'BASE (.*)', prompt).group(1)
+        if name == 'flaky':
+            self.flaky_calls += 1
+            if self.flaky_calls == 1:
+                raise RuntimeError('server overloaded')
+        if name in ('bad', 'hopeless'):
+            return 'Sorry, no JSON today.'
+        return answer(name=name)
+
+
+def make_job(extractor, endpoint, tmp_path, **kwargs):
+    return BatchExtractionJob(extractor, endpoint, str(tmp_path / 'out.jsonl'), str(tmp_path / 'batch'),
+                              model='mock-model', poll_interval=0.01, **kwargs)
+
+
+@pytest.mark.parametrize('format', ['openai', 'gemini'])
+def test_only_failures_are_resubmitted(make_extractor, tmp_path, format):
+    endpoint = MockBatchEndpoint(Responder(), format=format, turnaround=0)
+    job = make_job(make_extractor(None), endpoint, tmp_path, max_retries=2)
+    items = {name: 'text' for name in ('good', 'bad', 'flaky', 'hopeless')}
+
+    summary = job.run(items)
+    assert (summary['completed'], summary['failed'], summary['in_progress']) == (3, 1, False)
+    # round 2 resends the failed request and the fix prompts of the two unparsable outputs
+    assert endpoint.requests == 4 + 3
+    records = {r['item_id']: r for r in job.store.load_records()}
+    assert records['bad']['result']['tags'] == ['fixed']
+    assert records['flaky']['result']['name'] == 'flaky'
+    assert records['hopeless']['status'] == 'failed'
+
+    again = make_job(make_extractor(None), endpoint, tmp_path).run(items)
+    assert (again['completed'], again['skipped']) == (0, 4)
+
+
+def test_submitted_round_is_resumed_by_a_later_run(make_extractor, tmp_path):
+    endpoint = MockBatchEndpoint(Responder(), turnaround=0.2)
+    summary = make_job(make_extractor(None), endpoint, tmp_path).run({'good': 'text'}, wait=False)
+    assert summary['in_progress'] and summary['completed'] == 0
+
+    time.sleep(0.25)
+    later = make_job(make_extractor(None), endpoint, tmp_path)
+    summary = later.run()
+    assert (summary['completed'], summary['in_progress']) == (1, False)
+    assert later.results() == [{'name': 'good', 'year': 1990, 'tags': []}]
+    assert endpoint.requests == 1
+
+
+def test_failed_job_and_large_rounds(make_extractor, tmp_path):
+    endpoint = MockBatchEndpoint(Responder(), turnaround=0, fail_jobs=1)
+    job = make_job(make_extractor(None), endpoint, tmp_path, max_batch_requests=2)
+    summary = job.run({f'item {i}': 'text' for i in range(5)})
+
+    # round 1 is split into three jobs; the items of the failed first job go again
+    assert summary['completed'] == 5 and summary['resubmitted'] == 2
+    assert len(endpoint.jobs) == 4
@@ -0,0 +1,127 @@
+import pytest
+
+from llm_helper.cascade import Escalate, ModelCascade, filled_fraction
+from llm_helper.mock_providers import MockChatModel
+
+from conftest import answer
+
+
+def tier_models(*responders):
+    return [MockChatModel(responder, latency=0) for responder in responders]
+
+
+def test_cascade_escalates_until_a_tier_passes():
+    def attempt(tier):
+        if tier == 'cheap':
+            raise Escalate('parse')
+        return f'{tier} answer'
+
+    cascade = ModelCascade(['cheap', 'strong'])
+    assert cascade.run(attempt) == 'strong answer'
+    stats = cascade.stats()
+    assert [t['escalations'] for t in stats['tiers']] == [{'parse': 1}, {}]
+    assert [t['hits'] for t in stats['tiers']] == [0, 1]
+
+
+def test_low_confidence_escalates_except_on_the_last_tier():
+    results = {'cheap': {'name': 'x', 'year': None}, 'strong': {'name': 'y', 'year': None}}
+    cascade = ModelCascade(['cheap', 'strong'], min_confidence=0.9, costs=[1, 10])
+    assert cascade.run(results.get) == results['strong']
+    assert cascade.stats()['tiers'][0]['escalations'] == {'low confidence': 1}
+    assert cascade.stats()['cost_vs_last_tier'] == 1.1
+
+    with pytest.raises(TypeError):
+        filled_fraction('plain text')
+
+
+def test_error_of_the_last_tier_is_raised():
+    def attempt(tier):
+        raise ConnectionError(tier)
+
+    cascade = ModelCascade(['cheap', 'strong'])
+    with pytest.raises(ConnectionError):
+        cascade.run(attempt)
+    assert cascade.stats()['failed'] == 1
+
+
+def test_extractor_keeps_the_cheap_answer_when_it_is_usable(make_extractor):
+    extractor = make_extractor(None)
+    strong_prompts = []
+    cheap, strong = tier_models(lambda prompt: f"Sure! Here it is:\n```json\n{answer()}\n```",
+                                lambda prompt: strong_prompts.append(prompt) or answer(name='strong'))
+    cascade = extractor.set_cascade([cheap, strong], names=['cheap', 'strong'])
+
+    # prose and code fences around the object are repaired locally
+    assert extractor.extract_from('Flywheel', 'text', verbose=False)['name'] == 'Flywheel'
+    assert strong_prompts == []
+    assert cascade.stats()['tiers'][0]['hits'] == 1
+
+
+@pytest.mark.parametrize('cheap_answer, reason', [
+    ('I could not find anything.', 'parse'),
+    ('{"name": "Flywheel", "year": "long ago", "tags": []}', 'validation'),
+])
+def test_extractor_escalates_unusable_answers(make_extractor, cheap_answer, reason):
+    extractor = make_extractor(None)
+    cheap, strong = tier_models(lambda prompt: cheap_answer, lambda prompt: answer(name='strong'))
+    cascade = extractor.set_cascade([cheap, strong], names=['cheap', 'strong'])
+
+    assert extractor.extract_from('Flywheel', 'text', verbose=False)['name'] == 'strong'
+    assert cascade.stats()['tiers'][0]['escalations'] == {reason: 1}
+
+
+def test_extractor_escalates_low_confidence(make_extractor):
+    extractor = make_extractor(None)
+    cheap, strong = tier_models(lambda prompt: '{"name": "Flywheel", "year": 0, "tags": []}',
+                                lambda prompt: answer(tags=['disk']))
+    extractor.set_cascade([cheap, strong], names=['cheap', 'strong'], min_confidence=0.9)
+    assert extractor.extract_from('Flywheel', 'text', verbose=False)['tags'] == ['disk']
+
+
+def routed_helper(make_helper, answers):
+    """AIHelper whose mock client answers per model with answers[model key] (an Exception is raised)."""
+    helper = make_helper()
+    keys = {repo: key for key, repo in helper.llm_models.items()}
+    models = []
+    chat_completion = helper.client.chat_completion
+
+    def routed(model=None, **kwargs):
+        models.append(keys[model])
+        reply = answers[keys[model]]
+        if isinstance(reply, Exception):
+            raise reply
+        helper.client.responder = lambda messages: reply
+        return chat_completion(model=model, **kwargs)
+
+    helper.client.chat_completion = routed
+    return helper, models
+
+
+def test_helper_escalates_empty_and_rejected_answers(make_helper):
+    helper, models = routed_helper(make_helper, {'Llama-3.1': 'short', 'Mistral-7B': 'a longer answer'})
+    helper.set_cascade(['Llama-3.1', 'Mistral-7B'], check=lambda text: len(text) > 10)
+    assert helper.ask('question') == 'a longer answer'
+    assert models == ['Llama-3.1', 'Mistral-7B']
+    assert helper.cascade.stats()['tiers'][0]['escalations'] == {'check failed': 1}
+
+    helper, models = routed_helper(make_helper, {'Llama-3.1': 'fine', 'Mistral-7B': 'unused'})
+    helper.set_cascade(['Llama-3.1', 'Mistral-7B'])
+    assert helper.ask('question') == 'fine'
+    assert models == ['Llama-3.1']
+
+
+def test_helper_cascade_failure_leaves_no_history(make_helper):
+    helper, _ = routed_helper(make_helper, {'Llama-3.1': '', 'Mistral-7B': ConnectionError('down')})
+    helper.set_cascade(['Llama-3.1', 'Mistral-7B'])
+    with pytest.raises(ConnectionError):
+        helper.ask('question')
+    assert helper.chat_history == []
+
+
+def test_helper_cascade_rejects_bad_settings(make_helper):
+    helper = make_helper()
+    with pytest.raises(ValueError):
+        helper.set_cascade(['Llama-3.1', 'Mistral-7B'], min_confidence=0.5)
+    with pytest.raises(ValueError):
+        helper.set_cascade(['Llama-3.1', 'GPT-9'])
+    assert helper.cascade is None
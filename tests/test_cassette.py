@@ -0,0 +1,89 @@
+import pytest
+
+from llm_helper import AIHelper
+from llm_helper.cassette import Cassette, CassetteMiss
+from llm_helper.mock_providers import MockChatModel, MockInferenceClient
+
+from conftest import answer
+
+
+def replay_helper(cassette):
+    return AIHelper(client=cassette.inference_client(), display_response=False, verbose=False)
+
+
+def test_recorded_answers_replay_without_a_provider(tmp_path):
+    path = str(tmp_path / 'calls.jsonl.gz')
+    client = MockInferenceClient(lambda messages: f"answer to {messages[-1]['content']}", latency=0)
+
+    cassette = Cassette(path, mode='record')
+    helper = AIHelper(client=cassette.inference_client(client), display_response=False, verbose=False)
+    assert helper.ask('first') == 'answer to first'
+    streamed = list(helper.ask_stream('second'))
+    assert "".join(streamed) == 'answer to second'
+    assert cassette.stats()['recorded'] == 2
+
+    cassette = Cassette(path)
+    helper = replay_helper(cassette)
+    assert helper.ask('first') == 'answer to first'
+    assert list(helper.ask_stream('second')) == streamed
+    assert cassette.stats() == {'entries': 2, 'hits': 2, 'misses': 0, 'recorded': 0}
+
+
+def test_unknown_request_raises_on_replay(tmp_path):
+    path = str(tmp_path / 'calls.jsonl')
+    client = MockInferenceClient(lambda messages: 'recorded', latency=0)
+    helper = AIHelper(client=Cassette(path, mode='record').inference_client(client), display_response=False, verbose=False)
+    helper.ask('recorded question')
+
+    helper = replay_helper(Cassette(path))
+    with pytest.raises(CassetteMiss):
+        helper.ask('another question')
+    # a failed request leaves no unanswered question in the history
+    assert helper.chat_history == []
+
+    with pytest.raises(FileNotFoundError):
+        Cassette(str(tmp_path / 'missing.jsonl'))
+
+
+def test_repeated_requests_replay_in_recorded_order(tmp_path):
+    path = str(tmp_path / 'calls.jsonl')
+    answers = iter(['one', 'two'])
+    client = MockInferenceClient(lambda messages: next(answers), latency=0)
+    cassette = Cassette(path, mode='record')
+    recorder = cassette.inference_client(client)
+    messages = [{'role': 'user', 'content': 'same'}]
+    for _ in range(2):
+        recorder.chat_completion(model='m', messages=messages)
+
+    replay = Cassette(path).inference_client()
+    texts = [replay.chat_completion(model='m', messages=messages).choices[0].message.content for _ in range(3)]
+    assert texts == ['one', 'two', 'two']
+
+
+def test_auto_mode_records_only_new_requests(tmp_path):
+    path = str(tmp_path / 'calls.jsonl')
+    client = MockInferenceClient(lambda messages: 'live', latency=0)
+    messages = [{'role': 'user', 'content': 'q'}]
+    Cassette(path, mode='record').inference_client(client).chat_completion(model='m', messages=messages)
+
+    cassette = Cassette(path, mode='auto')
+    auto = cassette.inference_client(client)
+    auto.chat_completion(model='m', messages=messages)
+    auto.chat_completion(model='m', messages=[{'role': 'user', 'content': 'new'}])
+    assert cassette.stats() == {'entries': 2, 'hits': 1, 'misses': 1, 'recorded': 1}
+    assert client.calls == 2
+
+
+def test_extractor_replays_through_chat_model(tmp_path, make_extractor):
+    path = str(tmp_path / 'extract.jsonl')
+    cassette = Cassette(path, mode='record')
+    extractor = make_extractor(None)
+    extractor.llm = cassette.chat_model(MockChatModel(lambda prompt: answer(tags=['disk']), latency=0))
+    recorded = extractor.extract_from('Flywheel', 'source text', verbose=False)
+    assert recorded['tags'] == ['disk']
+
+    extractor = make_extractor(None)
+    extractor.llm = Cassette(path).chat_model()
+    assert extractor.extract_from('Flywheel', 'source text', verbose=False) == recorded
+    with pytest.raises(CassetteMiss):
+        extractor.extract_from('Flywheel', 'other source', verbose=False)
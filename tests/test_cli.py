@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import re
+import threading
+import time
+
+import pytest
+
+from llm_helper import AIHelper, InfoExtractor
+from llm_helper.cassette import Cassette
+from llm_helper.cli import Progress, iter_extract_inputs, main
+from llm_helper.job_runner import ExtractionJob
+from llm_helper.mock_providers import MockChatModel, MockInferenceClient
+
+from conftest import BASE_PROMPT, FIX_PROMPT, SCHEMA, answer
+
+
+def read_jsonl(path):
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def write_questions(path, questions):
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['id', 'prompt'])
+        writer.writerows(enumerate(questions))
+
+
+def record_answers(path, questions):
+    """Cassette with the answers `llm-helper ask` will request for questions."""
+    cassette = Cassette(path, mode='record')
+    client = MockInferenceClient(lambda messages: f"answer to {messages[-1]['content']}", latency=0)
+    helper = AIHelper(model_name='Mistral-7B', display_response=False, verbose=False,
+                      client=cassette.inference_client(client))
+    for question in questions:
+        helper._complete(helper._build_messages(question, with_history=False))
+
+
+def test_ask_answers_a_file_and_resumes(tmp_path, capsys):
+    questions, cassette, output = tmp_path / 'q.csv', str(tmp_path / 'calls.jsonl'), str(tmp_path / 'answers.jsonl')
+    record_answers(cassette, ['one', 'two', 'three'])
+    write_questions(questions, ['one', 'two'])
+    argv = ['ask', '--input', str(questions), '--id-field', 'id', '--output', output, '--cassette', cassette]
+
+    assert main(argv) == 0
+    assert {r['result'] for r in read_jsonl(output)} == {'answer to one', 'answer to two'}
+
+    # rows already answered are skipped; new rows are answered
+    write_questions(questions, ['one', 'two', 'three'])
+    assert main(argv) == 0
+    records = read_jsonl(output)
+    assert sorted(r['item_id'] for r in records) == ['0', '1', '2']
+    assert records[-1]['result'] == 'answer to three'
+
+    # a prompt without a recorded answer fails without stopping the run
+    write_questions(questions, ['one', 'two', 'three', 'four'])
+    assert main(argv) == 1
+    assert read_jsonl(output)[-1]['status'] == 'failed'
+    assert '1 failed' in capsys.readouterr().out
+
+
+
+def test_unknown_priority_is_rejected_before_running(tmp_path, capsys):
+    questions = tmp_path / 'q.csv'
+    write_questions(questions, ['one'])
+    with pytest.raises(SystemExit) as exc:
+        main(['ask', '--input', str(questions), '--output', str(tmp_path / 'a.jsonl'), '--priority', 'urgent'])
+    assert exc.value.code == 2
+    assert "invalid choice: 'urgent'" in capsys.readouterr().err
+    assert not (tmp_path / 'a.jsonl').exists()
+
+def test_extract_reads_a_directory_lazily(tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    for name in ('Flywheel', 'Carnot'):
+        (docs / f'{name}.txt').write_text(f'{name} source')
+    (docs / 'notes.csv').write_text('ignored')
+
+    items = iter_extract_inputs(str(docs))
+    assert next(items) == ('Carnot', 'Carnot', 'Carnot source')
+    assert [item[0] for item in items] == ['Flywheel']
+
+
+def test_extract_with_a_recorded_cassette(tmp_path):
+    schema, prompts = tmp_path / 'schema.json', tmp_path / 'prompts.json'
+    schema.write_text(json.dumps(SCHEMA))
+    prompts.write_text(json.dumps({'base': BASE_PROMPT, 'fix': FIX_PROMPT}))
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'Flywheel.txt').write_text('Flywheel source')
+    cassette, output = str(tmp_path / 'calls.jsonl'), str(tmp_path / 'out.jsonl')
+
+    recording = Cassette(cassette, mode='record')
+    llm = recording.chat_model(MockChatModel(lambda prompt: answer(tags=['disk']), latency=0), model='gemini-2.5-flash')
+    extractor = InfoExtractor(llm=llm)
+    extractor.load_data_schema(SCHEMA)
+    extractor.load_prompt_templates(BASE_PROMPT, FIX_PROMPT)
+    extractor.extract_from('Flywheel', 'Flywheel source', verbose=False)
+
+    argv = ['extract', '--schema', str(schema), '--prompts', str(prompts), '--inputs', str(docs),
+            '--output', output, '--cassette', cassette]
+    assert main(argv) == 0
+    [record] = read_jsonl(output)
+    assert (record['item_id'], record['status'], record['result']['tags']) == ('Flywheel', 'ok', ['disk'])
+
+
+def test_job_workers_run_items_concurrently(make_extractor, tmp_path):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def responder(prompt):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return answer(name=re.search(r'BASE (.*)', prompt).group(1))
+
+    records = []
+    job = ExtractionJob(make_extractor(responder), str(tmp_path / 'ck.jsonl'), max_workers=4)
+    summary = job.run({f'item {i}': 'text' for i in range(8)}, on_record=records.append)
+    assert summary['completed'] == 8
+    assert sorted(r['item_id'] for r in records) == [f'item {i}' for i in range(8)]
+    assert peak[0] > 1
+
+
+def test_progress_line_counts_skipped_items():
+    stream = io.StringIO()
+    progress = Progress(total=3, skipped=1, stream=stream)
+    progress.update({'status': 'ok'})
+    progress.update({'status': 'failed'})
+    line = stream.getvalue()
+    assert line.endswith('\n') and '3/3' in line and 'failed 1' in line
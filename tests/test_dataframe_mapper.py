@@ -0,0 +1,43 @@
+import re
+
+import pandas as pd
+
+from llm_helper.dataframe_mapper import map_dataframe, pack_prompt, parse_packed_response
+
+
+def test_pack_and_parse_round_trip():
+    prompt = pack_prompt(['first', 'second'], task='Translate')
+    assert '[[0]]\nfirst' in prompt and '[[1]]\nsecond' in prompt
+    response = "[[1]]\nzweite\n[[0]]\nerste\n[[7]]\nout of range"
+    assert parse_packed_response(response, 2) == {0: 'erste', 1: 'zweite'}
+
+
+def test_map_dataframe_packs_rows_and_reasks_missing(make_helper):
+    dropped = set()
+
+    def responder(messages):
+        items = re.findall(r'\[\[(\d+)\]\]\n(\w+)', messages[-1]['content'])
+        answers = []
+        for tag, name in items:
+            # drop row 'c' once, so it has to be re-asked
+            if name == 'c' and name not in dropped:
+                dropped.add(name)
+                continue
+            answers.append(f"[[{tag}]]\n{name.upper()}")
+        return "\n".join(answers)
+
+    helper = make_helper(responder)
+    df = pd.DataFrame({'name': list('abcde')})
+    result = map_dataframe(helper, df, '{name}', 'upper', rows_per_call=2, max_workers=2)
+
+    assert list(result['upper']) == list('ABCDE')
+    assert 'upper' not in df.columns
+    assert helper.client.calls == 4     # 3 packed calls, then one re-ask
+    assert helper.chat_history == []
+
+
+def test_map_dataframe_leaves_unanswered_rows_empty(make_helper):
+    helper = make_helper(lambda messages: '')
+    result = map_dataframe(helper, pd.DataFrame({'name': ['a']}), '{name}', 'out', rows_per_call=1, max_retries=1)
+    assert result['out'].tolist() == [None]
+    assert helper.client.calls == 2
@@ -0,0 +1,43 @@
+from llm_helper import AIHelper_Google
+from llm_helper.mock_providers import MockGenaiClient
+
+
+def make_gemini(**kwargs):
+    client = MockGenaiClient(lambda prompt, cached: f"{len(cached)} cached chars", latency=0, min_cache_tokens=10)
+    return AIHelper_Google(client=client, display_response=False, min_cache_chars=1000, **kwargs)
+
+
+def test_large_attachment_is_uploaded_once():
+    gemini = make_gemini()
+    gemini.attach_data('report', 'r' * 5000)
+    assert gemini.ask('first') == gemini.ask('second') != '0 cached chars'
+    assert gemini.client.uploaded_chars >= 5000
+    assert gemini.client.sent_chars == len('first') + len('second')
+    assert len(gemini.client.caches.list()) == 1
+
+
+def test_small_attachment_is_sent_inline():
+    gemini = make_gemini()
+    gemini.attach_data('note', 'short note')
+    assert gemini.ask('question') == '0 cached chars'
+    assert gemini.client.uploaded_chars == 0
+    assert gemini.client.sent_chars > len('question')
+
+
+def test_changed_attachment_replaces_cache_and_expired_cache_is_recreated():
+    gemini = make_gemini()
+    gemini.attach_data('report', 'r' * 5000)
+    gemini.ask('first')
+    first = gemini.cached_content
+
+    gemini.attach_data('appendix', 'a' * 2000)
+    gemini.ask('second')
+    assert gemini.cached_content != first
+    assert [c.name for c in gemini.client.caches.list()] == [gemini.cached_content]
+
+    # deleted on the server behind our back: the ask uploads again
+    gemini.client.caches.delete(name=gemini.cached_content)
+    assert gemini.ask('third') == f"{len(gemini._data_text())} cached chars"
+
+    gemini.close()
+    assert gemini.client.caches.list() == []
@@ -0,0 +1,61 @@
+import json
+import re
+
+from llm_helper import IncrementalExtractor
+
+
+paragraphs = [f"Paragraph {i}. " + "filler text " * 150 for i in range(4)]
+
+
+def evidence_responder(calls):
+    def respond(prompt):
+        calls.append(prompt)
+        chunk_ids = re.findall(r'\[chunk (\w+)\]', prompt)
+        fields = re.findall(r'"(name|year|tags)": \{', prompt)
+        result = {'name': 'Flywheel', 'year': 1990 + len(calls), 'tags': []}
+        data = {f: result[f] for f in fields}
+        data['source_evidence'] = {'name': chunk_ids[:1], 'year': chunk_ids[-1:], 'tags': []}
+        return json.dumps(data)
+    return respond
+
+
+def test_only_fields_with_changed_evidence_are_re_extracted(make_extractor, tmp_path):
+    calls = []
+    extractor = make_extractor(evidence_responder(calls))
+    path = str(tmp_path / 'state.jsonl')
+    inc = IncrementalExtractor(extractor, path, target_chunk_size=500)
+
+    first = inc.extract('Flywheel', "\n\n".join(paragraphs))
+    assert len(calls) == 1 and first.year == 1991
+
+    # unchanged source: no call
+    assert inc.extract('Flywheel', "\n\n".join(paragraphs)) == first
+    assert len(calls) == 1
+
+    # the last paragraph (evidence of 'year') changes: only 'year' is asked for again
+    edited = paragraphs[:-1] + ["Paragraph 3 was rewritten. " + "other text " * 150]
+    second = inc.extract('Flywheel', "\n\n".join(edited))
+    assert len(calls) == 2
+    assert '"name": {' not in calls[1] and '"year": {' in calls[1]
+    assert second.name == 'Flywheel' and second.year == 1992
+
+    # the state survives a restart
+    assert IncrementalExtractor(extractor, path).state == inc.state
+
+
+def test_state_log_is_appended_and_compacted(make_extractor, tmp_path):
+    extractor = make_extractor(evidence_responder([]))
+    path = tmp_path / 'state.jsonl'
+    inc = IncrementalExtractor(extractor, str(path), compact_ratio=2.0)
+    for version in range(3):
+        for item in ('a', 'b'):
+            inc.extract(item, f"{item} version {version}")
+    assert len(path.read_text().splitlines()) <= 4
+
+    inc.forget('a')
+    with open(path, 'a') as fh:
+        fh.write('{"item": "torn", "sta')
+    reloaded = IncrementalExtractor(extractor, str(path))
+    assert list(reloaded.state) == ['b']
+    assert all(json.loads(line) for line in path.read_text().splitlines())
+
@@ -0,0 +1,121 @@
+import json
+import re
+
+import pytest
+
+from llm_helper.info_extractor import estimate_field_tokens, partition_fields
+
+from conftest import answer
+
+
+def entity_responder(prompt):
+    if '"names"' in prompt:
+        return json.dumps({'names': [f'E{i}' for i in range(7)] + ['E2']})
+    names = re.search(r'BASE (.*)', prompt).group(1).split(', ')
+    items = [json.loads(answer(name=n)) for n in names]
+    items[0]['year'] = 'unknown'     # one bad element, repaired on its own
+    return json.dumps({'items': items})
+
+
+def test_extract_entities_discovers_and_splits_names(make_extractor):
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        if prompt.startswith('System: Repair'):
+            return answer(name='fixed')
+        return entity_responder(prompt)
+
+    extractor = make_extractor(responder)
+    extractor.load_info_source('storage technologies', 'source text')
+    entities = extractor.extract_entities(max_entities_per_call=3, verbose=False)
+
+    # 1 discovery call, 3 groups of at most 3 names, 3 single-element repairs
+    assert len(prompts) == 7
+    assert sorted(e.name for e in entities) == ['E1', 'E2', 'E4', 'E5', 'fixed', 'fixed', 'fixed']
+    assert extractor.failed_entities == []
+
+
+def test_extract_entities_with_names_skips_discovery(make_extractor):
+    prompts = []
+    extractor = make_extractor(lambda p: prompts.append(p) or json.dumps(
+        {'items': [json.loads(answer(name=n)) for n in re.search(r'BASE (.*)', p).group(1).split(', ')]}))
+    extractor.load_info_source('storage technologies', 'source text')
+    entities = extractor.extract_entities(['A', 'B', 'C'], max_entities_per_call=2, verbose=False)
+    assert [e.name for e in entities] == ['A', 'B', 'C']
+    assert len(prompts) == 2
+
+
+company_schema = {'tech_type': 'Company', 'fields': {'company': {'field_type': 'str', 'description': 'Company name'}}}
+product_schema = {'tech_type': 'Product', 'fields': {'price': {'field_type': 'float', 'description': 'Price'}}}
+
+
+def multi_extractor(make_extractor, responder):
+    extractor = make_extractor(responder, schema=None)
+    extractor.register_schema('company', company_schema)
+    extractor.register_schema('product', product_schema)
+    extractor.load_info_source('Flywheel', 'source text')
+    return extractor
+
+
+def test_extract_multi_uses_one_call(make_extractor):
+    prompts = []
+    extractor = multi_extractor(make_extractor, lambda p: prompts.append(p) or json.dumps(
+        {'company': {'company': 'Acme'}, 'product': {'price': 9.5}}))
+    results = extractor.extract_multi(verbose=False)
+    assert results['company'].company == 'Acme' and results['product'].price == 9.5
+    assert len(prompts) == 1
+
+
+def test_extract_multi_repairs_and_re_extracts_sections(make_extractor):
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        if prompt.startswith('System: Repair'):
+            return json.dumps({'company': 'Acme'})
+        if '"product"' in prompt and '"company"' in prompt:
+            # envelope call: a bad company section, no product section
+            return json.dumps({'company': {'company': None}})
+        return json.dumps({'price': 9.5})
+
+    extractor = multi_extractor(make_extractor, responder)
+    results = extractor.extract_multi(verbose=False)
+    assert results['company'].company == 'Acme'
+    assert results['product'].price == 9.5
+    # the missing section is asked for again with the base prompt, which includes the source
+    assert prompts[1].startswith('System: Repair') and 'SOURCE source text' in prompts[2]
+    assert extractor.failed_sections == []
+
+
+def test_schemas_start_empty(make_extractor):
+    extractor = make_extractor(lambda p: '{}', schema=None)
+    assert extractor.schemas == {}
+    with pytest.raises(ValueError, match='No schemas registered'):
+        extractor.extract_multi()
+
+
+def test_partition_fields_respects_the_group_budget():
+    fields = {f'f{i}': {'field_type': 'List[str]' if i % 3 else 'str', 'description': ''} for i in range(30)}
+    groups = partition_fields(fields, max_group_tokens=120)
+    assert sorted(f for g in groups for f in g) == sorted(fields)
+    for group in groups:
+        assert len(group) == 1 or sum(estimate_field_tokens(f, fields[f]) for f in group) <= 120
+        assert group == sorted(group, key=list(fields).index)
+
+
+def test_grouped_extraction_merges_groups_and_repairs_only_the_bad_one(make_extractor):
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        if prompt.startswith('System: Repair'):
+            return json.dumps({'year': 1990})
+        data = {'name': 'Flywheel', 'year': 'unknown', 'tags': ['storage']}
+        return json.dumps({f: v for f, v in data.items() if f'"{f}": {{' in prompt})
+
+    extractor = make_extractor(responder)
+    extractor.load_info_source('Flywheel', 'source text')
+    result = extractor.extract_tech_info_grouped(groups=[['name', 'tags'], ['year']])
+    assert result.model_dump() == {'name': 'Flywheel', 'year': 1990, 'tags': ['storage']}
+    assert len(prompts) == 3 and sum(p.startswith('System: Repair') for p in prompts) == 1
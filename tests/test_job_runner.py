@@ -0,0 +1,69 @@
+import json
+import re
+
+from llm_helper.job_runner import CheckpointStore, ExtractionJob, run_bounded
+
+from conftest import answer
+
+
+def name_responder(prompt):
+    name = re.search(r'BASE (.*)', prompt).group(1)
+    if name == 'broken':
+        return 'no json here'
+    return answer(name=name)
+
+
+def test_run_bounded_yields_every_result():
+    results = list(run_bounded(lambda x: x * 2, range(20), max_workers=4))
+    assert sorted(results) == [x * 2 for x in range(20)]
+
+
+def test_checkpoint_skips_torn_last_line(tmp_path):
+    path = tmp_path / 'ck.jsonl'
+    store = CheckpointStore(str(path))
+    store.append({'item_id': 'a', 'status': 'ok'})
+    store.close()
+    with open(path, 'a') as fh:
+        fh.write('{"item_id": "b", "sta')
+    assert CheckpointStore(str(path)).completed_ids() == {'a'}
+
+
+def test_job_resumes_and_records_failures(make_extractor, tmp_path):
+    extractor = make_extractor(name_responder)
+    path = str(tmp_path / 'ck.jsonl')
+    items = {'Flywheel': 'text', 'Carnot battery': 'text', 'broken': 'text'}
+
+    summary = ExtractionJob(extractor, path, max_retries=1).run(items)
+    assert (summary['completed'], summary['failed']) == (2, 1)
+
+    again = ExtractionJob(extractor, path, max_retries=1).run(items)
+    assert (again['completed'], again['skipped']) == (0, 3)
+
+    records = [json.loads(line) for line in open(path)]
+    failed = [r for r in records if r['status'] == 'failed']
+    assert [r['item_id'] for r in failed] == ['broken']
+    assert sorted(r['name'] for r in ExtractionJob(extractor, path).results()) == ['Carnot battery', 'Flywheel']
+
+
+def test_concurrent_job_processes_all_items(make_extractor, tmp_path):
+    extractor = make_extractor(name_responder)
+    items = [(str(i), f'tech {i}', 'text') for i in range(12)]
+    seen = []
+    summary = ExtractionJob(extractor, str(tmp_path / 'ck.jsonl'), max_workers=4).run(items, on_record=seen.append)
+    assert summary['completed'] == 12
+    assert sorted(int(r['item_id']) for r in seen) == list(range(12))
+
+
+def test_parquet_checkpoint_writes_parts_every_flush_every_records(make_extractor, tmp_path):
+    extractor = make_extractor(name_responder)
+    path = tmp_path / 'ck'
+    items = {'Flywheel': 'text', 'Carnot battery': 'text', 'broken': 'text'}
+
+    job = ExtractionJob(extractor, str(path), max_retries=1, flush_every=2)
+    assert job.run(items)['failed'] == 1
+    assert sorted(p.name for p in path.iterdir()) == ['part-00000.parquet', 'part-00001.parquet']
+
+    records = {r['item_id']: r for r in job.store.load_records()}
+    assert records['Flywheel']['result']['name'] == 'Flywheel'
+    assert records['broken']['result'] is None
+    assert 'result_json' not in records['broken']
@@ -0,0 +1,101 @@
+import json
+import re
+
+from llm_helper.job_runner import CheckpointStore
+from llm_helper.pipeline import IngestionPipeline, merge_part_results, parse_document
+
+from conftest import answer
+
+
+def tag_responder(prompt):
+    """Name from the prompt, and the tagN markers of the source as tags."""
+    name = re.search(r'BASE (.*)', prompt).group(1)
+    source = prompt.split('SOURCE ', 1)[1]
+    return answer(name=name, tags=re.findall(r'tag\d+', source))
+
+
+def long_document(n=40):
+    return "\n".join(f"Paragraph {i} about the flywheel rotor, tag{i}, " + "filler " * 10 for i in range(n))
+
+
+def make_pipeline(extractor, path, **kwargs):
+    return IngestionPipeline(extractor, path, parse_processes=1, extract_concurrency=2, **kwargs)
+
+
+def test_merge_part_results():
+    merged = merge_part_results([
+        {'name': '', 'year': 1990, 'tags': ['a', 'b'], 'specs': {'rpm': 1}},
+        {'name': 'Flywheel', 'year': 2000, 'tags': ['b', 'c'], 'specs': {'rpm': 2, 'mass': 3}},
+    ])
+    assert merged == {'name': 'Flywheel', 'year': 1990, 'tags': ['a', 'b', 'c'], 'specs': {'rpm': 1, 'mass': 3}}
+
+
+def test_csv_with_source_columns_gives_one_item_per_row(tmp_path):
+    path = tmp_path / 'batch.csv'
+    path.write_text('item_id,technology_name,info_source\nf1,Flywheel,spins\n,Carnot,heat\n')
+    items, _ = parse_document(str(path))
+    assert items == [('f1', 'Flywheel', 'spins'), ('Carnot', 'Carnot', 'heat')]
+
+    table = tmp_path / 'table.csv'
+    table.write_text('a,b\n1,2\n')
+    assert parse_document(str(table))[0] == [('table', 'table', 'a,b\n1,2\n')]
+
+
+def test_pipeline_extracts_a_directory_and_skips_done_files(make_extractor, tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'Flywheel.txt').write_text('spins, tag1')
+    (docs / 'Carnot.md').write_text('heat, tag2')
+    (docs / 'batch.csv').write_text('technology_name,info_source\nPumped hydro,"water, tag3"\n')
+    checkpoint = str(tmp_path / 'out.jsonl')
+
+    summary = make_pipeline(make_extractor(tag_responder), checkpoint).run(str(docs))
+    assert (summary['completed'], summary['failed']) == (3, 0)
+    records = {r['item_id']: r for r in CheckpointStore(checkpoint).load_records()}
+    assert records['Pumped hydro']['result']['tags'] == ['tag3']
+    assert [s['stage'] for s in summary['stages']] == ['parse', 'chunk', 'extract']
+
+    again = make_pipeline(make_extractor(tag_responder), checkpoint).run(str(docs))
+    assert (again['completed'], again['skipped']) == (0, 3)
+
+
+def test_long_document_is_extracted_in_parts_and_merged(make_extractor, tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'Flywheel.txt').write_text(long_document())
+    checkpoint = str(tmp_path / 'out.jsonl')
+
+    pipeline = make_pipeline(make_extractor(tag_responder), checkpoint, max_source_chars=800,
+                             target_chunk_size=200, max_chunk_size=400)
+    summary = pipeline.run(str(docs))
+    assert summary['parts'] > 1 and summary['completed'] == 1
+
+    records = CheckpointStore(checkpoint).load_records()
+    merged = records[-1]
+    assert (merged['item_id'], merged['status'], merged['parts']) == ('Flywheel', 'ok', summary['parts'])
+    assert merged['result']['tags'] == [f'tag{i}' for i in range(40)]
+    assert all(r['part_of'] == 'Flywheel' for r in records[:-1])
+    assert pipeline.job.results() == [merged['result']]
+
+
+def test_interrupted_split_document_resumes_per_part(make_extractor, tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'Flywheel.txt').write_text(long_document())
+    checkpoint = str(tmp_path / 'out.jsonl')
+    options = dict(max_source_chars=800, target_chunk_size=200, max_chunk_size=400)
+    parts = make_pipeline(make_extractor(tag_responder), checkpoint, **options).run(str(docs))['parts']
+
+    # keep only the first part, as if the run had stopped after it
+    with open(checkpoint) as fh:
+        first_part = fh.readline()
+    with open(checkpoint, 'w') as fh:
+        fh.write(first_part)
+
+    prompts = []
+    extractor = make_extractor(lambda prompt: prompts.append(prompt) or tag_responder(prompt))
+    summary = make_pipeline(extractor, checkpoint, **options).run(str(docs))
+    assert json.loads(first_part)['part_of'] == 'Flywheel'
+    assert summary['completed'] == 1 and len(prompts) == summary['parts'] == parts - 1
+    merged = CheckpointStore(checkpoint).load_records()[-1]
+    assert merged['result']['tags'] == [f'tag{i}' for i in range(40)]
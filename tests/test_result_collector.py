@@ -0,0 +1,44 @@
+import pyarrow as pa
+import pytest
+from pydantic import ValidationError
+
+from conftest import answer
+
+
+def make_collector(make_extractor, **kwargs):
+    extractor = make_extractor(lambda prompt: answer())
+    return extractor.create_result_collector(**kwargs)
+
+
+def test_columns_are_typed_from_the_schema(make_extractor):
+    collector = make_collector(make_extractor, extra_columns={'item_id': pa.string()}, batch_size=2)
+    for i in range(5):
+        collector.append({'name': f't{i}', 'year': 2000 + i, 'tags': ['a', 'b']}, item_id=str(i))
+
+    table = collector.to_arrow()
+    assert table.num_rows == 5
+    assert table.schema.field('year').type == pa.int64()
+    assert table.schema.field('tags').type == pa.list_(pa.string())
+    assert table.column('item_id').to_pylist() == ['0', '1', '2', '3', '4']
+
+    df = collector.to_pandas()
+    assert df['year'].tolist() == [2000, 2001, 2002, 2003, 2004]
+
+
+def test_unvalidated_nulls_make_the_column_nullable(make_extractor, tmp_path):
+    collector = make_collector(make_extractor, validate=False, batch_size=1)
+    collector.append({'name': 'a', 'year': 1, 'tags': []})
+    assert not collector.schema.field('year').nullable
+
+    collector.append({'name': 'b', 'year': None, 'tags': []})
+    table = collector.to_arrow()
+    assert table.schema.field('year').nullable
+    assert table.column('year').to_pylist() == [1, None]
+    collector.to_parquet(str(tmp_path / 'results.parquet'))
+
+
+def test_validation_rejects_bad_results(make_extractor):
+    collector = make_collector(make_extractor)
+    with pytest.raises(ValidationError):
+        collector.append({'name': 'a', 'year': 'not a year', 'tags': []})
+    assert len(collector) == 0
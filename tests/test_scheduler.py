@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from llm_helper.scheduler import RequestCancelled, RequestScheduler
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def queued(scheduler, priority):
+    return scheduler.stats()['classes'][priority]['queued']
+
+
+def start_call(scheduler, started, priority, session, errors=None):
+    """Thread that acquires a slot, records (priority, session) and releases it."""
+
+    def run():
+        try:
+            ticket = scheduler.acquire(priority, session)
+        except RequestCancelled as e:
+            errors.append(e)
+            return
+        started.append((priority, session))
+        scheduler.release(ticket)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_queued_calls_start_by_priority_class():
+    scheduler = RequestScheduler(max_concurrent=2, reserved_interactive=1)
+    held = scheduler.acquire('batch', 'held')
+    started = []
+    threads = [start_call(scheduler, started, 'backfill', 's')]
+    wait_until(lambda: queued(scheduler, 'backfill') == 1)
+    threads.append(start_call(scheduler, started, 'batch', 's'))
+    wait_until(lambda: queued(scheduler, 'batch') == 1)
+
+    # the reserved slot lets a question start while batch work is waiting
+    threads.append(start_call(scheduler, started, 'interactive', 's'))
+    wait_until(lambda: started == [('interactive', 's')])
+
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(5)
+    assert started == [('interactive', 's'), ('batch', 's'), ('backfill', 's')]
+
+
+def test_sessions_share_a_class_fairly():
+    scheduler = RequestScheduler(max_concurrent=2, reserved_interactive=1)
+    held = scheduler.acquire('batch', 'held')
+    started = []
+    threads = []
+    for n, session in enumerate(['big', 'big', 'big', 'small'], start=1):
+        threads.append(start_call(scheduler, started, 'batch', session))
+        wait_until(lambda: queued(scheduler, 'batch') == n)
+
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(5)
+    assert [session for _, session in started] == ['big', 'small', 'big', 'big']
+
+
+def test_cancel_removes_queued_calls_of_a_session():
+    scheduler = RequestScheduler(max_concurrent=2, reserved_interactive=1)
+    held = scheduler.acquire('batch', 'held')
+    started, errors = [], []
+    threads = [start_call(scheduler, started, 'batch', session, errors) for session in ('gone', 'kept')]
+    wait_until(lambda: queued(scheduler, 'batch') == 2)
+
+    assert scheduler.cancel(session='gone') == 1
+    threads[0].join(5)
+    assert len(errors) == 1 and started == []
+
+    scheduler.release(held)
+    threads[1].join(5)
+    assert started == [('batch', 'kept')]
+    assert scheduler.stats()['classes']['batch']['cancelled'] == 1
+
+
+def test_interrupted_wait_leaves_no_ticket_behind():
+    scheduler = RequestScheduler(max_concurrent=2, reserved_interactive=1)
+
+    def interrupted(ticket):
+        raise KeyboardInterrupt
+
+    scheduler._try_start = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.acquire('batch', 's')
+    assert queued(scheduler, 'batch') == 0
+
+
+def test_unknown_priority_is_rejected():
+    scheduler = RequestScheduler()
+    with pytest.raises(ValueError):
+        scheduler.acquire('urgent')
+    with pytest.raises(ValueError):
+        RequestScheduler(max_concurrent=1, reserved_interactive=1)
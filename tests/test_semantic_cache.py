@@ -0,0 +1,119 @@
+import pytest
+
+from llm_helper.semantic_cache import SemanticCache, exact_terms
+
+
+# calibration pairs for the default HashedNgramEmbedder threshold
+paraphrases = [
+    ("avg salary by dept", "average salary per department"),
+    ("What is the average salary by department?", "What is the average salary per department?"),
+    ("how many employees are in each department", "number of employees per department"),
+    ("list all employees hired in 2020", "show me all employees hired in 2020"),
+    ("total sales per region", "sum of sales by region"),
+    ("what is the total revenue for 2023?", "total revenue in 2023"),
+    ("Which products have the highest price?", "which product has the highest price"),
+    ("count of orders per customer", "number of orders for each customer"),
+    ("summarize the data", "Summarize the data."),
+    ("show rows where age > 30", "rows where age > 30"),
+    ("what's the mean age of employees", "average age of the employees"),
+    ("give me a summary of the sales data", "summarize the sales data"),
+    ("average order value by month", "monthly average order value"),
+    ("describe the dataset", "describe this dataset"),
+    ("number of customers that churned", "how many customers churned"),
+]
+
+near_misses = [
+    ("show rows where age > 30", "show rows where age < 30"),
+    ("older than 30?", "older than 40?"),
+    ("average salary by department", "maximum salary by department"),
+    ("sort employees by name ascending", "sort employees by name descending"),
+    ("list employees in sales", "list employees in marketing"),
+    ("employees hired in 2020", "employees hired in 2021"),
+    ("employees who are not managers", "employees who are managers"),
+    ("total sales per region", "total sales per product"),
+    ("top 5 products by revenue", "bottom 5 products by revenue"),
+    ("how many orders in january", "how many orders in february"),
+    ("average order value by month", "average order value by week"),
+    ("revenue growth in 2023", "revenue decline in 2023"),
+    ("median salary by department", "average salary by department"),
+    ("profit by quarter", "profit by year"),
+]
+
+
+@pytest.mark.parametrize('cached, asked', paraphrases)
+def test_paraphrase_hits(cached, asked):
+    cache = SemanticCache()
+    cache.add(cached, 'answer')
+    hit = cache.lookup(asked)
+    assert hit is not None and hit['response'] == 'answer'
+
+
+@pytest.mark.parametrize('cached, asked', near_misses)
+def test_near_miss_is_not_served(cached, asked):
+    cache = SemanticCache()
+    cache.add(cached, 'answer')
+    assert cache.lookup(asked) is None
+
+
+def test_exact_terms_keep_numbers_and_operators():
+    assert exact_terms("age > 30") != exact_terms("age < 30")
+    assert exact_terms("age > 30") != exact_terms("age > 40")
+
+
+def test_scopes_are_isolated_and_oldest_entries_dropped():
+    cache = SemanticCache(max_entries=2, max_similarities=3)
+    cache.add("describe the dataset", "a", scope='one')
+    assert cache.lookup("describe the dataset", scope='two') is None
+
+    cache.add("total sales per region", "b", scope='one')
+    cache.add("number of customers that churned", "c", scope='one')
+    assert cache.lookup("describe the dataset", scope='one') is None
+    assert cache.lookup("number of customers that churned", scope='one')['response'] == 'c'
+
+    for _ in range(5):
+        cache.lookup("total sales per region", scope='one')
+    assert len(cache._similarities) == 3
+    assert cache.stats()['entries'] == 2
+
+
+def test_helper_answers_paraphrase_from_cache(make_helper):
+    helper = make_helper(lambda messages: "42 employees")
+    helper.enable_semantic_cache()
+    helper.add_guideline('style', 'Be brief.')
+    assert helper.ask("How many employees are there in each department?") == "42 employees"
+    assert helper.ask("how many employees in each department") == "42 employees"
+    assert helper.client.calls == 1
+
+    helper.add_guideline('style', 'Be verbose.')     # new scope
+    helper.ask("how many employees in each department")
+    assert helper.client.calls == 2
+
+
+def test_full_scope_reuses_its_buffer_in_place():
+    cache = SemanticCache(max_entries=20, exact_key=None)
+    prompts = [f"question about topic {chr(97 + i % 26)}{i}" for i in range(60)]
+    for i, prompt in enumerate(prompts):
+        cache.add(prompt, f'r{i}')
+
+    group = cache._index[('', None)]
+    buffer = group['vectors']
+    for i in range(60, 100):
+        cache.add(f"another question {i}", f'r{i}')
+        assert group['vectors'] is buffer
+    assert cache.stats()['entries'] == 20
+    assert cache.lookup(prompts[-1]) is None
+    assert cache.lookup("another question 99")['response'] == 'r99'
+    assert cache.lookup("another question 80")['response'] == 'r80'
+
+
+def test_total_entries_are_capped_across_scopes():
+    cache = SemanticCache(max_entries=10, max_total_entries=6)
+    for scope in ('one', 'two', 'three'):
+        for prompt in ("describe the dataset", "total sales per region", "number of customers that churned"):
+            cache.add(prompt, f'{scope} answer', scope=scope)
+
+    assert cache.stats()['entries'] == 6
+    # the oldest scope was dropped as a whole, and nothing is kept for it
+    assert cache.lookup("describe the dataset", scope='one') is None
+    assert 'one' not in cache._order and all(scope != 'one' for scope, _ in cache._index)
+    assert cache.lookup("describe the dataset", scope='three')['response'] == 'three answer'
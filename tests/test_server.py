@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+from llm_helper.mock_providers import MockChatModel, MockInferenceClient
+from llm_helper.server import SessionStore, create_app
+
+from conftest import BASE_PROMPT, FIX_PROMPT, SCHEMA, answer
+
+
+async def call(app, method, path, payload=None, disconnect_after=None):
+    """Send one request to the ASGI app; returns (status, body bytes)."""
+    requests = [{'type': 'http.request', 'body': json.dumps(payload or {}).encode(), 'more_body': False}]
+    received = {'status': None, 'body': b''}
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            received['status'] = message['status']
+        else:
+            received['body'] += message.get('body', b'')
+
+    await app({'type': 'http', 'method': method, 'path': path, 'headers': []}, receive, send)
+    return received['status'], received['body']
+
+
+async def new_session(app):
+    status, body = await call(app, 'POST', '/sessions')
+    assert status == 201
+    return json.loads(body)['session_id']
+
+
+def test_sessions_are_isolated(capsys):
+    app = create_app(client=MockInferenceClient(lambda m: f"{len(m)} messages", latency=0))
+
+    async def scenario():
+        a, b = await new_session(app), await new_session(app)
+        await call(app, 'POST', f'/sessions/{a}/guidelines', {'name': 'g', 'guideline': 'Be brief.'})
+        status, body = await call(app, 'POST', f'/sessions/{a}/ask', {'prompt': 'hi'})
+        assert status == 200 and json.loads(body)['response'] == '2 messages'
+        _, body = await call(app, 'GET', f'/sessions/{b}/history')
+        assert json.loads(body)['history'] == []
+
+    asyncio.run(scenario())
+    assert 'Initialized AIHelper' not in capsys.readouterr().out
+
+
+def test_stream_stops_on_client_disconnect():
+    client = MockInferenceClient(lambda m: 'word ' * 500, latency=0, tokens_per_second=100)
+    app = create_app(client=client)
+
+    async def scenario():
+        session_id = await new_session(app)
+        start = time.monotonic()
+        status, body = await call(app, 'POST', f'/sessions/{session_id}/ask/stream', {'prompt': 'hi'},
+                                  disconnect_after=0.2)
+        assert status == 200 and b'event: done' not in body
+        assert time.monotonic() - start < 2
+        # the partial answer is kept and the session is usable again
+        _, body = await call(app, 'GET', f'/sessions/{session_id}/history')
+        history = json.loads(body)['history']
+        assert history[0]['content'] == 'hi' and 0 < len(history[1]['content']) < len('word ' * 500)
+
+    asyncio.run(scenario())
+    time.sleep(0.1)
+    assert client.active_calls == 0
+
+
+def test_extract_endpoint():
+    app = create_app(client=MockInferenceClient(latency=0), extractor_llm=MockChatModel(lambda p: answer(), latency=0))
+    body = {'schema': SCHEMA, 'base_prompt': BASE_PROMPT, 'fix_prompt': FIX_PROMPT,
+            'technology_name': 'Flywheel', 'info_source': 'text'}
+    status, response = asyncio.run(call(app, 'POST', '/extract', body))
+    assert status == 200 and json.loads(response)['result']['name'] == 'Flywheel'
+
+
+def test_store_tracks_sizes_and_evicts_by_memory(make_helper):
+    store = SessionStore(lambda: make_helper(), max_total_bytes=1000)
+    first, second = store.create(), store.create()
+    first.helper.add_guideline('g', 'x' * 600)
+    store.touch(first)
+    assert store.stats()['memory_bytes'] == 600
+
+    second.helper.add_guideline('g', 'y' * 600)
+    store.touch(second)
+    assert store.get(first.session_id) is None
+    assert store.stats() == {'sessions': 1, 'memory_bytes': 600,
+                             'evictions': {'idle': 0, 'capacity': 0, 'memory': 1}}
+
+
+def test_store_expires_idle_sessions(make_helper):
+    store = SessionStore(lambda: make_helper(), idle_timeout=0.05)
+    session = store.create()
+    time.sleep(0.1)
+    assert store.get(session.session_id) is None
+    assert store.stats()['evictions']['idle'] == 1
+
+
+def test_incomplete_requests_are_client_errors():
+    app = create_app(client=MockInferenceClient(latency=0))
+
+    async def scenario():
+        session_id = await new_session(app)
+        for path, payload in ((f'/sessions/{session_id}/ask', {}),
+                              (f'/sessions/{session_id}/ask/stream', {'with_history': False}),
+                              (f'/sessions/{session_id}/guidelines', {'name': 'g'}),
+                              (f'/sessions/{session_id}/data', {'data': 'text'}),
+                              ('/extract', {'schema': SCHEMA}),
+                              (f'/sessions/{session_id}/ask', ['hi'])):
+            status, body = await call(app, 'POST', path, payload)
+            assert status == 400, (path, body)
+        _, body = await call(app, 'POST', f'/sessions/{session_id}/guidelines', {'name': 'g'})
+        assert json.loads(body)['error'] == 'Missing field(s) in request body: guideline'
+
+    asyncio.run(scenario())
+
+
+def test_sessions_in_use_are_not_evicted(make_helper):
+    store = SessionStore(lambda: make_helper(), max_sessions=1)
+    first = store.create()
+    assert store.get(first.session_id) is first
+
+    # a request holds first (between lookup and its session lock): it is not evicted
+    second = store.create()
+    assert store.stats()['sessions'] == 2
+
+    store.release(first)
+    store.touch(second)
+    assert store.stats()['sessions'] == 1
+    assert store.get(first.session_id) is None
+
+
+def test_default_extractor_model_is_built_once(monkeypatch):
+    import threading
+    import llm_helper.server as server
+
+    built = []
+
+    class SlowExtractor(server.InfoExtractor):
+        def __init__(self, llm=None):
+            if llm is None:
+                built.append(threading.get_ident())
+                time.sleep(0.05)
+                llm = MockChatModel(lambda p: answer(), latency=0)
+            super().__init__(llm=llm)
+
+    monkeypatch.setattr(server, 'InfoExtractor', SlowExtractor)
+    app = create_app(client=MockInferenceClient(latency=0))
+    body = {'schema': SCHEMA, 'base_prompt': BASE_PROMPT, 'fix_prompt': FIX_PROMPT,
+            'technology_name': 'Flywheel', 'info_source': 'text'}
+
+    async def scenario():
+        return await asyncio.gather(*[call(app, 'POST', '/extract', body) for _ in range(4)])
+
+    assert [status for status, _ in asyncio.run(scenario())] == [200] * 4
+    assert len(built) == 1
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from pydantic import create_model
+
+from llm_helper.stream_validator import StreamAbort, StreamingJSONValidator
+
+from conftest import answer
+
+
+Model = create_model('Model', name=(str, ...), year=(int, ...))
+
+
+def feed_all(validator, text, size=3):
+    for i in range(0, len(text), size):
+        validator.feed(text[i:i + size])
+    return validator.finish()
+
+
+def test_fields_are_reported_as_they_complete():
+    seen = []
+    validator = StreamingJSONValidator(Model, on_field=lambda name, value: seen.append((name, value)))
+    result = feed_all(validator, '```json\n{"name": "Fly, \\"wheel\\"", "year": 1990}\n```')
+    assert result == {'name': 'Fly, "wheel"', 'year': 1990}
+    assert seen == [('name', 'Fly, "wheel"'), ('year', 1990)]
+
+
+@pytest.mark.parametrize('text, kind', [
+    ('Sure! ' * 50 + '{"name": "x"}', 'preamble'),
+    ('{"name": "x", "yeer": 1990}', 'malformed'),
+    ('{"name": "x", "year": "soon"}', 'malformed'),
+    ('{"name": "x", "year": 19', 'truncated'),
+])
+def test_abort_kinds(text, kind):
+    with pytest.raises(StreamAbort) as info:
+        feed_all(StreamingJSONValidator(Model, max_preamble=100), text)
+    assert info.value.kind == kind
+
+
+def streaming_extractor(make_extractor, first_response, prompts):
+    def responder(prompt):
+        prompts.append(prompt)
+        return first_response if len(prompts) == 1 else answer()
+
+    extractor = make_extractor(responder)
+    extractor.load_info_source('Flywheel', 'source text')
+    return extractor
+
+
+def test_malformed_stream_goes_to_the_fix_prompt(make_extractor):
+    prompts = []
+    extractor = streaming_extractor(make_extractor, json.dumps({'name': 'Flywheel', 'year': 'soon'}), prompts)
+    assert extractor.extract_tech_info_streaming(verbose=False).name == 'Flywheel'
+    assert prompts[1].startswith('System: Repair') and 'Output stopped' in prompts[1]
+
+
+@pytest.mark.parametrize('first_response', ['Let me think about this. ' * 20, '{"name": "Flywheel", "ye'])
+def test_preamble_or_truncation_re_runs_the_base_prompt(make_extractor, first_response):
+    prompts = []
+    extractor = streaming_extractor(make_extractor, first_response, prompts)
+    assert extractor.extract_tech_info_streaming(verbose=False).name == 'Flywheel'
+    assert len(prompts) == 2 and 'SOURCE source text' in prompts[1]
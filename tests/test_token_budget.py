@@ -0,0 +1,52 @@
+import pytest
+
+from llm_helper.token_budget import ApproxTokenizer, BudgetPlanner
+
+
+def segment(kind, name, tokens):
+    return {'kind': kind, 'name': name, 'content': 'x' * (4 * tokens)}
+
+
+def planner(context_window, **kwargs):
+    return BudgetPlanner(ApproxTokenizer(), context_window=context_window, max_output_tokens=500,
+                         min_output_tokens=100, safety_margin=0, message_overhead=0, **kwargs)
+
+
+def test_fitting_request_is_kept_and_max_tokens_capped():
+    plan = planner(4000).plan([segment('guideline', 'g', 100), segment('prompt', 'prompt', 50)])
+    assert not plan['trimmed']
+    assert plan['input_tokens'] == 150
+    assert plan['max_tokens'] == 500
+
+
+def test_history_dropped_in_pairs_before_data_is_truncated():
+    segments = [
+        segment('data', 'frame', 900),
+        dict(segment('history', 0, 200), role='user'),
+        dict(segment('history', 1, 200), role='assistant'),
+        segment('prompt', 'prompt', 50),
+    ]
+    plan = planner(1000).plan(segments)
+    actions = [row['action'] for row in plan['breakdown']]
+    assert actions[0].startswith('truncated to ')
+    assert actions[1:] == ['dropped', 'dropped', 'keep']
+    assert plan['input_tokens'] <= 900
+    assert plan['max_tokens'] >= 100
+
+
+def test_prompt_alone_too_large_raises():
+    with pytest.raises(ValueError, match='does not fit'):
+        planner(200).plan([segment('prompt', 'prompt', 150)])
+
+
+def test_ask_sends_planned_messages(make_helper):
+    sent = []
+    helper = make_helper(lambda messages: sent.append(messages) or 'ok')
+    helper.budget_planner = planner(1000)
+    helper.attach_data('big', 'y' * 8000)
+    helper.ask('question')
+    assert len(sent[0][0]['content']) < 8000
+    assert sent[0][-1] == {'role': 'user', 'content': 'question'}
+
+    plan = helper.ask('question', dry_run=True)
+    assert plan['trimmed'] and len(sent) == 1
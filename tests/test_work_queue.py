@@ -0,0 +1,113 @@
+import re
+import threading
+
+from llm_helper import InfoExtractor
+from llm_helper.mock_providers import MockChatModel
+from llm_helper.work_queue import QueueWorker, WorkQueue, run_workers
+
+from conftest import BASE_PROMPT, FIX_PROMPT, SCHEMA, answer
+
+
+def name_responder(prompt):
+    return answer(name=re.search(r'BASE (.*)', prompt).group(1))
+
+
+def build_extractor():
+    """Extractor factory for worker processes (module level, so it can be pickled)."""
+    extractor = InfoExtractor(llm=MockChatModel(name_responder, latency=0.01))
+    extractor.load_data_schema(SCHEMA)
+    extractor.load_prompt_templates(BASE_PROMPT, FIX_PROMPT)
+    return extractor
+
+
+def items(n):
+    return [(f'id-{i}', f'item {i}', 'text') for i in range(n)]
+
+
+def ok(item_id):
+    return {'item_id': item_id, 'status': 'ok', 'result': {}}
+
+
+def test_adding_the_same_items_twice_is_safe(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'q.db'))
+    assert queue.add(items(3)) == 3
+    assert queue.add(items(4)) == 1
+    assert queue.stats()['pending'] == 4
+
+
+def test_expired_lease_is_reclaimed_and_first_result_wins(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'q.db'), lease_seconds=0)
+    queue.add(items(1))
+    assert [item[0] for item in queue.claim('slow')] == ['id-0']
+
+    # the lease ran out: another worker takes the item and finishes it first
+    assert [item[0] for item in queue.claim('fast')] == ['id-0']
+    assert queue.heartbeat('slow', ['id-0']) == []
+    assert queue.complete('fast', ok('id-0'))
+    assert not queue.complete('slow', ok('id-0'))
+    assert [r['item_id'] for r in queue.load_records()] == ['id-0']
+    assert queue.stats()['done'] == 1
+
+
+def test_item_is_failed_after_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'q.db'), max_attempts=2)
+    queue.add(items(1))
+    failed = {'item_id': 'id-0', 'status': 'failed', 'result': None, 'error': 'bad output'}
+
+    queue.claim('w')
+    queue.complete('w', failed)
+    assert queue.stats()['pending'] == 1
+    queue.claim('w')
+    queue.complete('w', failed)
+    assert queue.stats()['failed'] == 1
+    assert queue.completed_ids(include_failed=False) == set()
+
+    assert queue.retry_failed() == 1
+    assert queue.stats()['pending'] == 1
+
+
+def test_crashed_workers_leases_end_as_failures(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'q.db'), lease_seconds=0, max_attempts=1)
+    queue.add(items(1))
+    queue.claim('crashed')
+    assert queue.claim('next') == []
+    assert queue.load_records()[0]['status'] == 'failed'
+
+
+def test_release_hands_items_back(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'q.db'))
+    queue.add(items(2))
+    queue.claim('w', n=2)
+    assert queue.workers() == {'w': 2}
+    assert queue.release('w') == 2
+    assert queue.stats()['pending'] == 2
+
+
+def test_workers_drain_the_queue_together(tmp_path):
+    path = str(tmp_path / 'q.db')
+    WorkQueue(path).add(items(12))
+    summaries = []
+
+    def work(worker_id):
+        summaries.append(QueueWorker(build_extractor(), path, worker_id=worker_id, max_workers=2,
+                                     poll_interval=0.05).run())
+
+    threads = [threading.Thread(target=work, args=(f'w{i}',)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    queue = WorkQueue(path)
+    assert queue.stats()['done'] == 12
+    assert sum(s['completed'] for s in summaries) == 12
+    assert len(queue.completed_ids()) == 12
+
+
+def test_run_workers_in_processes(tmp_path):
+    path = str(tmp_path / 'q.db')
+    WorkQueue(path).add(items(6))
+    stats = run_workers(build_extractor, path, processes=2)
+    assert (stats['done'], stats['total']) == (6, 6)
+    records = WorkQueue(path).load_records()
+    assert sorted(r['result']['name'] for r in records) == sorted(f'item {i}' for i in range(6))